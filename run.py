@@ -1,17 +1,30 @@
-import tkinter as tk
-import keyboard
+import time
+STARTED = time.perf_counter()  # 启动耗时的起点，需在导入其他模块之前
+
+import argparse
+import json
+import multiprocessing
+import signal
 import sys
 import traceback
 from pathlib import Path
-from src.meme_selector import MemeSelector
+# 界面和搜索引擎只在需要的分支中导入，命令行查询交给守护进程时不加载 Tk 和索引
+from src.daemon_client import connect
+from src.utils.startup_profiler import StartupProfiler
 
 class Application:
     """应用主类"""
     
-    def __init__(self):
+    def __init__(self, profiler=None, profile_startup=False):
         """初始化应用"""
         try:
             print("初始化应用...")
+            self.profiler = profiler or StartupProfiler(STARTED)
+            self.profile_startup = profile_startup
+            
+            with self.profiler.phase('导入界面'):
+                import tkinter as tk
+                from src.meme_selector import MemeSelector
             
             # 创建主窗口
             self.root = tk.Tk()
@@ -23,13 +36,16 @@ class Application:
             self.root.overrideredirect(True)  # 无边框
             
             # 初始化表情包选择器
-            self.selector = MemeSelector(self.root)
+            self.selector = MemeSelector(self.root, self.profiler)
             
-            # 注册热键
-            self.register_hotkeys()
+            # 注册热键（回调经调度队列回到 Tk 线程，无需定期轮询）
+            with self.profiler.phase('热键'):
+                self.register_hotkeys()
             
-            # 设置定期更新
-            self.setup_update_loop()
+            # Ctrl+C 时退出主循环
+            self.interrupted = False
+            signal.signal(signal.SIGINT, self.on_interrupt)
+            self.selector.dispatcher.wake_on_signals()
             
             print("应用初始化完成")
             
@@ -41,27 +57,21 @@ class Application:
     def register_hotkeys(self):
         """注册热键"""
         try:
+            import keyboard
+            dispatcher = self.selector.dispatcher
             # Tab 键呼出搜索窗口
-            keyboard.add_hotkey('tab', self.selector.show_window)
+            keyboard.add_hotkey('tab', lambda: dispatcher.post(self.selector.show_window))
             # Esc 键隐藏窗口
-            keyboard.add_hotkey('esc', self.selector.hide_window)
+            keyboard.add_hotkey('esc', lambda: dispatcher.post(self.selector.hide_window))
             print("热键注册成功")
         except Exception as e:
             print(f"注册热键失败: {e}")
             traceback.print_exc()
 
-    def setup_update_loop(self):
-        """设置更新循环"""
-        def update():
-            try:
-                self.root.update()
-                self.root.after(10, update)  # 每10ms更新一次
-            except Exception as e:
-                print(f"更新循环错误: {e}")
-                traceback.print_exc()
-                self.cleanup()
-                sys.exit(1)
-        update()
+    def on_interrupt(self, signum, frame):
+        """处理 Ctrl+C"""
+        self.interrupted = True
+        self.root.quit()
 
     def run(self):
         """运行应用"""
@@ -70,7 +80,13 @@ class Application:
             print("按Tab键呼出搜索窗口")
             print("按ESC键隐藏窗口")
             print("按Ctrl+C退出程序\n")
+            self.profiler.mark_ready()
+            if self.profile_startup:
+                # 排在延后的预加载之后执行
+                self.selector.dispatcher.post(self.report_startup)
             self.root.mainloop()
+            if self.interrupted:
+                print("\n接收到退出信号")
         except KeyboardInterrupt:
             print("\n接收到退出信号")
         except Exception as e:
@@ -79,6 +95,10 @@ class Application:
         finally:
             self.cleanup()
 
+    def report_startup(self):
+        """输出启动耗时明细"""
+        print(self.profiler.report())
+
     def cleanup(self):
         """清理资源"""
         try:
@@ -86,9 +106,11 @@ class Application:
             
             # 清理选择器资源
             if hasattr(self, 'selector'):
+                print(f"热键到窗口的调度延迟(ms): {self.selector.dispatcher.stats()}")
                 self.selector.cleanup()
             
             # 注销热键
+            import keyboard
             keyboard.unhook_all()
             
             # 销毁主窗口
@@ -129,15 +151,101 @@ def check_environment():
         traceback.print_exc()
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="表情包助手")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="启动完成后输出各阶段耗时")
+    parser.add_argument('--query', action='append',
+                        help="不启动界面，直接搜索并输出 JSON（可重复）")
+    parser.add_argument('--stdin', action='store_true',
+                        help="不启动界面，从标准输入逐行读取查询（纯文本或 {\"query\": ..., \"k\": ...}）")
+    parser.add_argument('-k', '--top-k', type=int, default=None,
+                        help="每个查询返回的结果数，默认取配置中的 max_results")
+    parser.add_argument('--daemon', action='store_true',
+                        help="以守护进程运行，通过 Unix 套接字提供查询")
+    parser.add_argument('--socket', default=None,
+                        help="守护进程套接字路径，默认 data/cache/meme.sock")
+    parser.add_argument('--no-daemon', action='store_true',
+                        help="查询模式下不使用正在运行的守护进程")
+    return parser.parse_args()
+
+def write_result(output, query, results=None, error=None):
+    """输出一行 JSON 结果"""
+    line = {'query': query}
+    if error is not None:
+        line['error'] = error
+    else:
+        line['results'] = results
+    output.write(json.dumps(line, ensure_ascii=False) + '\n')
+    output.flush()
+
+def run_queries(args):
+    """命令行查询模式：不创建窗口，每个查询输出一行 JSON"""
+    output = sys.stdout
+    # 日志改写到 stderr，stdout 只输出结果
+    sys.stdout = sys.stderr
+    try:
+        if not check_environment():
+            return 1
+        # 守护进程在运行时直接向它查询，省去加载索引
+        client = None if args.no_daemon else connect(args.socket)
+        if client is not None:
+            print(f"使用守护进程: {client.socket_path}")
+            engine = client
+        else:
+            from src.search_engine import SearchEngine
+            engine = SearchEngine.from_base_path(Path(__file__).parent)
+            engine.load()
+        
+        if args.query:
+            for query, results in zip(args.query, engine.search_many(args.query, args.top_k)):
+                write_result(output, query, results)
+        
+        if args.stdin:
+            for line in sys.stdin:
+                line = line.strip()
+                if not line:
+                    continue
+                query, k = line, args.top_k
+                try:
+                    if line.startswith('{'):
+                        request = json.loads(line)
+                        query = request.get('query', '')
+                        k = request.get('k', k)
+                    write_result(output, query, engine.search(query, k))
+                except Exception as e:
+                    write_result(output, query, error=str(e))
+        return 0
+    finally:
+        sys.stdout = output
+
+def run_daemon(args):
+    """守护进程模式：不创建窗口，保持索引常驻"""
+    from src.daemon import MemeDaemon
+    
+    if not check_environment():
+        return 1
+    MemeDaemon.from_base_path(Path(__file__).parent, args.socket).run()
+    return 0
+
 def main():
     """主函数"""
     try:
+        args = parse_args()
+        if args.query or args.stdin:
+            return run_queries(args)
+        if args.daemon:
+            return run_daemon(args)
+        
+        profiler = StartupProfiler(STARTED)
+        profiler.record('导入模块', time.perf_counter() - STARTED)
+        
         # 检查环境
         if not check_environment():
             return 1
             
         # 创建并运行应用
-        app = Application()
+        app = Application(profiler, args.profile_startup)
         app.run()
         
         return 0
@@ -148,4 +256,6 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    # 打包后的 Windows 程序以 spawn 启动进程池的工作进程，必须先交给 freeze_support 处理
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,316 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmark_fuzzy import load_base_texts, make_corpus, make_queries
+from benchmark_thumbnails import list_images, bench_pool
+from src.search_engine import read_features
+from src.utils.search_index import SearchIndex, LazyConverter
+from src.utils.thumbnail_builder import make_thumbnail
+from src.utils.payload_cache import SendProfile, encode_payload
+from src.utils.similarity_index import SimilarityIndex
+
+BASE_PATH = Path(__file__).parent.parent
+
+# 合成的筛选字段取值
+AUTHORS = ['愛音', '燈', '爽世', '立希', '樂奈', '初華']
+TAGS = ['吐槽', '震驚', '開心', '哭', '生氣', '疑惑']
+
+
+def percentile(values, fraction):
+    """已排序列表的分位数（最近秩）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def latency_stats(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return {
+        'count': len(samples_ms),
+        'p50_ms': round(percentile(samples_ms, 0.50), 3),
+        'p99_ms': round(percentile(samples_ms, 0.99), 3),
+        'max_ms': round(samples_ms[-1], 3) if samples_ms else 0.0
+    }
+
+
+def peak_rss_mb():
+    """本进程的峰值常驻内存（MB），Windows 上不可用时返回 None
+
+    ru_maxrss 是整个进程生命周期的峰值，所以每个语料在单独的子进程中测量（见 run_corpus）。
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=str(BASE_PATH),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def make_library(corpus, image_paths, rng):
+    """合成图片映射和元数据：名称来自语料，路径循环使用真实图片"""
+    image_map = {}
+    metadata = {}
+    for i, name in enumerate(corpus):
+        name = f"{name}_{i}" if name in image_map else name
+        image_map[name] = image_paths[i % len(image_paths)] if image_paths else f"{name}.jpg"
+        metadata[name] = {
+            'author': rng.choice(AUTHORS),
+            'episode': rng.randint(1, 13),
+            'tags': rng.sample(TAGS, rng.randint(0, 2))
+        }
+    return image_map, metadata
+
+
+def make_filter_queries(queries, rng):
+    """给部分查询加上筛选条件"""
+    filtered = []
+    for query in queries:
+        roll = rng.random()
+        if roll < 0.2:
+            query = f"{query} author:{rng.choice(AUTHORS)}"
+        elif roll < 0.3:
+            query = f"tag:{rng.choice(TAGS)},{rng.choice(TAGS)} ep:{rng.randint(1, 13)}"
+        filtered.append(query)
+    return filtered
+
+
+def bench_search(index, queries, score_threshold, max_results):
+    """每次查询前清空结果缓存，测量完整的查询延迟"""
+    samples = []
+    for query in queries:
+        index.invalidate()
+        start = time.perf_counter()
+        index.search(query, score_threshold, max_results)
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_stats(samples)
+
+
+def bench_typing(index, queries, score_threshold, max_results):
+    """模拟逐字输入：每个前缀都查询一次，可复用上一次的候选"""
+    samples = []
+    for query in queries:
+        index.invalidate()
+        for end in range(1, len(query) + 1):
+            start = time.perf_counter()
+            index.search(query[:end], score_threshold, max_results)
+            samples.append((time.perf_counter() - start) * 1000)
+    return latency_stats(samples)
+
+
+def bench_score(index, queries):
+    """单次打分（calculate_match_score）的平均耗时，微秒"""
+    entries = [entry for entry in index.entries if entry is not None][:2000]
+    normalized = [index.normalize_query(query) for query in queries[:20]]
+    start = time.perf_counter()
+    for query in normalized:
+        for entry in entries:
+            index.score(entry, query)
+    elapsed = time.perf_counter() - start
+    return round(elapsed * 1e6 / max(1, len(entries) * len(normalized)), 3)
+
+
+def bench_similar(size, count, rng):
+    """相似图片查询：随机 64 位哈希，整个语料的汉明距离扫描"""
+    index = SimilarityIndex((f"{i}.jpg", rng.getrandbits(64)) for i in range(size))
+    samples = []
+    for _ in range(count):
+        value = rng.getrandbits(64)
+        start = time.perf_counter()
+        index.nearest(value, 20, 24)
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_stats(samples)
+
+
+def bench_corpus(size, base_texts, image_paths, args, rng):
+    corpus = make_corpus(base_texts, size, rng)
+    image_map, metadata = make_library(corpus, image_paths, rng)
+    queries = make_filter_queries(make_queries(corpus, args.queries, rng), rng)
+
+    index = SearchIndex(
+        LazyConverter('t2s'), LazyConverter('s2t'),
+        fuzzy_shortlist=args.fuzzy_shortlist
+    )
+    start = time.perf_counter()
+    index.build(image_map, metadata)
+    build_seconds = time.perf_counter() - start
+
+    return {
+        'size': size,
+        'build_seconds': round(build_seconds, 3),
+        'search': bench_search(index, queries, args.score_threshold, args.max_results),
+        'typing': bench_typing(index, queries[:args.typing_queries], args.score_threshold, args.max_results),
+        'score_us': bench_score(index, queries),
+        'similar': bench_similar(size, args.queries, rng),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run_corpus(size, args):
+    """在新的子进程中测量一个语料，使 peak_rss_mb 只反映该语料，不受之前语料的影响"""
+    command = [
+        sys.executable, str(Path(__file__).resolve()), '--corpus-size', str(size),
+        '--queries', str(args.queries), '--typing-queries', str(args.typing_queries),
+        '--score-threshold', str(args.score_threshold), '--max-results', str(args.max_results),
+        '--fuzzy-shortlist', str(args.fuzzy_shortlist), '--images', args.images, '--seed', str(args.seed)
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, encoding='utf-8', check=True)
+    return json.loads(completed.stdout)
+
+
+def corpus_rng(seed, size):
+    """每个语料独立的随机数序列，与语料的测量顺序无关"""
+    return random.Random(f"{seed}:{size}")
+
+
+def bench_thumbnails(image_paths, size, workers):
+    """串行（draft 解码）和进程池两种方式的缩略图吞吐"""
+    start = time.perf_counter()
+    for path in image_paths:
+        make_thumbnail(path, size)
+    serial = time.perf_counter() - start
+    pooled = bench_pool(image_paths, size, workers)
+    return {
+        'images': len(image_paths),
+        'serial_per_second': round(len(image_paths) / serial, 1),
+        'pool_per_second': round(len(image_paths) / pooled, 1),
+        'workers': workers
+    }
+
+
+def bench_encoding(image_paths, send_profile):
+    """各剪贴板格式的发送编码耗时（最大边长和 JPEG 质量取自 send_profile）"""
+    results = {}
+    for payload_format in ('dib', 'png', 'jpeg'):
+        profile = SendProfile(send_profile.max_dimension, payload_format, send_profile.jpeg_quality)
+        samples = []
+        total_bytes = 0
+        for path in image_paths:
+            start = time.perf_counter()
+            payload = encode_payload(path, profile)
+            samples.append((time.perf_counter() - start) * 1000)
+            total_bytes += len(payload.data)
+        stats = latency_stats(samples)
+        stats['mean_bytes'] = total_bytes // max(1, len(image_paths))
+        results[payload_format] = stats
+    return results
+
+
+def compare(current, baseline_path):
+    """与基准结果比较，列出变化超过 10% 的指标"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"与 {baseline_path}（{baseline.get('revision')}）比较:", file=sys.stderr)
+
+    def walk(new, old, prefix):
+        if isinstance(new, dict) and isinstance(old, dict):
+            for key in new:
+                if key in old:
+                    walk(new[key], old[key], f"{prefix}{key}.")
+        elif isinstance(new, (int, float)) and isinstance(old, (int, float)) and old:
+            change = (new - old) / old
+            if abs(change) >= 0.1:
+                print(f"  {prefix[:-1]}: {old} -> {new} ({change:+.0%})", file=sys.stderr)
+
+    baseline_corpora = {item['size']: item for item in baseline.get('corpora', [])}
+    for item in current['corpora']:
+        if item['size'] in baseline_corpora:
+            walk(item, baseline_corpora[item['size']], f"corpus[{item['size']}].")
+    for key in ('thumbnails', 'encoding'):
+        if key in current and key in baseline:
+            walk(current[key], baseline[key], f"{key}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面基准测试：搜索、缩略图、发送编码，输出 JSON")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--typing-queries', type=int, default=20)
+    parser.add_argument('--score-threshold', type=int, default=10)
+    parser.add_argument('--max-results', type=int, default=20)
+    parser.add_argument('--fuzzy-shortlist', type=int, default=200)
+    parser.add_argument('--images', default=str(BASE_PATH / 'images'))
+    parser.add_argument('--image-limit', type=int, default=50, help="缩略图和编码测试使用的图片数")
+    parser.add_argument('--thumbnail-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-dimension', type=int, default=None,
+                        help="发送编码基准的最大边长，默认与 features.send.max_dimension 一致（0 为原图）")
+    parser.add_argument('--skip-images', action='store_true', help="只测搜索")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="结果写入文件（默认输出到标准输出）")
+    parser.add_argument('--compare', help="与之前保存的结果比较")
+    # 内部使用：在子进程中只测量一个语料，结果 JSON 输出到标准输出
+    parser.add_argument('--corpus-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    image_paths = list_images(args.images)
+    if args.corpus_size is not None:
+        # 其他输出转到标准错误，标准输出只留结果
+        with contextlib.redirect_stdout(sys.stderr):
+            result = bench_corpus(args.corpus_size, load_base_texts(), image_paths, args,
+                                  corpus_rng(args.seed, args.corpus_size))
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    results = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'corpora': []
+    }
+    for size in args.sizes:
+        print(f"搜索基准: {size} 条...", file=sys.stderr)
+        results['corpora'].append(run_corpus(size, args))
+
+    sample = image_paths[:args.image_limit]
+    if sample and not args.skip_images:
+        print(f"缩略图与编码基准: {len(sample)} 张...", file=sys.stderr)
+        results['thumbnails'] = bench_thumbnails(sample, args.thumbnail_size, args.workers)
+        send_profile = SendProfile.from_config(read_features(BASE_PATH).get('send', {}))
+        if args.max_dimension is not None:
+            send_profile.max_dimension = args.max_dimension
+        results['send'] = {'max_dimension': send_profile.max_dimension, 'jpeg_quality': send_profile.jpeg_quality}
+        results['encoding'] = bench_encoding(sample, send_profile)
+    # 语料在子进程中测量，这里只是主进程（缩略图与编码基准）的峰值
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fuzzywuzzy import fuzz
+
+from src.utils.fuzzy_prefilter import FuzzyPrefilter
+
+
+def load_base_texts():
+    """从 image_map.json 和 images/ 收集名称与描述"""
+    base_path = Path(__file__).parent.parent
+    texts = set()
+    with open(base_path / 'data' / 'image_map.json', 'r', encoding='utf-8') as f:
+        for item in json.load(f):
+            texts.add(item['name'].lower())
+            if item.get('description'):
+                texts.add(item['description'].lower())
+    for image_path in (base_path / 'images').glob('**/*'):
+        if image_path.is_file():
+            texts.add(image_path.stem.lower())
+    return sorted(texts)
+
+
+def make_corpus(base_texts, size, rng):
+    """拼接真实名称生成指定规模的合成语料"""
+    corpus = []
+    while len(corpus) < size:
+        name = rng.choice(base_texts)
+        if rng.random() < 0.5:
+            other = rng.choice(base_texts)
+            start = rng.randrange(len(other))
+            name += other[start:start + rng.randint(1, 6)]
+        corpus.append(f"{name}{rng.randint(1, 99)}" if rng.random() < 0.3 else name)
+    return corpus
+
+
+def make_queries(corpus, count, rng):
+    """从语料中截取片段并随机替换一个字作为查询"""
+    queries = []
+    for _ in range(count):
+        name = rng.choice(corpus)
+        start = rng.randrange(len(name))
+        query = list(name[start:start + rng.randint(2, 8)])
+        if len(query) > 2:
+            query[rng.randrange(len(query))] = rng.choice(name)
+        queries.append(''.join(query))
+    return queries
+
+
+def loop_scores(corpus, query):
+    """现有做法：逐条调用 fuzz.ratio"""
+    scored = [(fuzz.ratio(query, name), i) for i, name in enumerate(corpus)]
+    scored = [item for item in scored if item[0] > 60]
+    scored.sort(reverse=True)
+    return scored
+
+
+def prefilter_scores(prefilter, corpus, query, top_k):
+    """向量化上界预筛选 + 精确计算候选"""
+    scored = [(fuzz.ratio(query, corpus[i]), i) for i in prefilter.shortlist(query, 60, top_k).tolist()]
+    scored = [item for item in scored if item[0] > 60]
+    scored.sort(reverse=True)
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模糊匹配预筛选基准测试")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--loop-queries', type=int, default=5, help="逐条循环较慢，只测少量查询")
+    parser.add_argument('--top-k', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not FuzzyPrefilter.available():
+        print("需要安装 numpy")
+        return 1
+
+    rng = random.Random(args.seed)
+    base_texts = load_base_texts()
+    print(f"{'规模':>8}{'建矩阵(s)':>12}{'循环(ms/次)':>14}{'预筛选(ms/次)':>16}{'加速':>8}{'召回':>8}")
+
+    for size in args.sizes:
+        corpus = make_corpus(base_texts, size, rng)
+        queries = make_queries(corpus, args.queries, rng)
+
+        start = time.perf_counter()
+        prefilter = FuzzyPrefilter().build(corpus)
+        build_time = time.perf_counter() - start
+
+        loop_queries = queries[:args.loop_queries]
+        start = time.perf_counter()
+        expected = [loop_scores(corpus, q) for q in loop_queries]
+        loop_ms = (time.perf_counter() - start) * 1000 / len(loop_queries)
+
+        start = time.perf_counter()
+        actual = [prefilter_scores(prefilter, corpus, q, args.top_k) for q in queries]
+        prefilter_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        # 召回：循环结果的前 top_k 中有多少被预筛选找到
+        found = total = 0
+        for want, got in zip(expected, actual):
+            want_ids = {i for _, i in want[:args.top_k]}
+            found += len(want_ids & {i for _, i in got})
+            total += len(want_ids)
+        recall = found / total if total else 1.0
+
+        print(f"{size:>8}{build_time:>12.2f}{loop_ms:>14.1f}{prefilter_ms:>16.2f}"
+              f"{loop_ms / prefilter_ms:>8.0f}x{recall:>8.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
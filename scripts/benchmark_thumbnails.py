@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.thumbnail_builder import ThumbnailBuilder, make_thumbnail
+
+
+def list_images(images_dir, limit=None):
+    """列出需要测试的图片"""
+    paths = [
+        str(p) for p in sorted(Path(images_dir).glob('**/*'))
+        if p.is_file() and p.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif']
+    ]
+    return paths[:limit] if limit else paths
+
+
+def bench_serial(paths, size, draft):
+    """单线程基准（与旧的 preload_images 相同的路径）"""
+    start = time.perf_counter()
+    for path in paths:
+        make_thumbnail(path, size, draft=draft)
+    return time.perf_counter() - start
+
+
+def bench_pool(paths, size, workers):
+    """进程池基准，包含结果交付的开销"""
+    builder = ThumbnailBuilder(size, max_workers=workers)
+    start = time.perf_counter()
+    builder.submit(paths)
+    while builder.busy:
+        if not builder.drain():
+            time.sleep(0.005)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缩略图生成基准测试")
+    parser.add_argument('--images', default=str(Path(__file__).parent.parent / 'images'))
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--workers', type=int, nargs='*', default=None)
+    args = parser.parse_args()
+
+    paths = list_images(args.images, args.limit)
+    if not paths:
+        print("没有找到图片")
+        return 1
+
+    cpu_count = os.cpu_count() or 1
+    workers_list = args.workers or sorted({1, 2, cpu_count})
+    print(f"图片数: {len(paths)}  缩略图尺寸: {args.size}  CPU: {cpu_count}\n")
+
+    elapsed = bench_serial(paths, args.size, draft=False)
+    print(f"{'串行 完整解码':<16}{len(paths) / elapsed:>10.1f} 张/秒")
+    elapsed = bench_serial(paths, args.size, draft=True)
+    print(f"{'串行 draft':<16}{len(paths) / elapsed:>10.1f} 张/秒")
+
+    for workers in workers_list:
+        elapsed = bench_pool(paths, args.size, workers)
+        label = f"进程池 x{workers}"
+        print(f"{label:<16}{len(paths) / elapsed:>10.1f} 张/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.search_engine import SearchEngine
+from src.utils.image_catalog import ImageCatalog, NEAR_DISTANCE
+
+BASE_PATH = Path(__file__).parent.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查找重复的图片并与 image_map.json 对账")
+    parser.add_argument('--near-distance', type=int, default=NEAR_DISTANCE,
+                        help="dHash 汉明距离不超过该值视为近似重复")
+    parser.add_argument('--workers', type=int, default=None, help="计算哈希的进程数")
+    parser.add_argument('--output', help="把报告写入 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    engine = SearchEngine.from_base_path(BASE_PATH)
+    catalog = ImageCatalog(BASE_PATH / 'data' / 'cache' / 'catalog.json').load()
+
+    start = time.perf_counter()
+    computed = catalog.update(engine.scan_images().values(), args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"重新计算 {computed} 个文件的哈希，用时 {elapsed:.1f}s", file=sys.stderr)
+
+    metadata_items = None
+    map_path = BASE_PATH / 'data' / 'image_map.json'
+    if map_path.exists():
+        with open(map_path, 'r', encoding='utf-8') as f:
+            metadata_items = json.load(f)
+
+    report = catalog.report(metadata_items, args.near_distance, BASE_PATH)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    else:
+        print(text)
+
+    print(f"{report['files']} 个文件：{len(report['exact_duplicates'])} 组完全重复"
+          f"（多余 {report['redundant_files']} 个），{len(report['near_duplicates'])} 组近似重复",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
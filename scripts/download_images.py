@@ -1,43 +1,236 @@
+import argparse
+import hashlib
 import json
-import requests
-from pathlib import Path
+import os
+import random
+import threading
+import time
 import concurrent.futures
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_PATH = Path(__file__).parent.parent
+DEFAULT_API_BASE = 'https://mygoapi.miyago9267.com'
+# 这些状态码视为临时错误，退避后重试
+RETRY_STATUS = (429, 500, 502, 503, 504)
+CHUNK_SIZE = 64 * 1024
+
+
+class RetryableError(Exception):
+    """可以重试的下载错误"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Downloader:
+    """批量下载表情包图片
+
+    - 所有请求共用一个 Session，连接池大小与并发数一致，连接复用
+    - 每个请求都有超时，临时错误按指数退避重试
+    - 清单（download_manifest.json）记录每个文件的 URL、ETag、大小和 sha256，
+      已下载且未变化的文件不再发起任何请求；--refresh 时用 If-None-Match 条件请求确认
+    - 边下载边写入临时文件并计算哈希，校验长度后原子替换，中断不会留下残缺的图片
+    """
+    def __init__(self, images_dir, manifest_path, api_base=DEFAULT_API_BASE, concurrency=8,
+                 timeout=15.0, retries=4, backoff=0.5, refresh=False, verify=False):
+        self.images_dir = Path(images_dir)
+        self.manifest_path = Path(manifest_path)
+        self.api_base = api_base.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.refresh = refresh
+        self.verify = verify
+        self.manifest = self.load_manifest()
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+
+    def save_manifest(self):
+        """写临时文件再原子替换"""
+        temp_path = self.manifest_path.with_suffix('.tmp')
+        with self.lock:
+            data = json.dumps(self.manifest, ensure_ascii=False, indent=2, sort_keys=True)
+        temp_path.write_text(data, encoding='utf-8')
+        os.replace(temp_path, self.manifest_path)
+
+    def with_retries(self, action, description):
+        """执行 action，遇到网络错误或临时状态码时退避重试"""
+        for attempt in range(self.retries + 1):
+            try:
+                return action()
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, RetryableError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                print(f"Retrying {description} in {delay:.1f}s ({e})")
+                time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        if response.status_code in RETRY_STATUS:
+            response.close()
+            raise RetryableError(f"HTTP {response.status_code}")
+        return response
+
+    def lookup_url(self, name):
+        """通过 API 查询图片地址"""
+        def action():
+            response = self.get(f"{self.api_base}/mygo/img?keyword={quote(name)}")
+            response.raise_for_status()
+            urls = response.json().get('urls') or []
+            return urls[0]['url'] if urls else None
+        return self.with_retries(action, f"lookup {name}")
+
+    def fetch(self, url, target, etag=None):
+        """流式下载到临时文件，返回 (状态, 清单字段)；状态为 'downloaded' 或 'unchanged'"""
+        def action():
+            headers = {'If-None-Match': etag} if etag else {}
+            with self.get(url, headers=headers, stream=True) as response:
+                if response.status_code == 304:
+                    return 'unchanged', None
+                response.raise_for_status()
+
+                # 每次尝试使用独立的临时文件，互不覆盖
+                temp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.part")
+                digest = hashlib.sha256()
+                size = 0
+                try:
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            size += len(chunk)
+                    expected = response.headers.get('Content-Length')
+                    if expected is not None and 'Content-Encoding' not in response.headers \
+                            and int(expected) != size:
+                        raise RetryableError(f"incomplete body: {size}/{expected} bytes")
+                    os.replace(temp_path, target)
+                finally:
+                    if temp_path.exists():
+                        temp_path.unlink()
+                return 'downloaded', {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'size': size,
+                    'sha256': digest.hexdigest()
+                }
+        return self.with_retries(action, f"download {target.name}")
+
+    def is_unchanged(self, target, entry):
+        """本地文件与清单一致（大小，--verify 时再比对 sha256）"""
+        if entry is None or not target.exists():
+            return False
+        if target.stat().st_size != entry.get('size'):
+            return False
+        return not self.verify or file_sha256(target) == entry.get('sha256')
+
+    def download(self, img_data):
+        """下载单张图片，返回 'downloaded' / 'unchanged' / 'skipped' / 'missing' / 'failed'"""
+        file_name = img_data.get('file_name')
+        try:
+            target = self.images_dir / file_name
+            with self.lock:
+                entry = self.manifest.get(file_name)
+
+            if self.is_unchanged(target, entry) and not self.refresh:
+                return 'skipped'
+            if entry is None and target.exists() and not self.refresh:
+                # 旧版下载的文件：登记到清单，不重新下载
+                with self.lock:
+                    self.manifest[file_name] = {
+                        'size': target.stat().st_size,
+                        'sha256': file_sha256(target)
+                    }
+                return 'skipped'
+
+            url = (entry or {}).get('url') or self.lookup_url(img_data['name'])
+            if not url:
+                print(f"No image found for: {img_data['name']}")
+                return 'missing'
+
+            etag = entry.get('etag') if self.is_unchanged(target, entry) else None
+            status, fields = self.fetch(url, target, etag)
+            if fields is not None:
+                with self.lock:
+                    self.manifest[file_name] = fields
+                print(f"Downloaded: {file_name}")
+            return status
+        except Exception as e:
+            print(f"Error downloading {file_name}: {e}")
+            return 'failed'
+
+    def run(self, items, concurrency):
+        """下载全部图片；同一 file_name 只下载一次（image_map.json 中有重复条目）"""
+        unique = {}
+        for item in items:
+            unique.setdefault(item.get('file_name'), item)
+        items = list(unique.values())
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                results = list(executor.map(self.download, items))
+            finally:
+                # 中断时也保存已完成的部分，下次从这里继续
+                self.save_manifest()
+        return results
 
-def download_image(img_data):
-    try:
-        file_name = img_data['file_name']
-        # 从服务器获取图片URL
-        response = requests.get(f"https://mygoapi.miyago9267.com/mygo/img?keyword={img_data['name']}")
-        if response.status_code == 200:
-            data = response.json()
-            if data['urls']:
-                img_url = data['urls'][0]['url']
-                img_response = requests.get(img_url)
-                if img_response.status_code == 200:
-                    img_path = Path(__file__).parent.parent / 'images' / file_name
-                    img_path.write_bytes(img_response.content)
-                    print(f"Downloaded: {file_name}")
-                    return True
-    except Exception as e:
-        print(f"Error downloading {file_name}: {e}")
-    return False
 
 def main():
-    # 创建images目录
-    images_dir = Path(__file__).parent.parent / 'images'
-    images_dir.mkdir(exist_ok=True)
-    
-    # 读取图片映射
-    map_path = Path(__file__).parent.parent / 'data' / 'image_map.json'
-    with open(map_path, 'r', encoding='utf-8') as f:
-        image_map = json.load(f)
-    
-    # 并行下载图片
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        results = list(executor.map(download_image, image_map))
-    
-    success = sum(1 for r in results if r)
-    print(f"\nDownloaded {success} of {len(image_map)} images")
+    parser = argparse.ArgumentParser(description="下载 image_map.json 中的全部表情包图片")
+    parser.add_argument('--api-base', default=DEFAULT_API_BASE, help="图片 API 地址（测试时可指向本地服务器）")
+    parser.add_argument('--map', default=str(BASE_PATH / 'data' / 'image_map.json'))
+    parser.add_argument('--images-dir', default=str(BASE_PATH / 'images'))
+    parser.add_argument('--manifest', default=str(BASE_PATH / 'data' / 'download_manifest.json'))
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=15.0)
+    parser.add_argument('--retries', type=int, default=4)
+    parser.add_argument('--backoff', type=float, default=0.5, help="首次重试前的等待秒数，之后每次翻倍")
+    parser.add_argument('--refresh', action='store_true', help="用条件请求确认已下载的文件是否有更新")
+    parser.add_argument('--verify', action='store_true', help="用 sha256 校验本地文件")
+    args = parser.parse_args()
+
+    images_dir = Path(args.images_dir)
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(args.map, 'r', encoding='utf-8') as f:
+        image_map = [item for item in json.load(f) if item.get('file_name')]
+
+    downloader = Downloader(
+        images_dir, args.manifest, args.api_base, args.concurrency,
+        args.timeout, args.retries, args.backoff, refresh=args.refresh, verify=args.verify
+    )
+    start = time.perf_counter()
+    results = downloader.run(image_map, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    counts = {status: results.count(status) for status in sorted(set(results))}
+    summary = ', '.join(f"{status} {count}" for status, count in counts.items())
+    print(f"\n{len(results)} images in {elapsed:.1f}s: {summary}")
+    return 1 if counts.get('failed') else 0
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+import argparse
+import sys
+import threading
+import time
+import tkinter as tk
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.dispatcher import TkDispatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量空闲 CPU 占用和热键到窗口的延迟")
+    parser.add_argument('--mode', choices=['poll', 'event'], default='event',
+                        help="poll: 旧的 10ms root.update() 轮询；event: 调度队列")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--hotkeys', type=int, default=20, help="模拟的热键次数")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.withdraw()
+    window = tk.Toplevel(root)
+    window.withdraw()
+    latencies = []
+
+    def show_window(pressed):
+        # 与 show_window 相同：显示窗口并等待绘制完成
+        window.deiconify()
+        window.lift()
+        window.update_idletasks()
+        latencies.append((time.perf_counter() - pressed) * 1000)
+        window.withdraw()
+
+    if args.mode == 'poll':
+        def update():
+            root.update()
+            root.after(10, update)
+        update()
+        # 旧实现中热键回调在钩子线程里直接调用 Tk
+        press = lambda: show_window(time.perf_counter())
+    else:
+        dispatcher = TkDispatcher(root)
+        press = lambda: dispatcher.post(show_window, time.perf_counter())
+
+    def simulate_hotkeys():
+        # 前一半时间保持空闲，后一半时间模拟按键
+        time.sleep(args.seconds / 2)
+        interval = args.seconds / 2 / (args.hotkeys + 1)
+        for _ in range(args.hotkeys):
+            time.sleep(interval)
+            press()
+
+    threading.Thread(target=simulate_hotkeys, daemon=True).start()
+
+    idle_cpu = {}
+
+    def mark_idle_end():
+        idle_cpu['cpu'] = time.process_time() - idle_cpu['start']
+
+    idle_cpu['start'] = time.process_time()
+    root.after(int(args.seconds / 2 * 1000), mark_idle_end)
+    root.after(int(args.seconds * 1000), root.quit)
+    root.mainloop()
+
+    idle_seconds = args.seconds / 2
+    print(f"模式: {args.mode}")
+    print(f"空闲 CPU: {idle_cpu['cpu'] / idle_seconds * 100:.2f}% "
+          f"（{idle_cpu['cpu'] * 1000:.0f} ms / {idle_seconds:.1f} s）")
+    if latencies:
+        latencies.sort()
+        print(f"热键到窗口延迟: 中位数 {latencies[len(latencies) // 2]:.2f} ms，"
+              f"最大 {latencies[-1]:.2f} ms（{len(latencies)} 次）")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
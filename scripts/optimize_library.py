@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.search_engine import SearchEngine, read_features
+from src.utils.optimized_tier import OptimizedTier, TIER_FORMATS
+
+BASE_PATH = Path(__file__).parent.parent
+
+
+def main():
+    send_config = read_features(BASE_PATH).get('send', {})
+    parser = argparse.ArgumentParser(description="把 images 中的图片缩放到发送尺寸并重新编码，生成解码更快的副本")
+    parser.add_argument('--max-dimension', type=int, default=send_config.get('max_dimension', 0),
+                        help="副本的最大边长，默认与 features.send.max_dimension 一致（0 为不缩放）")
+    parser.add_argument('--format', choices=sorted(TIER_FORMATS), default='jpeg')
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--progressive', action='store_true',
+                        help="生成渐进式 JPEG（本地解码比基线 JPEG 慢，一般不需要）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output-dir', default=str(BASE_PATH / 'data' / 'optimized'))
+    args = parser.parse_args()
+
+    engine = SearchEngine.from_base_path(BASE_PATH)
+    image_paths = engine.scan_images().values()
+    tier = OptimizedTier(args.output_dir, engine.images_path).load()
+
+    start = time.perf_counter()
+    try:
+        counts = tier.build(image_paths, args.max_dimension, args.format, args.quality, args.workers,
+                            args.progressive)
+    except ValueError as e:
+        print(e)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    stats = tier.stats()
+    print(f"{len(image_paths)} 张图片，用时 {elapsed:.1f}s: "
+          + ', '.join(f"{key} {value}" for key, value in counts.items()))
+    if stats['optimized']:
+        ratio = stats['optimized_bytes'] / max(1, stats['source_bytes'])
+        print(f"{stats['optimized']} 个副本: {stats['source_bytes'] / 1e6:.1f} MB -> "
+              f"{stats['optimized_bytes'] / 1e6:.1f} MB ({ratio:.0%})")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
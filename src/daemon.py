@@ -0,0 +1,264 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+import traceback
+from collections import Counter, deque
+from pathlib import Path
+
+from src.search_engine import SearchEngine, read_features
+from src.daemon_client import FRAME_HEADER, MAX_FRAME, DEFAULT_SOCKET, encode_frame, encode_message, connect
+from src.utils.library_watcher import LibraryWatcher
+from src.utils.image_catalog import ImageCatalog
+from src.utils.optimized_tier import OptimizedTier
+from src.utils.payload_cache import PayloadCache, SendProfile
+from src.utils.thumbnail_cache import ThumbnailDiskCache
+from src.utils.thumbnail_builder import make_thumbnail
+from src.utils.usage_log import UsageLog
+
+
+class MemeDaemon:
+    """常驻的查询守护进程
+
+    在一个进程中保持索引、已编码的剪贴板数据和缩略图缓存，
+    通过 Unix 套接字为多个客户端同时提供服务（协议见 daemon_client）。
+    搜索和编码在线程池中执行，不阻塞事件循环。
+    """
+    def __init__(self, engine: SearchEngine, payload_cache: PayloadCache,
+                 thumbnail_cache: ThumbnailDiskCache, socket_path=None, catalog: ImageCatalog = None,
+                 optimized: OptimizedTier = None, features: dict = None):
+        self.engine = engine
+        # config.json 中的 features，serve() 按其中的 usage/watch 开关配置，与界面一致
+        self.features = features or {}
+        self.catalog = catalog
+        self.optimized = optimized
+        self.payload_cache = payload_cache
+        self.thumbnail_cache = thumbnail_cache
+        self.socket_path = str(socket_path or DEFAULT_SOCKET)
+        self.request_counts = Counter()
+        self.latencies = deque(maxlen=1000)
+        self.clients = 0
+        self.watcher = None
+        self.bound = False
+        self.handlers = {
+            'ping': self.handle_ping,
+            'search': self.handle_search,
+            'search_many': self.handle_search_many,
+            'similar': self.handle_similar,
+            'payload': self.handle_payload,
+            'thumbnail': self.handle_thumbnail,
+            'stats': self.handle_stats
+        }
+
+    @classmethod
+    def from_base_path(cls, base_path, socket_path=None):
+        """按项目目录结构和 config/config.json 创建"""
+        base_path = Path(base_path)
+        features = read_features(base_path)
+        engine = SearchEngine(base_path / 'images', base_path / 'data', features.get('search', {}))
+        catalog = None
+        if features.get('catalog', {}).get('enabled', True):
+            catalog = ImageCatalog(base_path / 'data' / 'cache' / 'catalog.json').load()
+        optimized = None
+        if features.get('optimized', {}).get('enabled', True):
+            optimized = OptimizedTier(base_path / 'data' / 'optimized', engine.images_path).load()
+        send_profile = SendProfile.from_config(features.get('send', {}))
+        payload_cache = PayloadCache(
+            features.get('clipboard', {}).get('payload_cache_bytes', 64 * 1024 * 1024),
+            send_profile,
+            canonical=catalog.canonical if catalog else None,
+            resolve=optimized.resolve if optimized and optimized.covers(send_profile.max_dimension) else None
+        )
+        thumbnail_size = features.get('display', {}).get('thumbnail_size', 100)
+        thumbnail_cache = ThumbnailDiskCache(base_path / 'data' / 'cache', thumbnail_size)
+        return cls(engine, payload_cache, thumbnail_cache, socket_path, catalog, optimized, features)
+
+    def resolve(self, request):
+        """请求中的 name 或 path 对应的图片路径，只允许索引中的图片"""
+        name = request.get('name')
+        if name is not None:
+            path = self.engine.image_map.get(str(name).lower())
+        else:
+            path = request.get('path')
+            if path is not None and not self.engine.contains_path(path):
+                path = None
+        if path is None:
+            raise KeyError(f"未知的图片: {name or request.get('path')}")
+        return path
+
+    # 请求处理（在线程池中执行），返回 (应答, 二进制数据或 None)
+    def handle_ping(self, request):
+        return {'entries': len(self.engine)}, None
+
+    def handle_search(self, request):
+        return {'results': self.engine.search(request.get('query', ''), request.get('k'))}, None
+
+    def handle_search_many(self, request):
+        return {'results': self.engine.search_many(request.get('queries', []), request.get('k'))}, None
+
+    def handle_similar(self, request):
+        if self.catalog is None:
+            raise ValueError("图片目录未启用")
+        results = self.engine.similar(self.catalog, self.resolve(request), request.get('k'))
+        return {'results': results}, None
+
+    def handle_payload(self, request):
+        payload = self.payload_cache.get(self.resolve(request))
+        return {'format': payload.format, 'size': list(payload.size)}, payload.data
+
+    def handle_thumbnail(self, request):
+        path = self.resolve(request)
+        if self.catalog is not None:
+            path = self.catalog.canonical(path)
+        cache_file = self.thumbnail_cache.cache_file(path)
+        if cache_file is None:
+            raise FileNotFoundError(path)
+        if not cache_file.exists():
+            source = self.optimized.resolve(path) if self.optimized is not None else path
+            self.thumbnail_cache.store(path, make_thumbnail(source, self.thumbnail_cache.thumbnail_size))
+        return {}, cache_file.read_bytes()
+
+    def handle_stats(self, request):
+        latencies = sorted(self.latencies)
+        return {
+            'entries': len(self.engine),
+            'clients': self.clients,
+            'requests': dict(self.request_counts),
+            'median_ms': latencies[len(latencies) // 2] if latencies else 0.0,
+            'max_ms': latencies[-1] if latencies else 0.0,
+            'payload_cache': self.payload_cache.stats()
+        }, None
+
+    async def dispatch(self, body: bytes):
+        loop = asyncio.get_event_loop()
+        request_id = None
+        start = time.perf_counter()
+        try:
+            request = json.loads(body.decode('utf-8'))
+            request_id = request.get('id')
+            op = request.get('op')
+            handler = self.handlers.get(op)
+            if handler is None:
+                raise ValueError(f"未知的请求: {op}")
+            self.request_counts[op] += 1
+            response, data = await loop.run_in_executor(None, handler, request)
+            response['ok'] = True
+        except Exception as e:
+            response, data = {'ok': False, 'error': str(e)}, None
+        response['id'] = request_id
+        if data is not None:
+            response['binary'] = True
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        return response, data
+
+    async def handle_client(self, reader, writer):
+        """同一连接上的请求按顺序应答，不同连接之间并发"""
+        self.clients += 1
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(FRAME_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                length, = FRAME_HEADER.unpack(header)
+                if length > MAX_FRAME:
+                    print(f"请求过大，断开连接: {length} 字节")
+                    break
+                response, data = await self.dispatch(await reader.readexactly(length))
+                writer.write(encode_message(response))
+                if data is not None:
+                    writer.write(encode_frame(data))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"处理客户端请求失败: {e}")
+            traceback.print_exc()
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    def remove_stale_socket(self):
+        """删除上次异常退出留下的套接字文件；已有守护进程在运行时报错"""
+        if not os.path.exists(self.socket_path):
+            return
+        client = connect(self.socket_path, timeout=1.0)
+        if client is not None:
+            client.close()
+            raise RuntimeError(f"守护进程已在运行: {self.socket_path}")
+        os.unlink(self.socket_path)
+
+    def on_library_event(self, event):
+        if event.kind in ('removed', 'renamed'):
+            self.engine.remove(event.old_path or event.path)
+            if self.catalog is not None:
+                self.catalog.forget(event.old_path or event.path)
+        if event.kind in ('added', 'modified', 'renamed'):
+            self.engine.add(event.path)
+            if self.catalog is not None:
+                self.catalog.forget(event.path)
+        print(f"图片库变化: {event}")
+
+    async def serve(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise RuntimeError("当前平台不支持 Unix 套接字")
+        # 与 MemeSelector.init_components 相同：发送记录参与排名，结果与界面一致
+        usage_config = self.features.get('usage', {})
+        if usage_config.get('enabled', True) and self.engine.usage is None:
+            self.engine.usage = UsageLog(
+                self.engine.data_path / 'usage.log', usage_config.get('half_life_days', 14)
+            ).load()
+        self.engine.load()
+        print(f"加载了 {len(self.engine)} 个图片映射")
+        if self.catalog is not None:
+            # 哈希在后台计算，完成前重复的图片各自编码
+            stale = self.catalog.discard_stale(self.engine.image_map.values())
+            asyncio.get_event_loop().run_in_executor(None, self.catalog.compute, stale)
+
+        watch_config = self.features.get('watch', {})
+        if watch_config.get('enabled', True):
+            self.watcher = LibraryWatcher(
+                self.engine.images_path, self.on_library_event,
+                watch_config.get('backend', 'auto'), watch_config.get('poll_interval', 2.0)
+            )
+            self.watcher.start()
+            print(f"图片目录监视: {self.watcher.backend}")
+
+        self.remove_stale_socket()
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        self.bound = True
+        os.chmod(self.socket_path, 0o600)
+        print(f"守护进程已启动: {self.socket_path}")
+        async with server:
+            serving = asyncio.ensure_future(server.serve_forever())
+            # Ctrl+C 和 SIGTERM 都正常退出并删除套接字文件
+            loop = asyncio.get_event_loop()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, serving.cancel)
+            try:
+                await serving
+            except asyncio.CancelledError:
+                print("\n接收到退出信号")
+
+    def run(self):
+        """运行直到 Ctrl+C"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\n接收到退出信号")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.payload_cache.shutdown()
+        if self.bound:
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        print(f"守护进程已停止，请求统计: {dict(self.request_counts)}")
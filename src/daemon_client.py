@@ -0,0 +1,110 @@
+import json
+import socket
+import struct
+from pathlib import Path
+
+# 帧格式：4 字节大端长度 + 内容。请求和应答都是 JSON 帧，
+# 带二进制数据的应答（payload、thumbnail）在 JSON 帧之后再跟一个原始数据帧。
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME = 64 * 1024 * 1024
+
+DEFAULT_SOCKET = Path(__file__).parent.parent / 'data' / 'cache' / 'meme.sock'
+
+
+def encode_frame(data: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(data)) + data
+
+
+def encode_message(message: dict) -> bytes:
+    return encode_frame(json.dumps(message, ensure_ascii=False).encode('utf-8'))
+
+
+class DaemonError(Exception):
+    """守护进程返回的错误"""
+
+
+class MemeClient:
+    """查询守护进程的同步客户端
+
+    只依赖标准库的 socket，脚本导入后几乎没有启动开销。
+    """
+    def __init__(self, socket_path=None, timeout: float = 5.0):
+        self.socket_path = str(socket_path or DEFAULT_SOCKET)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.sock.close()
+
+    def _recv_exact(self, length: int) -> bytes:
+        chunks = []
+        while length:
+            chunk = self.sock.recv(min(length, 1024 * 1024))
+            if not chunk:
+                raise ConnectionError("守护进程已断开连接")
+            chunks.append(chunk)
+            length -= len(chunk)
+        return b''.join(chunks)
+
+    def _recv_frame(self) -> bytes:
+        length, = FRAME_HEADER.unpack(self._recv_exact(FRAME_HEADER.size))
+        if length > MAX_FRAME:
+            raise ConnectionError(f"应答过大: {length} 字节")
+        return self._recv_exact(length)
+
+    def request(self, op: str, **params):
+        """发送请求，返回 (应答, 二进制数据或 None)"""
+        self.next_id += 1
+        self.sock.sendall(encode_message(dict(params, op=op, id=self.next_id)))
+        response = json.loads(self._recv_frame().decode('utf-8'))
+        data = self._recv_frame() if response.get('binary') else None
+        if not response.get('ok'):
+            raise DaemonError(response.get('error', '未知错误'))
+        return response, data
+
+    def ping(self) -> dict:
+        return self.request('ping')[0]
+
+    def search(self, query: str, k: int = None) -> list:
+        return self.request('search', query=query, k=k)[0]['results']
+
+    def search_many(self, queries, k: int = None) -> list:
+        return self.request('search_many', queries=list(queries), k=k)[0]['results']
+
+    def similar(self, name: str = None, path: str = None, k: int = None) -> list:
+        """视觉上相似的图片，结果格式与 search 相同"""
+        return self.request('similar', name=name, path=path, k=k)[0]['results']
+
+    def payload(self, name: str = None, path: str = None):
+        """已按发送配置编码的剪贴板数据：(格式, (宽, 高), 数据)"""
+        response, data = self.request('payload', name=name, path=path)
+        return response['format'], tuple(response['size']), data
+
+    def thumbnail(self, name: str = None, path: str = None) -> bytes:
+        """缩略图 PNG 数据"""
+        return self.request('thumbnail', name=name, path=path)[1]
+
+    def stats(self) -> dict:
+        return self.request('stats')[0]
+
+
+def connect(socket_path=None, timeout: float = 5.0):
+    """连接正在运行的守护进程，未运行时返回 None"""
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    try:
+        return MemeClient(socket_path, timeout)
+    except OSError:
+        return None
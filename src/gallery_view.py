@@ -0,0 +1,252 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import deque
+import time
+import traceback
+
+from src.utils.lru_cache import LRUCache
+
+
+class GalleryView:
+    """单个 Canvas 上的网格画廊
+
+    缩略图是 Canvas 上的图片项，数量只与可见格子数有关（虚拟滚动），
+    每个格子的图片从图集页面中按偏移表复制，点击和悬停通过坐标计算命中的格子，
+    不为每个结果创建控件。接口与 VirtualResultList 一致，可以在弹窗中互换。
+    """
+    def __init__(self, parent, thumbnail_size, atlas, get_thumbnail, on_click,
+                 on_focus=None, on_context=None, resolve=None, max_pages: int = 16,
+                 font=None, hover_color='#f0f0f0'):
+        self.thumbnail_size = thumbnail_size
+        self.atlas = atlas
+        self.get_thumbnail = get_thumbnail
+        self.on_click = on_click
+        self.on_focus = on_focus
+        self.on_context = on_context
+        self.resolve = resolve or str
+        self.cell_width = thumbnail_size + 8
+        self.cell_height = thumbnail_size + 26
+        self.results = []
+        self.offset = 0
+        self.columns = 1
+        self.tiles = []
+        self.hovered = None
+        self.render_times = deque(maxlen=100)
+        # 已加载的图集页面（Tk 自行解码 PNG），按 LRU 淘汰
+        self.pages = LRUCache(max_entries=max_pages)
+        self.page_generation = atlas.generation
+
+        self.frame = ttk.Frame(parent)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scroll)
+        self.canvas = tk.Canvas(self.frame, highlightthickness=0, background='white')
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.highlight = self.canvas.create_rectangle(0, 0, 0, 0, fill=hover_color, outline='', state='hidden')
+        self.font = font
+
+        self.canvas.bind('<Configure>', self.on_resize)
+        self.canvas.bind('<Button-1>', lambda e: self.on_press(e, self.on_click_result))
+        self.canvas.bind('<Button-3>', lambda e: self.on_press(e, self.on_context))
+        self.canvas.bind('<Motion>', self.on_motion)
+        self.canvas.bind('<Leave>', lambda e: self.set_hovered(None))
+        self.canvas.bind('<MouseWheel>', lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        self.canvas.bind('<Button-4>', lambda e: self.scroll_by(-1))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll_by(1))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    @property
+    def total_height(self):
+        rows = -(-len(self.results) // self.columns)
+        return rows * self.cell_height
+
+    def ensure_tiles(self, count):
+        """按需补足格子（图片项、名称项和各自的 PhotoImage），只增不减"""
+        while len(self.tiles) < count:
+            photo = tk.PhotoImage(master=self.canvas)
+            image_item = self.canvas.create_image(0, 0, anchor='center', state='hidden')
+            text_item = self.canvas.create_text(
+                0, 0, anchor='n', text='', font=self.font, state='hidden'
+            )
+            # 最后两项是当前显示的结果序号和直接使用的 PhotoImage（图集未命中时）
+            self.tiles.append([image_item, text_item, photo, None, None])
+
+    def on_resize(self, event):
+        columns = max(1, event.width // self.cell_width)
+        rows = event.height // self.cell_height + 2
+        if columns != self.columns:
+            # 保持第一个可见结果不变
+            first = (self.offset // self.cell_height) * self.columns
+            self.columns = columns
+            self.offset = (first // columns) * self.cell_height
+        self.ensure_tiles(columns * rows)
+        for tile in self.tiles:
+            tile[3] = None
+        self.scroll_to(self.offset)
+
+    def set_results(self, results):
+        """更新结果并回到顶部"""
+        self.results = results
+        self.offset = 0
+        for tile in self.tiles:
+            tile[3] = None
+        return self.render()
+
+    def reload(self):
+        """图集更新后丢弃已加载的页面并重绘"""
+        if self.atlas.generation != self.page_generation:
+            self.page_generation = self.atlas.generation
+            self.pages.clear()
+            for tile in self.tiles:
+                tile[3] = None
+            self.render()
+
+    def max_offset(self):
+        return max(0, self.total_height - self.canvas.winfo_height())
+
+    def scroll_to(self, offset):
+        self.offset = min(max(0, int(offset)), self.max_offset())
+        self.render()
+
+    def scroll_by(self, rows):
+        """滚轮每次滚动半行"""
+        self.scroll_to(self.offset + rows * self.cell_height // 2)
+
+    def on_scroll(self, action, amount, unit=None):
+        """滚动条回调"""
+        if action == 'moveto':
+            self.scroll_to(float(amount) * self.total_height)
+        elif action == 'scroll':
+            step = int(amount) * self.cell_height
+            if unit == 'pages':
+                step = int(amount) * max(self.cell_height, self.canvas.winfo_height() - self.cell_height)
+            self.scroll_to(self.offset + step)
+
+    def index_at(self, x, y):
+        """命中测试：坐标所在格子的结果序号，空白处返回 None"""
+        col = int(x) // self.cell_width
+        if col >= self.columns:
+            return None
+        index = (int(y) + self.offset) // self.cell_height * self.columns + col
+        return index if 0 <= index < len(self.results) else None
+
+    def on_press(self, event, callback):
+        index = self.index_at(event.x, event.y)
+        if callback is not None and index is not None:
+            callback(self.results[index])
+
+    def on_click_result(self, result):
+        self.on_click(result['path'])
+
+    def on_motion(self, event):
+        self.set_hovered(self.index_at(event.x, event.y))
+
+    def set_hovered(self, index):
+        if index == self.hovered:
+            return
+        self.hovered = index
+        self.place_highlight()
+        if index is not None and self.on_focus:
+            self.on_focus(self.results[index])
+
+    def place_highlight(self):
+        if self.hovered is None:
+            self.canvas.itemconfigure(self.highlight, state='hidden')
+            return
+        row, col = divmod(self.hovered, self.columns)
+        x = col * self.cell_width
+        y = row * self.cell_height - self.offset
+        self.canvas.coords(self.highlight, x, y, x + self.cell_width, y + self.cell_height)
+        self.canvas.itemconfigure(self.highlight, state='normal')
+
+    def load_page(self, page):
+        photo = self.pages.get(page)
+        if photo is None:
+            photo = tk.PhotoImage(master=self.canvas, file=str(self.atlas.page_file(page)))
+            self.pages.put(page, photo)
+        return photo
+
+    def show_tile(self, tile, result):
+        """把结果的缩略图放进格子：优先从图集页面复制，否则使用单独的缩略图"""
+        image_item, _, photo, _, _ = tile
+        path = self.resolve(result['path'])
+        location = self.atlas.locate(path)
+        if location is not None:
+            try:
+                page, x, y, width, height = location
+                source = self.load_page(page)
+                photo.blank()
+                photo.configure(width=width, height=height)
+                photo.tk.call(photo, 'copy', source, '-from', x, y, x + width, y + height, '-to', 0, 0)
+                tile[4] = None
+                self.canvas.itemconfigure(image_item, image=photo)
+                return
+            except tk.TclError as e:
+                # 页面文件缺失或损坏时退回单独的缩略图
+                print(f"读取图集页面失败: {e}")
+        tile[4] = self.get_thumbnail(result['name'], result['path'])
+        self.canvas.itemconfigure(image_item, image=tile[4] or '')
+
+    def render(self):
+        """把可见区域的结果放进格子，返回耗时（毫秒）"""
+        start = time.perf_counter()
+        try:
+            first_row, shift = divmod(self.offset, self.cell_height)
+            first = first_row * self.columns
+            max_chars = max(2, self.thumbnail_size // 13)
+            for i, tile in enumerate(self.tiles):
+                image_item, text_item = tile[0], tile[1]
+                index = first + i
+                if index >= len(self.results):
+                    self.canvas.itemconfigure(image_item, state='hidden')
+                    self.canvas.itemconfigure(text_item, state='hidden')
+                    tile[3] = None
+                    continue
+
+                result = self.results[index]
+                row, col = divmod(i, self.columns)
+                x = col * self.cell_width + self.cell_width // 2
+                y = row * self.cell_height - shift
+                # 只有格子显示的结果变化时才重新复制图片
+                if tile[3] != index:
+                    tile[3] = index
+                    self.show_tile(tile, result)
+                    name = result['alt']
+                    self.canvas.itemconfigure(
+                        text_item, text=name if len(name) <= max_chars else name[:max_chars - 1] + '…'
+                    )
+                self.canvas.coords(image_item, x, y + 4 + self.thumbnail_size // 2)
+                self.canvas.coords(text_item, x, y + self.thumbnail_size + 6)
+                self.canvas.itemconfigure(image_item, state='normal')
+                self.canvas.itemconfigure(text_item, state='normal')
+
+            self.place_highlight()
+            total = self.total_height
+            if total:
+                height = self.canvas.winfo_height()
+                self.scrollbar.set(self.offset / total, min(1.0, (self.offset + height) / total))
+            else:
+                self.scrollbar.set(0, 1)
+
+        except Exception as e:
+            print(f"渲染网格画廊失败: {e}")
+            traceback.print_exc()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.render_times.append(elapsed)
+        return elapsed
+
+    def render_stats(self):
+        """最近若干次渲染的耗时统计（毫秒）"""
+        if not self.render_times:
+            return {'count': 0, 'last': 0.0, 'avg': 0.0, 'max': 0.0}
+        return {
+            'count': len(self.render_times),
+            'last': self.render_times[-1],
+            'avg': sum(self.render_times) / len(self.render_times),
+            'max': max(self.render_times)
+        }
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 import json
 import re
 import traceback
@@ -8,8 +7,24 @@ from pathlib import Path
 import threading
 from queue import Queue
 import time
-import keyboard
-from io import BytesIO
+from collections import deque
+from src.utils.search_index import LazyConverter
+from src.search_engine import SearchEngine, DEFAULT_SEARCH_CONFIG
+from src.utils.thumbnail_cache import ThumbnailDiskCache
+from src.utils.thumbnail_builder import ThumbnailBuilder, make_thumbnail
+from src.utils.lru_cache import LRUCache
+from src.utils.search_worker import SearchWorker
+from src.result_list import VirtualResultList
+from src.gallery_view import GalleryView
+from src.utils.clipboard import get_clipboard_backend
+from src.utils.payload_cache import PayloadCache, SendProfile
+from src.utils.dispatcher import TkDispatcher
+from src.utils.library_watcher import LibraryWatcher
+from src.utils.startup_profiler import StartupProfiler
+from src.utils.image_catalog import ImageCatalog
+from src.utils.optimized_tier import OptimizedTier
+from src.utils.thumbnail_atlas import ThumbnailAtlas
+from src.utils.usage_log import UsageLog
 
 class MemeSelector:
     """表情包选择器类"""
@@ -25,14 +40,41 @@ class MemeSelector:
                 'position': {'x': None, 'y': None}
             },
             'features': {
-                'search': {
-                    'score_threshold': 10,
-                    'max_results': 20,
-                    'min_length': 1
+                'search': dict(DEFAULT_SEARCH_CONFIG),
+                'clipboard': {
+                    'backend': 'auto',
+                    'payload_cache_bytes': 64 * 1024 * 1024
+                },
+                'send': {
+                    'max_dimension': 0,
+                    'format': 'dib',
+                    'jpeg_quality': 85
+                },
+                'catalog': {
+                    'enabled': True,
+                    'similar_distance': 16
+                },
+                'optimized': {
+                    'enabled': True
+                },
+                'usage': {
+                    'enabled': True,
+                    'half_life_days': 14,
+                    'most_used': 30
+                },
+                'watch': {
+                    'enabled': True,
+                    'backend': 'auto',
+                    'poll_interval': 2.0
                 },
                 'display': {
+                    'view': 'list',
                     'thumbnail_size': 100,
-                    'max_name_length': 30
+                    'max_name_length': 30,
+                    'thumbnail_cache': {
+                        'max_entries': 200,
+                        'max_bytes': 16 * 1024 * 1024
+                    }
                 }
             },
             'style': {
@@ -71,10 +113,11 @@ class MemeSelector:
             traceback.print_exc()
             return self.get_default_config()
 
-    def __init__(self, root=None):
+    def __init__(self, root=None, profiler=None):
         """初始化表情包选择器"""
         try:
             print("初始化表情包选择器...")
+            self.profiler = profiler or StartupProfiler()
             
             # 1. 基础设置
             self.root = root or tk.Tk()
@@ -88,52 +131,27 @@ class MemeSelector:
             self.data_path = self.base_path / 'data'
             
             # 3. 加载配置
-            self.config = self.load_config()
+            with self.profiler.phase('配置'):
+                self.config = self.load_config()
             print("配置加载完成")
             
-            # 4. 初始化转换器
-            try:
-                import opencc
-                self.t2s = opencc.OpenCC('t2s')
-                self.s2t = opencc.OpenCC('s2t')
-                print("OpenCC 转换器初始化成功")
-            except Exception as e:
-                print(f"警告: OpenCC 初始化失败，将使用简单转换: {e}")
-                self.t2s = lambda x: x
-                self.s2t = lambda x: x
-            
-            # 5. 初始化变量
-            self.current_window = None
-            self.search_var = tk.StringVar(self.root)
-            self.pinyin_buffer = ""
-            self.photo_references = {}
-            self.last_search = ""
-            self.search_results = []
-            
-            # 6. 创建自定义样式
-            self.style = ttk.Style()
-            self.style.configure('Result.TFrame', padding=5)
-            self.style.configure('Hover.TFrame', background='#f0f0f0')
-            self.style.configure('ResultText.TLabel', 
-                               font=(self.config['style']['font_family'], 
-                                    self.config['style']['font_size']))
-            
-            # 7. 创建提示标签
-            self.toast_label = ttk.Label(
-                self.root,
-                text="",
-                style='Toast.TLabel',
-                background=self.config['style']['toast_bg'],
-                foreground=self.config['style']['toast_fg'],
-                padding=10
-            )
+            # 4. 初始化转换器（首次转换时才导入 OpenCC，实际耗时由转换器记入启动计时）
+            self.t2s = LazyConverter('t2s', self.profiler)
+            self.s2t = LazyConverter('s2t', self.profiler)
             
-            # 8. 加载图片映射
-            self.image_map = self.load_image_map()
+            # 5. 初始化组件
+            with self.profiler.phase('组件'):
+                self.init_components()
+            
+            # 6. 加载图片映射（构建索引时才真正加载 OpenCC 和 pypinyin）
+            with self.profiler.phase('图片映射'):
+                self.image_map = self.load_image_map()
+                self.refresh_most_used()
             print(f"加载了 {len(self.image_map)} 个图片映射")
             
-            # 9. 预加载图片
-            self.preload_images()
+            # 7. 预加载缩略图和目录监视不影响搜索，等主循环启动后再执行
+            self.library_watcher = None
+            self.dispatcher.post(self.start_background_tasks)
             
             print("表情包选择器初始化完成")
             
@@ -142,42 +160,140 @@ class MemeSelector:
             traceback.print_exc()
             raise
 
-    def load_image_map(self):
-        """加载图片映射"""
+    def init_components(self):
+        """创建调度队列、索引、缓存、后台线程和样式"""
+        # 其他线程（热键、后台搜索、缩略图）通过调度队列回到 Tk 线程
+        self.dispatcher = TkDispatcher(self.root)
+        self.current_window = None
+        self.search_var = tk.StringVar(self.root)
+        self.pinyin_buffer = ""
+        self.last_search = ""
+        self.search_results = []
+        # 搜索逻辑在不依赖 Tk 的 SearchEngine 中
+        self.search_engine = SearchEngine(
+            self.images_path, self.data_path,
+            self.config['features']['search'],
+            self.t2s, self.s2t
+        )
+        self.search_index = self.search_engine.index
+        # 发送记录：搜索排名混入使用频率和最近程度，空搜索时显示最常用的图片
+        usage_config = self.config['features']['usage']
+        self.usage = None
+        if usage_config['enabled']:
+            self.usage = UsageLog(self.data_path / 'usage.log', usage_config['half_life_days']).load()
+            self.search_engine.usage = self.usage
+        self.most_used_results = []
+        # scripts/optimize_library.py 生成的优化副本，解码时优先读取
+        self.optimized = OptimizedTier(self.data_path / 'optimized', self.images_path)
+        if self.config['features']['optimized']['enabled']:
+            self.optimized.load()
+        display_config = self.config['features']['display']
+        thumbnail_size = display_config['thumbnail_size']
+        self.thumbnail_cache = ThumbnailDiskCache(self.data_path / 'cache', thumbnail_size)
+        # 网格画廊使用的缩略图图集，预加载完成后在后台更新
+        self.atlas = ThumbnailAtlas(self.data_path / 'cache', thumbnail_size).load()
+        self.view = display_config['view']
+        self.thumbnail_builder = ThumbnailBuilder(
+            thumbnail_size, self.data_path / 'cache', return_pixels=False,
+            on_ready=lambda: self.dispatcher.post_once(self.deliver_thumbnails),
+            resolve=self.optimized.resolve
+        )
+        # 内存中只保留有限数量的 PhotoImage，按 LRU 淘汰
+        self.photo_cache = LRUCache(
+            max_entries=display_config['thumbnail_cache']['max_entries'],
+            max_bytes=display_config['thumbnail_cache']['max_bytes'],
+            sizeof=lambda photo: photo.width() * photo.height() * 4
+        )
+        self.pending_thumbnails = {}
+        
+        # 搜索在后台线程中进行，结果通过调度队列交回 Tk 线程
+        self.search_worker = SearchWorker(
+            self.find_memes,
+            self.show_search_results,
+            self.dispatcher.post
+        )
+        self.search_var.trace_add('write', self.update_search)
+        
+        # 内容相同的图片共用缩略图和剪贴板数据
+        self.catalog = ImageCatalog(self.data_path / 'cache' / 'catalog.json')
+        if self.config['features']['catalog']['enabled']:
+            self.catalog.load()
+        
+        # 剪贴板后端和已编码数据缓存
+        clipboard_config = self.config['features']['clipboard']
+        self.clipboard = get_clipboard_backend(clipboard_config['backend'])
+        send_profile = SendProfile.from_config(self.config['features']['send'])
+        self.payload_cache = PayloadCache(
+            clipboard_config['payload_cache_bytes'],
+            send_profile,
+            canonical=self.catalog.canonical,
+            # 副本分辨率低于发送尺寸时仍从原图编码
+            resolve=self.optimized.resolve if self.optimized.covers(send_profile.max_dimension) else None
+        )
+        self.send_latencies = deque(maxlen=100)
+        print(f"剪贴板后端: {self.clipboard.name}")
+        
+        # 创建自定义样式
+        self.style = ttk.Style()
+        self.style.configure('Result.TFrame', padding=5)
+        self.style.configure('Hover.TFrame', background='#f0f0f0')
+        self.style.configure('ResultText.TLabel', 
+                           font=(self.config['style']['font_family'], 
+                                self.config['style']['font_size']))
+        
+        # 创建提示标签
+        self.toast_label = ttk.Label(
+            self.root,
+            text="",
+            style='Toast.TLabel',
+            background=self.config['style']['toast_bg'],
+            foreground=self.config['style']['toast_fg'],
+            padding=10
+        )
+
+    def start_background_tasks(self):
+        """主循环启动后预加载缩略图、更新图片目录并开始监视图片目录"""
         try:
-            image_map = {}
-            for image_path in self.images_path.glob('**/*'):
-                if image_path.is_file() and image_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif']:
-                    relative_path = image_path.relative_to(self.images_path)
-                    name = relative_path.stem.lower()  # 转换为小写以便搜索
-                    image_map[name] = str(image_path)
-            return image_map
+            # 先丢弃已变化文件的哈希，预加载时不会误用过期的重复关系
+            stale = None
+            if self.config['features']['catalog']['enabled']:
+                stale = self.catalog.discard_stale(self.image_map.values())
+            
+            with self.profiler.phase('预加载'):
+                self.preload_images()
+            
+            if stale is not None:
+                threading.Thread(
+                    target=self.update_catalog, args=(stale,), name='ImageCatalog', daemon=True
+                ).start()
+            
+            # fuzzywuzzy、NumPy 和模糊匹配矩阵在就绪后于后台准备，第一次搜索不必等待
+            threading.Thread(target=self.search_index.prepare, name='SearchPrepare', daemon=True).start()
+            
+            # 监视图片目录，增删改逐条更新索引和缩略图
+            watch_config = self.config['features']['watch']
+            if watch_config['enabled']:
+                with self.profiler.phase('目录监视'):
+                    self.library_watcher = LibraryWatcher(
+                        self.images_path,
+                        lambda event: self.dispatcher.post(self.apply_library_event, event),
+                        watch_config['backend'],
+                        watch_config['poll_interval']
+                    )
+                    self.library_watcher.start()
+                print(f"图片目录监视: {self.library_watcher.backend}")
         except Exception as e:
-            print(f"加载图片映射失败: {e}")
+            print(f"启动后台任务失败: {e}")
             traceback.print_exc()
-            return {}
 
-    def preload_images(self):
-        """预加载图片缩略图"""
+    def update_catalog(self, stale):
+        """在后台线程中计算变化文件的哈希"""
         try:
-            total = len(self.image_map)
-            success = 0
-            thumbnail_size = self.config['features']['display']['thumbnail_size']
-            
-            for name, path in self.image_map.items():
-                try:
-                    image = Image.open(path)
-                    image.thumbnail((thumbnail_size, thumbnail_size))
-                    photo = ImageTk.PhotoImage(image)
-                    self.photo_references[name] = photo
-                    success += 1
-                except Exception as e:
-                    print(f"预加载图片失败 {path}: {e}")
-                    
-            print(f"预加载完成: 成功 {success}/{total} 个图片")
-            
+            computed = self.catalog.compute(stale)
+            duplicates = self.catalog.exact_duplicates()
+            print(f"图片目录: 重新计算 {computed} 个，{len(duplicates)} 组完全重复的图片共用缩略图和剪贴板数据")
         except Exception as e:
-            print(f"预加载过程失败: {e}")
+            print(f"更新图片目录失败: {e}")
             traceback.print_exc()
 
     def check_directories(self):
@@ -197,65 +313,192 @@ class MemeSelector:
             return False
 
     def load_image_map(self):
-        """加载图片映射"""
-        try:
-            image_map = {}
-            for image_path in self.images_path.glob('**/*'):
-                if image_path.is_file() and image_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif']:
-                    relative_path = image_path.relative_to(self.images_path)
-                    name = relative_path.stem.lower()  # 转换为小写以便搜索
-                    image_map[name] = str(image_path)
-            return image_map
-        except Exception as e:
-            print(f"加载图片映射失败: {e}")
-            traceback.print_exc()
-            return {}
+        """加载图片映射并构建搜索索引"""
+        return self.search_engine.load()
 
     def preload_images(self):
-        """预加载图片缩略图"""
+        """预热缩略图磁盘缓存
+
+        这里不再解码任何缩略图，只检查磁盘缓存是否存在；
+        缩略图在结果行真正显示时才按需解码（见 get_thumbnail）。
+        """
         try:
-            total = len(self.image_map)
-            success = 0
-            thumbnail_size = self.config['features']['display']['thumbnail_size']
-            
+            # 内容相同的图片只需要一个缩略图
+            paths = {}
             for name, path in self.image_map.items():
-                try:
-                    image = Image.open(path)
-                    image.thumbnail((thumbnail_size, thumbnail_size))
-                    photo = ImageTk.PhotoImage(image)
-                    self.photo_references[name] = photo
-                    success += 1
-                except Exception as e:
-                    print(f"预加载图片失败 {path}: {e}")
-                    
-            print(f"预加载完成: 成功 {success}/{total} 个图片")
+                paths.setdefault(self.catalog.canonical(path), name)
+            total = len(paths)
+            self.thumbnail_cache.reset_usage()
+            self.thumbnail_builder.shutdown(cancel=True)
+            self.pending_thumbnails = {}
+            
+            for path, name in paths.items():
+                if not self.thumbnail_cache.contains(path):
+                    self.pending_thumbnails[path] = name
+            
+            print(f"缩略图缓存命中 {total - len(self.pending_thumbnails)}/{total} 个")
+            
+            # 未命中的图片交给进程池并行生成，完成后分批交付，不阻塞弹窗
+            if self.pending_thumbnails:
+                print(f"后台生成 {len(self.pending_thumbnails)} 个缩略图...")
+                self.thumbnail_builder.submit(self.pending_thumbnails.keys())
+            else:
+                self.finish_preload()
             
         except Exception as e:
             print(f"预加载过程失败: {e}")
             traceback.print_exc()
 
+    def deliver_thumbnails(self):
+        """在 Tk 线程中分批接收已生成的缩略图"""
+        try:
+            for path, _ in self.thumbnail_builder.drain():
+                self.pending_thumbnails.pop(path, None)
+                    
+            if not self.thumbnail_builder.busy:
+                self.finish_preload()
+            elif self.thumbnail_builder.has_finished():
+                # 一批没取完，让出 Tk 线程后继续
+                self.dispatcher.post_once(self.deliver_thumbnails)
+                
+        except Exception as e:
+            print(f"接收缩略图失败: {e}")
+            traceback.print_exc()
+
+    def finish_preload(self):
+        """预加载结束后清理失效缓存，并在后台把缩略图同步到图集"""
+        removed = self.thumbnail_cache.prune()
+        print(f"预加载完成: {len(self.image_map)} 个缩略图，清理失效缓存 {removed} 个")
+        paths = {self.catalog.canonical(path) for path in self.image_map.values()}
+        threading.Thread(target=self.update_atlas, args=(paths,), name='ThumbnailAtlas', daemon=True).start()
+
+    def update_atlas(self, paths):
+        """在后台线程中更新缩略图图集，完成后通知画廊重新加载页面"""
+        try:
+            start = time.perf_counter()
+            written = self.atlas.update(paths, self.thumbnail_cache)
+            if written or len(self.atlas.entries) != len(paths):
+                print(f"缩略图图集: 写入 {written} 个，共 {len(self.atlas.entries)} 个，"
+                      f"耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+            self.dispatcher.post(self.on_atlas_updated)
+        except Exception as e:
+            print(f"更新缩略图图集失败: {e}")
+            traceback.print_exc()
+
+    def on_atlas_updated(self):
+        if self.current_window and self.current_window.winfo_exists():
+            self.gallery.reload()
+
+    def apply_library_event(self, event):
+        """在 Tk 线程中应用单个图片库变化，无需整体重新加载"""
+        try:
+            if event.kind in ('removed', 'renamed'):
+                self.remove_library_image(event.old_path or event.path)
+            if event.kind in ('added', 'modified', 'renamed'):
+                self.add_library_image(event.path)
+            print(f"图片库变化: {event}")
+            self.refresh_most_used()
+            
+            # 弹窗打开时刷新当前结果
+            if self.current_window and self.current_window.winfo_exists() and self.last_search:
+                self.search_memes(self.last_search)
+        except Exception as e:
+            print(f"应用图片库变化失败 {event}: {e}")
+            traceback.print_exc()
+
+    def refresh_most_used(self):
+        """预先生成最常用图片的结果列表，呼出窗口时直接显示，不做任何搜索"""
+        if self.usage is None:
+            return
+        count = self.config['features']['usage']['most_used']
+        results = []
+        for name in self.usage.most_used(count * 2):
+            path = self.image_map.get(name)
+            result = self.search_engine.result_for(path, self.usage.count(name)) if path else None
+            if result is not None:
+                results.append(result)
+                if len(results) == count:
+                    break
+        self.most_used_results = results
+
+    def record_send(self, image_path):
+        """记录一次发送并更新最常用列表"""
+        if self.usage is None:
+            return
+        try:
+            self.usage.record(self.search_engine.name_for(image_path))
+            self.refresh_most_used()
+        except ValueError:
+            # 不在图片目录中的文件
+            pass
+
+    def add_library_image(self, image_path):
+        """新增或更新单个图片的索引和缩略图"""
+        name = self.search_engine.add(image_path)
+        self.catalog.forget(image_path)
+        self.photo_cache.pop(image_path)
+        if not self.thumbnail_cache.contains(image_path):
+            self.pending_thumbnails[image_path] = name
+            self.thumbnail_builder.submit([image_path])
+
+    def remove_library_image(self, image_path):
+        """删除单个图片的索引和缩略图"""
+        name = self.search_engine.remove(image_path)
+        if name is None:
+            return
+        self.catalog.forget(image_path)
+        self.photo_cache.pop(image_path)
+        self.pending_thumbnails.pop(image_path, None)
+
+    def get_thumbnail(self, name, path):
+        """获取结果行使用的缩略图，未命中时按需解码
+
+        按规范路径缓存，内容相同的图片共用一个 PhotoImage。
+        """
+        path = self.catalog.canonical(path)
+        photo = self.photo_cache.get(path)
+        if photo is None:
+            photo = self.create_thumbnail(path)
+            if photo:
+                self.photo_cache.put(path, photo)
+        return photo
+
+    def get_send_stats(self):
+        """获取发送延迟（毫秒）和剪贴板数据缓存统计"""
+        latencies = sorted(self.send_latencies)
+        return {
+            'backend': self.clipboard.name,
+            'count': len(latencies),
+            'median': latencies[len(latencies) // 2] if latencies else 0.0,
+            'max': latencies[-1] if latencies else 0.0,
+            'cache': self.payload_cache.stats()
+        }
+
+    def get_thumbnail_stats(self):
+        """获取缩略图缓存统计"""
+        return self.photo_cache.stats()
+
     def send_image(self, image_path):
         """发送图片到剪贴板"""
         try:
             print(f"准备发送图片: {image_path}")
+            start = time.perf_counter()
             
-            # 加载图片
-            image = Image.open(image_path)
-            
-            # 转换为BMP格式（用于剪贴板）
-            output = BytesIO()
-            image.convert('RGB').save(output, 'BMP')
-            data = output.getvalue()[14:]  # 跳过BMP文件头
-            output.close()
+            # 取出已编码的剪贴板数据（悬停时已在后台预编码）
+            payload = self.payload_cache.get(image_path)
+            encoded = time.perf_counter()
             
             # 复制到剪贴板
-            import win32clipboard
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
-            win32clipboard.CloseClipboard()
+            self.clipboard.set_image(payload)
+            finished = time.perf_counter()
+            
+            self.send_latencies.append((finished - start) * 1000)
+            print(f"发送耗时 {(finished - start) * 1000:.1f} ms"
+                  f"（编码 {(encoded - start) * 1000:.1f} ms，写剪贴板 {(finished - encoded) * 1000:.1f} ms）")
+            self.record_send(image_path)
             
             # 模拟粘贴操作
+            import keyboard
             keyboard.send('ctrl+v')
             
             # 显示成功提示
@@ -276,6 +519,7 @@ class MemeSelector:
                 # 备用方案：保存为临时文件
                 import tempfile
                 import os
+                from PIL import Image
                 
                 temp_dir = tempfile.gettempdir()
                 temp_path = os.path.join(temp_dir, f"meme_{int(time.time())}.png")
@@ -289,21 +533,34 @@ class MemeSelector:
                 print(f"备用方案也失败了: {backup_error}")
                 self.show_toast("发送失败", 2000)
 
-    def create_thumbnail(self, image_path, size=(100, 100)):
+    def create_thumbnail(self, image_path, size=None):
         """创建图片缩略图"""
         try:
-            image = Image.open(image_path)
-            image.thumbnail(size)
+            from PIL import Image, ImageTk
+            if size is not None:
+                image = Image.open(image_path)
+                image.thumbnail(size)
+                return ImageTk.PhotoImage(image)
+            
+            # 默认尺寸的缩略图走磁盘缓存
+            image = self.thumbnail_cache.load(image_path)
+            if image is None:
+                thumbnail_size = self.config['features']['display']['thumbnail_size']
+                image = make_thumbnail(self.optimized.resolve(image_path), thumbnail_size)
+                self.thumbnail_cache.store(image_path, image)
             return ImageTk.PhotoImage(image)
         except Exception as e:
             print(f"创建缩略图失败 {image_path}: {e}")
             return None
 
     def reload_images(self):
-        """重新加载所有图片"""
+        """重新加载所有图片
+
+        图片目录的日常变化由 LibraryWatcher 逐条处理，这里只用于强制全量重建。
+        """
         try:
             print("重新加载图片...")
-            self.photo_references.clear()
+            self.photo_cache.clear()
             self.image_map = self.load_image_map()
             self.preload_images()
             print("图片重新加载完成")
@@ -314,51 +571,27 @@ class MemeSelector:
             return False
 
     def search_memes(self, search_text):
-        """搜索表情包"""
+        """搜索表情包（提交到后台线程，不阻塞 Tk 事件循环）"""
         try:
             print(f"\n开始搜索: {search_text}")
+            self.search_worker.submit(search_text)
+        except Exception as e:
+            print(f"搜索错误: {e}")
+            traceback.print_exc()
+
+    def find_memes(self, search_text, should_cancel=None):
+        """计算搜索结果（在后台线程中调用，不访问任何 Tk 对象）"""
+        return self.search_engine.search(search_text, should_cancel=should_cancel)
+
+    def show_search_results(self, search_text, results):
+        """在 Tk 线程中显示最新的搜索结果"""
+        try:
+            self.search_results = results
+            print(f"「{search_text}」找到 {len(results)} 个匹配结果")
             
-            # 转换搜索文本
-            search_text_simp = self.t2s.convert(search_text)
-            search_text_trad = self.s2t.convert(search_text)
-            print(f"搜索文本: 「{search_text}」简体「{search_text_simp}」繁体「{search_text_trad}」")
-            
-            # 初始化结果列表
-            results = []
-            
-            # 遍历所有图片
-            for name, path in self.image_map.items():
-                try:
-                    # 计算匹配分数
-                    score = self.calculate_match_score(name, [
-                        search_text,
-                        search_text_simp,
-                        search_text_trad
-                    ])
-                    
-                    # 如果分数超过阈值，添加到结果
-                    if score >= self.config['features']['search']['score_threshold']:
-                        results.append({
-                            'name': name,
-                            'path': path,
-                            'score': score,
-                            'alt': name.replace('_', ' ').title()
-                        })
-                except Exception as e:
-                    print(f"处理图片 {name} 失败: {e}")
-                    continue
-            
-            # 按分数排序
-            results.sort(key=lambda x: x['score'], reverse=True)
-            
-            # 限制结果数量
-            max_results = self.config['features']['search']['max_results']
-            results = results[:max_results]
-            
-            print(f"找到 {len(results)} 个匹配结果")
-            
-            # 显示排名前三的匹配
+            # 显示排名前三的匹配，并预编码最可能发送的第一个结果
             if results:
+                self.payload_cache.prefetch(results[0]['path'])
                 print("排名前三的匹配：")
                 for i, result in enumerate(results[:3], 1):
                     print(f"{i}. {result['alt']} (分数: {result['score']})")
@@ -370,60 +603,30 @@ class MemeSelector:
                 self._create_popup(results)
                 
         except Exception as e:
-            print(f"搜索错误: {e}")
+            print(f"显示搜索结果失败: {e}")
+            traceback.print_exc()
+
+    def show_similar(self, result):
+        """右键结果：显示视觉上相似的图片"""
+        try:
+            catalog_config = self.config['features']['catalog']
+            if not catalog_config['enabled']:
+                return
+            results = self.search_engine.similar(
+                self.catalog, result['path'], max_distance=catalog_config['similar_distance']
+            )
+            if not results:
+                self.show_toast("没有找到相似的图片")
+                return
+            self.show_search_results(f"与 {result['alt']} 相似", results)
+        except Exception as e:
+            print(f"查找相似图片失败: {e}")
             traceback.print_exc()
 
     def calculate_match_score(self, name, search_texts):
         """计算匹配分数"""
         try:
-            max_score = 0
-            name_lower = name.lower()
-            
-            # 获取拼音
-            try:
-                from pypinyin import lazy_pinyin
-                name_pinyin = ''.join(lazy_pinyin(name_lower))
-            except:
-                name_pinyin = name_lower
-                
-            for search_text in search_texts:
-                search_lower = search_text.lower()
-                
-                # 1. 完全匹配
-                if name_lower == search_lower:
-                    return 100
-                    
-                # 2. 包含关系
-                if search_lower in name_lower:
-                    score = 90
-                    max_score = max(max_score, score)
-                    
-                # 3. 拼音匹配
-                try:
-                    search_pinyin = ''.join(lazy_pinyin(search_lower))
-                    if search_pinyin in name_pinyin:
-                        print(f"拼音匹配成功: {search_lower} 匹配到 {name_lower}")
-                        score = 80
-                        max_score = max(max_score, score)
-                except:
-                    pass
-                    
-                # 4. 部分匹配
-                if any(part in name_lower for part in search_lower.split()):
-                    score = 70
-                    max_score = max(max_score, score)
-                    
-                # 5. 模糊匹配
-                try:
-                    from fuzzywuzzy import fuzz
-                    ratio = fuzz.ratio(search_lower, name_lower)
-                    if ratio > 60:
-                        score = ratio
-                        max_score = max(max_score, score)
-                except:
-                    pass
-                    
-            return max_score
+            return self.search_engine.score(name, search_texts)
             
         except Exception as e:
             print(f"计算匹配分数失败: {e}")
@@ -469,6 +672,9 @@ class MemeSelector:
             self.last_search = search_text
             if len(search_text) >= self.config['features']['search']['min_length']:
                 self.search_memes(search_text)
+            elif not search_text and self.current_window and self.current_window.winfo_exists():
+                # 清空搜索框后回到最常用列表（网格画廊为整个图片库）
+                self.update_popup_content([])
                 
         except Exception as e:
             print(f"更新搜索失败: {e}")
@@ -502,24 +708,34 @@ class MemeSelector:
             )
             self.search_entry.pack(fill=tk.X, padx=5, pady=5)
             
-            # 创建滚动区域
-            canvas = tk.Canvas(window)
-            scrollbar = ttk.Scrollbar(window, orient="vertical", command=canvas.yview)
-            self.scrollable_frame = ttk.Frame(canvas)
-            
-            # 配置滚动
-            self.scrollable_frame.bind(
-                "<Configure>",
-                lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+            # 创建虚拟滚动的结果列表（行控件固定数量，原地复用）
+            thumbnail_size = self.config['features']['display']['thumbnail_size']
+            self.result_list = VirtualResultList(
+                window,
+                row_height=thumbnail_size + 14,
+                get_thumbnail=self.get_thumbnail,
+                on_click=self.send_image,
+                on_hover=self.on_hover,
+                on_focus=lambda result: self.payload_cache.prefetch(result['path']),
+                on_context=self.show_similar
             )
-            canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-            canvas.configure(yscrollcommand=scrollbar.set)
-            
-            # 布局
-            canvas.pack(side="left", fill="both", expand=True)
-            scrollbar.pack(side="right", fill="y")
+            # 网格画廊：单个 Canvas，缩略图从图集中复制
+            self.gallery = GalleryView(
+                window,
+                thumbnail_size,
+                self.atlas,
+                get_thumbnail=self.get_thumbnail,
+                on_click=self.send_image,
+                on_focus=lambda result: self.payload_cache.prefetch(result['path']),
+                on_context=self.show_similar,
+                resolve=self.catalog.canonical,
+                font=(self.config['style']['font_family'], 9),
+                hover_color=self.config['style']['hover_color']
+            )
+            self.result_view.pack(fill="both", expand=True)
             
             # 绑定事件
+            window.bind('<Control-g>', lambda e: self.toggle_view())
             window.bind('<Escape>', lambda e: self.hide_window())
             window.bind('<Return>', lambda e: self.search_memes(self.search_var.get()))
             window.protocol("WM_DELETE_WINDOW", self.hide_window)
@@ -537,63 +753,47 @@ class MemeSelector:
             print(f"创建弹窗失败: {e}")
             traceback.print_exc()
 
+    @property
+    def result_view(self):
+        """当前显示方式对应的结果控件"""
+        return self.gallery if self.view == 'grid' else self.result_list
+
+    def toggle_view(self):
+        """Ctrl+G 在列表和网格画廊之间切换"""
+        try:
+            self.result_view.pack_forget()
+            self.view = 'list' if self.view == 'grid' else 'grid'
+            self.config['features']['display']['view'] = self.view
+            self.result_view.pack(fill="both", expand=True)
+            self.update_popup_content(self.search_results if self.search_var.get().strip() else [])
+        except Exception as e:
+            print(f"切换显示方式失败: {e}")
+            traceback.print_exc()
+
     def update_popup_content(self, results):
-        """更新弹窗内容"""
+        """更新弹窗内容；没有搜索内容时列表显示最常用的图片，网格画廊浏览整个图片库"""
         try:
-            # 清空现有内容
-            for widget in self.scrollable_frame.winfo_children():
-                widget.destroy()
-                
-            # 显示结果
-            for result in results:
-                try:
-                    # 创建结果框架
-                    result_frame = ttk.Frame(self.scrollable_frame, style='Result.TFrame')
-                    result_frame.pack(fill=tk.X, padx=5, pady=2)
-                    
-                    # 创建图片标签
-                    url = result['path']
-                    if result['name'] in self.photo_references:
-                        photo = self.photo_references[result['name']]
-                    else:
-                        photo = self.create_thumbnail(url)
-                        if photo:
-                            self.photo_references[result['name']] = photo
-                        
-                    if photo:
-                        label = ttk.Label(result_frame, image=photo)
-                        label.image = photo
-                        label.pack(side=tk.LEFT, padx=5)
-                    
-                    # 创建文本标签
-                    name_label = ttk.Label(
-                        result_frame,
-                        text=result['alt'],
-                        style='ResultText.TLabel',
-                        wraplength=300
-                    )
-                    name_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-                    
-                    # 绑定点击事件
-                    for widget in (label, name_label, result_frame):
-                        widget.bind('<Button-1>', lambda e, u=url: self.send_image(u))
-                        widget.bind('<Enter>', lambda e, f=result_frame: self.on_hover(f, True))
-                        widget.bind('<Leave>', lambda e, f=result_frame: self.on_hover(f, False))
-                    
-                except Exception as e:
-                    print(f"处理搜索结果项失败: {e}")
-                    traceback.print_exc()
-                    continue
-                    
+            if not results and not self.search_var.get().strip():
+                results = self.search_engine.all_results() if self.view == 'grid' else self.most_used_results
+            elapsed = self.result_view.set_results(results)
+            print(f"渲染 {len(results)} 个结果耗时 {elapsed:.1f} ms")
         except Exception as e:
             print(f"更新弹窗内容失败: {e}")
             traceback.print_exc()
 
+    def get_render_stats(self):
+        """获取结果列表的渲染耗时统计（毫秒）"""
+        if self.current_window and self.current_window.winfo_exists():
+            return self.result_view.render_stats()
+        return None
+
     def show_window(self):
         """显示搜索窗口"""
         try:
             print("呼出搜索窗口")
             if self.current_window and self.current_window.winfo_exists():
+                if not self.search_var.get().strip():
+                    self.update_popup_content([])
                 self.current_window.deiconify()
                 self.current_window.lift()
                 self.search_entry.focus_set()
@@ -647,8 +847,10 @@ class MemeSelector:
     def register_hotkey(self):
         """注册全局热键"""
         try:
-            keyboard.on_press(self.handle_key)
-            keyboard.add_hotkey('tab', self.show_window)
+            # 热键回调运行在 keyboard 的钩子线程中，不能直接操作 Tk
+            import keyboard
+            keyboard.on_press(lambda event: self.dispatcher.post(self.handle_key, event))
+            keyboard.add_hotkey('tab', lambda: self.dispatcher.post(self.show_window))
             print("热键注册成功")
         except Exception as e:
             print(f"注册热键失败: {e}")
@@ -657,6 +859,7 @@ class MemeSelector:
     def unregister_hotkey(self):
         """注销全局热键"""
         try:
+            import keyboard
             keyboard.unhook_all()
             print("热键注销成功")
         except Exception as e:
@@ -682,11 +885,21 @@ class MemeSelector:
             # 注销热键
             self.unregister_hotkey()
             
+            # 停止后台搜索和预编码
+            self.search_worker.stop()
+            self.payload_cache.shutdown()
+            
             # 保存配置
             self.save_config()
             
+            # 停止目录监视和后台缩略图生成
+            if self.library_watcher:
+                self.library_watcher.stop()
+            self.thumbnail_builder.shutdown(cancel=True)
+            
             # 清理图片引用
-            self.photo_references.clear()
+            print(f"缩略图缓存统计: {self.get_thumbnail_stats()}")
+            self.photo_cache.clear()
             
             # 销毁窗口
             if self.current_window and self.current_window.winfo_exists():
@@ -713,6 +926,7 @@ class MemeSelector:
     def get_image_info(self, image_path):
         """获取图片信息"""
         try:
+            from PIL import Image
             image = Image.open(image_path)
             info = {
                 'format': image.format,
@@ -728,6 +942,7 @@ class MemeSelector:
     def validate_image(self, image_path):
         """验证图片是否有效"""
         try:
+            from PIL import Image
             with Image.open(image_path) as img:
                 img.verify()
             return True
@@ -0,0 +1,182 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import deque
+import time
+import traceback
+
+
+class ResultRow:
+    """可复用的结果行：一个框架、一个图片标签和一个文本标签"""
+    def __init__(self, parent, text_wraplength=300):
+        self.frame = ttk.Frame(parent, style='Result.TFrame')
+        self.image_label = ttk.Label(self.frame)
+        self.image_label.pack(side=tk.LEFT, padx=5)
+        self.name_label = ttk.Label(
+            self.frame,
+            text="",
+            style='ResultText.TLabel',
+            wraplength=text_wraplength
+        )
+        self.name_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.photo = None
+
+    @property
+    def widgets(self):
+        return (self.image_label, self.name_label, self.frame)
+
+
+class VirtualResultList:
+    """虚拟滚动的结果列表
+
+    只创建可见区域需要的行控件，滚动或更新结果时原地修改这些行，
+    不再为每个结果创建和销毁控件。
+    """
+    def __init__(self, parent, row_height, get_thumbnail, on_click, on_hover=None, on_focus=None,
+                 on_context=None):
+        self.row_height = row_height
+        self.get_thumbnail = get_thumbnail
+        self.on_click = on_click
+        self.on_context = on_context
+        self.on_hover = on_hover
+        self.on_focus = on_focus
+        self.results = []
+        self.rows = []
+        self.first = 0
+        self.render_times = deque(maxlen=100)
+
+        self.frame = ttk.Frame(parent)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scroll)
+        self.body = ttk.Frame(self.frame)
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.body.bind('<Configure>', self.on_resize)
+        self.bind_wheel(self.body)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    @property
+    def visible_count(self):
+        """可见区域能容纳的行数"""
+        return len(self.rows)
+
+    def bind_wheel(self, widget):
+        """绑定鼠标滚轮（Windows/macOS 使用 MouseWheel，X11 使用 Button-4/5）"""
+        widget.bind('<MouseWheel>', lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        widget.bind('<Button-4>', lambda e: self.scroll_by(-1))
+        widget.bind('<Button-5>', lambda e: self.scroll_by(1))
+
+    def ensure_rows(self, count):
+        """按需补足行控件，只增不减"""
+        while len(self.rows) < count:
+            index = len(self.rows)
+            row = ResultRow(self.body)
+            for widget in row.widgets:
+                widget.bind('<Button-1>', lambda e, i=index: self.on_row_click(i))
+                widget.bind('<Button-3>', lambda e, i=index: self.on_row_context(i))
+                widget.bind('<Enter>', lambda e, i=index: self.on_row_enter(i, True))
+                widget.bind('<Leave>', lambda e, i=index: self.on_row_enter(i, False))
+                self.bind_wheel(widget)
+            self.rows.append(row)
+
+    def on_resize(self, event):
+        """窗口大小变化时调整行池"""
+        count = max(1, event.height // self.row_height + 1)
+        if count != len(self.rows):
+            self.ensure_rows(count)
+            self.render()
+
+    def set_results(self, results):
+        """更新结果并回到顶部"""
+        self.results = results
+        self.first = 0
+        return self.render()
+
+    def max_first(self):
+        return max(0, len(self.results) - max(1, self.body.winfo_height() // self.row_height))
+
+    def scroll_to(self, first):
+        first = min(max(0, first), self.max_first())
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.first + rows)
+
+    def on_scroll(self, action, amount, unit=None):
+        """滚动条回调"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.results)))
+        elif action == 'scroll':
+            step = int(amount)
+            if unit == 'pages':
+                step *= max(1, len(self.rows) - 1)
+            self.scroll_by(step)
+
+    def on_row_click(self, row_index):
+        index = self.first + row_index
+        if index < len(self.results):
+            self.on_click(self.results[index]['path'])
+
+    def on_row_context(self, row_index):
+        """右键点击行"""
+        index = self.first + row_index
+        if self.on_context and index < len(self.results):
+            self.on_context(self.results[index])
+
+    def on_row_enter(self, row_index, enter):
+        """鼠标进入/离开行"""
+        if self.on_hover:
+            self.on_hover(self.rows[row_index].frame, enter)
+        index = self.first + row_index
+        if enter and self.on_focus and index < len(self.results):
+            self.on_focus(self.results[index])
+
+    def render(self):
+        """把当前可见的结果写入行控件，返回耗时（毫秒）"""
+        start = time.perf_counter()
+        try:
+            for i, row in enumerate(self.rows):
+                index = self.first + i
+                if index >= len(self.results):
+                    row.frame.place_forget()
+                    continue
+
+                result = self.results[index]
+                photo = self.get_thumbnail(result['name'], result['path'])
+                row.photo = photo
+                row.image_label.configure(image=photo or '')
+                row.name_label.configure(text=result['alt'])
+                row.frame.place(x=0, y=i * self.row_height, relwidth=1, height=self.row_height)
+
+            # 更新滚动条
+            total = len(self.results)
+            if total:
+                visible = min(len(self.rows), total - self.first)
+                self.scrollbar.set(self.first / total, (self.first + visible) / total)
+            else:
+                self.scrollbar.set(0, 1)
+
+        except Exception as e:
+            print(f"渲染结果列表失败: {e}")
+            traceback.print_exc()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.render_times.append(elapsed)
+        return elapsed
+
+    def render_stats(self):
+        """最近若干次渲染的耗时统计（毫秒）"""
+        if not self.render_times:
+            return {'count': 0, 'last': 0.0, 'avg': 0.0, 'max': 0.0}
+        return {
+            'count': len(self.render_times),
+            'last': self.render_times[-1],
+            'avg': sum(self.render_times) / len(self.render_times),
+            'max': max(self.render_times)
+        }
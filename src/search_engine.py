@@ -0,0 +1,221 @@
+import json
+import traceback
+from pathlib import Path
+
+from src.utils.search_index import SearchIndex, LazyConverter
+from src.utils.index_snapshot import load_entries, write_snapshot
+from src.utils.image_catalog import SIMILAR_DISTANCE, HASH_SIZE
+from src.utils.usage_log import blend
+
+# 与 load_image_map 一致的图片扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif')
+
+# features.search 的默认值，MemeSelector 的默认配置也使用这一份
+DEFAULT_SEARCH_CONFIG = {
+    'score_threshold': 10,
+    'max_results': 20,
+    'min_length': 1,
+    'fuzzy_shortlist': 200,
+    'query_cache_size': 128,
+    # 使用加分的上限（分数满分 100），设置了 usage 时生效
+    'usage_weight': 15
+}
+
+
+def read_features(base_path) -> dict:
+    """读取 config/config.json 中的 features 部分（不含默认值）"""
+    config_file = Path(base_path) / 'config' / 'config.json'
+    try:
+        if config_file.exists():
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('features', {})
+    except Exception as e:
+        print(f"读取配置失败: {e}")
+    return {}
+
+
+class SearchEngine:
+    """不依赖 Tk 的表情包搜索引擎
+
+    负责扫描图片目录、读取 image_map.json 中的元数据、维护搜索索引和索引快照。
+    MemeSelector 的弹窗和 run.py 的命令行查询模式都通过它搜索。
+    """
+    def __init__(self, images_path, data_path, search_config: dict = None, t2s=None, s2t=None):
+        self.images_path = Path(images_path)
+        self.data_path = Path(data_path)
+        self.config = dict(DEFAULT_SEARCH_CONFIG, **(search_config or {}))
+        self.index = SearchIndex(
+            t2s or LazyConverter('t2s'),
+            s2t or LazyConverter('s2t'),
+            fuzzy_shortlist=self.config['fuzzy_shortlist'],
+            query_cache_size=self.config['query_cache_size']
+        )
+        self.image_map = {}
+        self.metadata = {}
+        # UsageLog，设置后搜索结果混入使用频率和最近程度
+        self.usage = None
+
+    @classmethod
+    def from_base_path(cls, base_path):
+        """按项目目录结构创建，搜索设置读取 config/config.json"""
+        base_path = Path(base_path)
+        search_config = read_features(base_path).get('search', {})
+        return cls(base_path / 'images', base_path / 'data', search_config)
+
+    def __len__(self):
+        return len(self.image_map)
+
+    def name_for(self, image_path) -> str:
+        """图片在索引中的名称：相对路径的文件名（小写）"""
+        return Path(image_path).relative_to(self.images_path).stem.lower()
+
+    def scan_images(self) -> dict:
+        """扫描图片目录，返回 名称 -> 路径"""
+        image_map = {}
+        for image_path in self.images_path.glob('**/*'):
+            if image_path.is_file() and image_path.suffix.lower() in IMAGE_SUFFIXES:
+                image_map[self.name_for(image_path)] = str(image_path)
+        return image_map
+
+    def load_metadata(self) -> dict:
+        """读取 data/image_map.json 中的作者、集数和标签"""
+        try:
+            map_path = self.data_path / 'image_map.json'
+            if not map_path.exists():
+                return {}
+            with open(map_path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+
+            metadata = {}
+            for item in items:
+                file_name = item.get('file_name')
+                if not file_name:
+                    continue
+                metadata[Path(file_name).stem.lower()] = {
+                    'author': item.get('author'),
+                    'episode': item.get('episode'),
+                    'tags': item.get('tags', [])
+                }
+            return metadata
+        except Exception as e:
+            print(f"读取图片元数据失败: {e}")
+            traceback.print_exc()
+            return {}
+
+    def load(self) -> dict:
+        """扫描图片并构建索引（名称的各种形式优先从快照中读取），返回图片映射"""
+        try:
+            image_map = self.scan_images()
+            self.metadata = self.load_metadata()
+
+            cache_dir = self.data_path / 'cache'
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            snapshot_path = cache_dir / 'search_index.bin'
+            entries, tables, stats = load_entries(snapshot_path, image_map, self.index.make_entry,
+                                                  self.images_path)
+            print(f"索引快照: 复用 {stats['reused']} 个，重新计算 {stats['computed']} 个，"
+                  f"移除 {stats['removed']} 个")
+            self.index.build_entries(entries, self.metadata, tables)
+            if tables is None:
+                # 图片列表有变化（或快照缺失、过期）：连同新建的倒排表一起写回
+                write_snapshot(snapshot_path, entries, self.images_path, self.index)
+            self.image_map = image_map
+        except Exception as e:
+            print(f"加载图片映射失败: {e}")
+            traceback.print_exc()
+            self.image_map = {}
+        return self.image_map
+
+    def add(self, image_path) -> str:
+        """新增或更新单个图片，返回其名称
+
+        图片映射和索引在同一把锁内修改，其他线程的搜索和查找不会看到中间状态。
+        """
+        name = self.name_for(image_path)
+        with self.index.lock:
+            self.image_map[name] = str(image_path)
+            self.index.add(name, str(image_path), self.metadata.get(name))
+        return name
+
+    def remove(self, image_path):
+        """删除单个图片，返回其名称；不在索引中时返回 None"""
+        name = self.name_for(image_path)
+        with self.index.lock:
+            # 不同子目录下的同名图片只保留了一个，只有路径一致时才删除
+            if self.image_map.get(name) != str(image_path):
+                return None
+            del self.image_map[name]
+            self.index.remove(name)
+        return name
+
+    def contains_path(self, image_path) -> bool:
+        """路径是否是索引中的图片（按名称查表，不遍历图片映射）"""
+        try:
+            name = self.name_for(image_path)
+        except ValueError:
+            return False
+        return self.image_map.get(name) == str(image_path)
+
+    def search(self, query: str, k: int = None, should_cancel=None) -> list:
+        """返回最多 k 个结果（默认取配置中的 max_results）
+
+        每个结果为 {'name', 'path', 'score', 'alt'}。设置了 usage 时多取一倍候选，
+        加上使用加分后重新排序，常用但字面分数稍低的图片也能进入前 k 个。
+        """
+        k = k if k is not None else self.config['max_results']
+        weight = self.config['usage_weight']
+        if self.usage is None or not weight:
+            return self.index.search(query, self.config['score_threshold'], k, should_cancel)
+        results = self.index.search(query, self.config['score_threshold'], k * 2, should_cancel)
+        return blend(results, self.usage, weight, k)
+
+    def search_many(self, queries, k: int = None) -> list:
+        """批量搜索，结果与 queries 一一对应
+
+        重复的查询只计算一次；按字典序处理，使前缀查询紧挨在其扩展之前，
+        追加输入时的候选复用对批量查询同样生效。
+        """
+        queries = list(queries)
+        results = {}
+        with self.index.lock:
+            for query in sorted(set(queries)):
+                results[query] = self.search(query, k)
+        return [results[query] for query in queries]
+
+    def all_results(self) -> list:
+        """整个图片库，按名称排序，格式与 search 相同"""
+        with self.index.lock:
+            entries = [entry for entry in self.index.entries if entry is not None]
+        return [self.index.make_result(entry, 0) for entry in sorted(entries, key=lambda entry: entry.name)]
+
+    def result_for(self, image_path, score: int):
+        """索引中某个图片对应的结果项，不在索引中时返回 None"""
+        name = self.name_for(image_path)
+        with self.index.lock:
+            entry_id = self.index.ids.get(name)
+            entry = self.index.entries[entry_id] if entry_id is not None else None
+        if entry is None or entry.path != str(image_path):
+            return None
+        return self.index.make_result(entry, score)
+
+    def similar(self, catalog, image_path, k: int = None, max_distance: int = SIMILAR_DISTANCE) -> list:
+        """视觉上相似的图片（按 catalog 中的 dHash），结果格式与 search 相同
+
+        分数为哈希相同位所占的百分比。
+        """
+        bits = HASH_SIZE * HASH_SIZE
+        k = k if k is not None else self.config['max_results']
+        results = []
+        for path, distance in catalog.similar(image_path, k, max_distance):
+            result = self.result_for(path, round(100 * (bits - distance) / bits))
+            if result is not None:
+                results.append(result)
+        return results
+
+    def score(self, name: str, search_texts) -> int:
+        """名称对一组查询文本的最高分"""
+        entry = self.index.make_entry(name, self.image_map.get(name, ''))
+        return max(
+            (self.index.score(entry, self.index.normalize_query(text)) for text in search_texts),
+            default=0
+        )
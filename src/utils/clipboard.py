@@ -0,0 +1,124 @@
+import shutil
+import struct
+import subprocess
+import sys
+
+
+class ClipboardPayload:
+    """已编码、可直接写入剪贴板的图片数据"""
+    __slots__ = ('format', 'data', 'size')
+
+    def __init__(self, format: str, data: bytes, size=None):
+        self.format = format  # 'dib'、'png' 或 'jpeg'
+        self.data = data
+        self.size = size
+
+    def __len__(self):
+        return len(self.data)
+
+
+def dib_to_bmp(data: bytes) -> bytes:
+    """为 DIB 数据补上 14 字节的 BMP 文件头"""
+    header_size, = struct.unpack_from('<I', data, 0)
+    bit_count, = struct.unpack_from('<H', data, 14)
+    colors_used, = struct.unpack_from('<I', data, 32) if header_size >= 36 else (0,)
+    if not colors_used and bit_count <= 8:
+        colors_used = 1 << bit_count
+    offset = 14 + header_size + colors_used * 4
+    return struct.pack('<2sIHHI', b'BM', 14 + len(data), 0, 0, offset) + data
+
+
+class ClipboardBackend:
+    """剪贴板后端接口"""
+    name = 'base'
+
+    def set_image(self, payload: ClipboardPayload):
+        raise NotImplementedError
+
+
+class Win32ClipboardBackend(ClipboardBackend):
+    """Windows 剪贴板（pywin32）
+
+    DIB 使用标准的 CF_DIB，PNG 和 JPEG 使用浏览器和聊天软件通用的
+    注册格式 "PNG" 与 "JFIF"。
+    """
+    name = 'win32'
+
+    def __init__(self):
+        import win32clipboard
+        self.win32clipboard = win32clipboard
+        self.formats = {
+            'dib': win32clipboard.CF_DIB,
+            'png': win32clipboard.RegisterClipboardFormat('PNG'),
+            'jpeg': win32clipboard.RegisterClipboardFormat('JFIF'),
+        }
+
+    def set_image(self, payload: ClipboardPayload):
+        clipboard = self.win32clipboard
+        clipboard.OpenClipboard()
+        try:
+            clipboard.EmptyClipboard()
+            clipboard.SetClipboardData(self.formats[payload.format], payload.data)
+        finally:
+            clipboard.CloseClipboard()
+
+
+class X11ClipboardBackend(ClipboardBackend):
+    """X11 剪贴板（通过 xclip）"""
+    name = 'x11'
+
+    def __init__(self):
+        self.xclip = shutil.which('xclip')
+        if not self.xclip:
+            raise RuntimeError("未找到 xclip")
+
+    MIME_TYPES = {'dib': 'image/bmp', 'png': 'image/png', 'jpeg': 'image/jpeg'}
+
+    def set_image(self, payload: ClipboardPayload):
+        data = dib_to_bmp(payload.data) if payload.format == 'dib' else payload.data
+        # xclip 读完输入后会转到后台持有剪贴板，前台进程随即退出
+        process = subprocess.Popen(
+            [self.xclip, '-selection', 'clipboard', '-t', self.MIME_TYPES[payload.format], '-i'],
+            stdin=subprocess.PIPE
+        )
+        try:
+            process.communicate(data, timeout=5)
+        except subprocess.TimeoutExpired:
+            # 超时后 xclip 仍在运行，先结束再回收，避免遗留进程
+            process.kill()
+            process.communicate()
+            raise RuntimeError("xclip 写入剪贴板超时")
+
+
+class MemoryClipboardBackend(ClipboardBackend):
+    """内存剪贴板，用于测试和测量发送延迟"""
+    name = 'memory'
+
+    def __init__(self):
+        self.payload = None
+        self.writes = 0
+
+    def set_image(self, payload: ClipboardPayload):
+        self.payload = payload
+        self.writes += 1
+
+
+BACKENDS = {
+    'win32': Win32ClipboardBackend,
+    'x11': X11ClipboardBackend,
+    'memory': MemoryClipboardBackend,
+}
+
+
+def get_clipboard_backend(name: str = 'auto') -> ClipboardBackend:
+    """按名称创建剪贴板后端，auto 时按平台选择，都不可用时退回内存后端"""
+    if name and name != 'auto':
+        return BACKENDS[name]()
+
+    candidates = ['win32'] if sys.platform == 'win32' else ['x11']
+    for candidate in candidates:
+        try:
+            return BACKENDS[candidate]()
+        except Exception as e:
+            print(f"剪贴板后端 {candidate} 不可用: {e}")
+    return MemoryClipboardBackend()
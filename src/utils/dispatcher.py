@@ -0,0 +1,128 @@
+import signal
+import socket
+import threading
+import time
+import traceback
+from collections import deque
+from queue import SimpleQueue, Empty
+
+
+class TkDispatcher:
+    """线程安全的 Tk 调度队列
+
+    热键回调、后台搜索和缩略图线程把要在 Tk 线程执行的回调放入队列，
+    然后通过虚拟事件唤醒 Tk 线程一次性处理，不需要任何定时轮询。
+    在 Tk 线程内提交时改用 after_idle。
+
+    主循环尚未运行或 Tcl 未启用线程时，其他线程的 event_generate 会失败，
+    回调留在队列中，由 Tk 线程的后备轮询处理；第一次跨线程唤醒成功后轮询停止。
+    """
+    EVENT = '<<MemeDispatch>>'
+    # 跨线程唤醒确认可用之前的后备轮询间隔（毫秒）
+    FALLBACK_POLL_MS = 50
+
+    def __init__(self, root):
+        self.root = root
+        self.main_thread = threading.get_ident()
+        self.queue = SimpleQueue()
+        self.lock = threading.Lock()
+        self.signalled = False
+        self.pending_once = set()
+        self.latencies = deque(maxlen=200)
+        self.wake_works = False
+        self.wake_failed = False
+        self.root.bind(self.EVENT, self._drain)
+        self.root.after(self.FALLBACK_POLL_MS, self._poll)
+
+    def post(self, callback, *args):
+        """提交回调，可在任意线程调用"""
+        self.queue.put((time.perf_counter(), callback, args))
+        self._signal()
+
+    def post_once(self, callback):
+        """提交回调，若同一回调已在队列中则忽略（用于合并频繁的通知）"""
+        with self.lock:
+            if callback in self.pending_once:
+                return
+            self.pending_once.add(callback)
+        self.post(self._run_once, callback)
+
+    def _run_once(self, callback):
+        with self.lock:
+            self.pending_once.discard(callback)
+        callback()
+
+    def _signal(self):
+        # 队列已被唤醒过时无需再次唤醒，Tk 线程会一次处理完
+        with self.lock:
+            if self.signalled:
+                return
+            self.signalled = True
+        try:
+            if threading.get_ident() == self.main_thread:
+                self.root.after_idle(self._drain)
+            else:
+                self.root.event_generate(self.EVENT, when='tail')
+                self.wake_works = True
+        except Exception as e:
+            # 回调仍在队列中，由后备轮询处理
+            with self.lock:
+                self.signalled = False
+            if not self.wake_failed:
+                self.wake_failed = True
+                print(f"唤醒 Tk 线程失败，改为定期轮询: {e}")
+
+    def _poll(self):
+        """后备轮询：在 Tk 线程中定期处理队列，跨线程唤醒可用后停止"""
+        if not self.queue.empty():
+            self._drain()
+        if not self.wake_works:
+            self.root.after(self.FALLBACK_POLL_MS, self._poll)
+
+    def _drain(self, event=None):
+        """在 Tk 线程中执行队列里的全部回调"""
+        with self.lock:
+            self.signalled = False
+        while True:
+            try:
+                posted, callback, args = self.queue.get_nowait()
+            except Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"执行回调失败: {e}")
+                traceback.print_exc()
+            self.latencies.append((time.perf_counter() - posted) * 1000)
+
+    def wake_on_signals(self):
+        """收到 Ctrl+C 等信号时唤醒 Tk 线程
+
+        Tk 主循环空闲时不执行任何 Python 代码，信号处理函数要等到下一个事件才会运行。
+        这里让信号写入 socketpair，由后台线程读到后提交一个空回调唤醒主循环。
+        必须在主线程中调用。
+        """
+        reader, writer = socket.socketpair()
+        writer.setblocking(False)
+        signal.set_wakeup_fd(writer.fileno())
+
+        def wait_for_signals():
+            try:
+                while reader.recv(64):
+                    self.post(lambda: None)
+            except OSError:
+                pass
+
+        threading.Thread(target=wait_for_signals, name='SignalWaker', daemon=True).start()
+        self.signal_sockets = (reader, writer)
+
+    def stats(self):
+        """从提交到回调执行完毕的耗时统计（毫秒）"""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {'count': 0, 'median': 0.0, 'max': 0.0}
+        return {
+            'count': len(latencies),
+            'median': latencies[len(latencies) // 2],
+            'max': latencies[-1]
+        }
@@ -0,0 +1,148 @@
+import re
+
+# 查询中可用的筛选字段及其别名
+FACET_ALIASES = {
+    'author': 'author',
+    'a': 'author',
+    'episode': 'episode',
+    'ep': 'episode',
+    'tag': 'tags',
+    'tags': 'tags',
+}
+
+FACET_TOKEN = re.compile(r'^(-?)(\w+)[:：](.+)$')
+OR_TOKENS = ('or', '|')
+
+
+def parse_query(search_text: str):
+    """把查询拆成自由文本和筛选条件
+
+    语法：
+        author:愛音 ep:11        同时满足（AND）
+        author:愛音,燈           任一取值（OR）
+        author:愛音 OR ep:11     OR 两侧为独立的 AND 组
+        -tag:爽世                排除
+    返回 (自由文本, 筛选组)，筛选组为 [[(字段, [取值...], 是否排除), ...], ...]，
+    组内为 AND，组间为 OR。
+    """
+    text_parts = []
+    groups = [[]]
+    for token in search_text.split():
+        if token.lower() in OR_TOKENS:
+            if groups[-1]:
+                groups.append([])
+            continue
+        match = FACET_TOKEN.match(token)
+        if match and match.group(2).lower() in FACET_ALIASES:
+            negate, facet, values = match.groups()
+            values = [v for v in re.split(r'[,，|]', values) if v]
+            if values:
+                groups[-1].append((FACET_ALIASES[facet.lower()], values, bool(negate)))
+                continue
+        text_parts.append(token)
+
+    groups = [group for group in groups if group]
+    return ' '.join(text_parts), groups
+
+
+def facet_key(value) -> str:
+    """建索引时的取值：只转为小写，不做繁简转换（避免启动时加载 OpenCC）"""
+    return str(value).lower()
+
+
+class FacetIndex:
+    """作者、集数和标签的倒排索引
+
+    每个字段的每个取值对应一个条目 id 集合，AND/OR/排除直接用集合运算完成，
+    不需要遍历条目；增删条目只修改相关取值的集合。
+
+    建索引时取值只转为小写；normalize（如繁简转换）只在查询时才用到：
+    第一次查询某个字段时把它的全部取值按 normalize 分组，之后直接查表，
+    新增或删空取值时该字段的分组作废。
+    """
+    def __init__(self, normalize=None):
+        self.normalize = normalize or facet_key
+        self.postings = {facet: {} for facet in set(FACET_ALIASES.values())}
+        # 条目 id -> [(字段, 取值), ...]，删除时只需访问这些集合
+        self.entry_keys = {}
+        self.aliases = {}
+        self.all_ids = set()
+
+    def add(self, entry_id: int, meta: dict):
+        """登记一个条目的元数据"""
+        self.all_ids.add(entry_id)
+        if not meta:
+            return
+        keys = []
+        for facet, values in self.postings.items():
+            raw = meta.get(facet)
+            if raw is None:
+                continue
+            for value in (raw if isinstance(raw, (list, tuple)) else [raw]):
+                if value is None or value == '':
+                    continue
+                key = facet_key(value)
+                ids = values.get(key)
+                if ids is None:
+                    ids = values[key] = set()
+                    self.aliases.pop(facet, None)
+                ids.add(entry_id)
+                keys.append((facet, key))
+        if keys:
+            self.entry_keys[entry_id] = keys
+
+    def remove(self, entry_id: int):
+        """移除一个条目"""
+        self.all_ids.discard(entry_id)
+        for facet, key in self.entry_keys.pop(entry_id, ()):
+            values = self.postings[facet]
+            ids = values.get(key)
+            if ids is None:
+                continue
+            ids.discard(entry_id)
+            if not ids:
+                del values[key]
+                self.aliases.pop(facet, None)
+
+    def build(self, metas):
+        """按条目顺序建立索引"""
+        for entry_id, meta in enumerate(metas):
+            self.add(entry_id, meta)
+        return self
+
+    def keys_for(self, facet: str, value) -> list:
+        """与 value 归一化后相同的全部取值"""
+        aliases = self.aliases.get(facet)
+        if aliases is None:
+            aliases = {}
+            for key in self.postings.get(facet, {}):
+                aliases.setdefault(self.normalize(key), []).append(key)
+            self.aliases[facet] = aliases
+        return aliases.get(self.normalize(value), [])
+
+    def lookup(self, facet: str, value) -> set:
+        """取值对应的条目 id 集合（新集合，可以修改）"""
+        values = self.postings.get(facet, {})
+        ids = set()
+        for key in self.keys_for(facet, value):
+            ids |= values.get(key, set())
+        return ids
+
+    def evaluate(self, groups) -> set:
+        """计算筛选组允许的条目 id 集合"""
+        result = set()
+        for group in groups:
+            allowed = self.all_ids
+            for facet, values, negate in group:
+                matched = set()
+                for value in values:
+                    matched |= self.lookup(facet, value)
+                allowed = allowed - matched if negate else allowed & matched
+                if not allowed:
+                    break
+            result |= allowed
+        return result
+
+    def values(self, facet: str):
+        """某个字段的全部取值及条目数"""
+        return {key: len(ids) for key, ids in self.postings.get(facet, {}).items()}
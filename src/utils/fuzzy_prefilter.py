@@ -0,0 +1,116 @@
+# NumPy 导入需要近百毫秒，第一次建立字符袋矩阵时才导入（见 load_numpy）
+np = None
+numpy_loaded = False
+
+
+def load_numpy():
+    """导入 NumPy，不可用时返回 None"""
+    global np, numpy_loaded
+    if not numpy_loaded:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        numpy_loaded = True
+    return np
+
+# 字符袋的哈希桶数，语料矩阵大小为 条目数 x BUCKETS 字节
+BUCKETS = 256
+
+
+class FuzzyPrefilter:
+    """基于 NumPy 字符袋矩阵的模糊匹配预筛选
+
+    fuzz.ratio 不会超过 2 * 共同字符数 / 两串总长度，而共同字符数不会超过
+    两个字符袋逐桶取最小值之和（哈希冲突只会让它更大）。
+    因此一次向量化运算就能得到整个语料的 ratio 上界，
+    只有上界足够高的前 top_k 个名称才需要逐个计算真实的 ratio。
+    """
+    def __init__(self, buckets: int = BUCKETS):
+        self.buckets = buckets
+        self.counts = None
+        self.lengths = None
+        self.size = 0
+
+    @staticmethod
+    def available():
+        return load_numpy() is not None
+
+    def __len__(self):
+        return self.size
+
+    def bag(self, text: str):
+        """文本的字符袋：(桶编号数组, 计数数组)"""
+        counts = {}
+        for char in text:
+            bucket = ord(char) % self.buckets
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return (np.fromiter(counts.keys(), dtype=np.intp, count=len(counts)),
+                np.fromiter(counts.values(), dtype=np.int32, count=len(counts)))
+
+    def build(self, texts):
+        """为全部文本建立字符袋矩阵"""
+        texts = list(texts)
+        counts = np.zeros((len(texts), self.buckets), dtype=np.uint8)
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        for row, text in enumerate(texts):
+            buckets, values = self.bag(text)
+            counts[row, buckets] = np.minimum(values, 255)
+            lengths[row] = len(text)
+        self.counts = counts
+        self.lengths = lengths
+        self.size = len(texts)
+        return self
+
+    def load(self, counts, lengths):
+        """从快照中的字节（可写的 bytearray）恢复矩阵，不必逐行重建"""
+        load_numpy()
+        self.lengths = np.frombuffer(lengths, dtype=np.int32)
+        self.size = len(self.lengths)
+        self.counts = np.frombuffer(counts, dtype=np.uint8).reshape(self.size, self.buckets)
+        return self
+
+    def to_bytes(self):
+        """(矩阵字节, 长度字节)，供写入快照"""
+        return self.counts[:self.size].tobytes(), self.lengths[:self.size].tobytes()
+
+    def append(self, text: str) -> int:
+        """追加一行，容量不足时按倍数扩容，返回行号"""
+        if self.counts is None:
+            self.build([])
+        if self.size == len(self.lengths):
+            capacity = max(16, self.size * 2)
+            counts = np.zeros((capacity, self.buckets), dtype=np.uint8)
+            lengths = np.zeros(capacity, dtype=np.int32)
+            counts[:self.size] = self.counts[:self.size]
+            lengths[:self.size] = self.lengths[:self.size]
+            self.counts = counts
+            self.lengths = lengths
+        row = self.size
+        buckets, values = self.bag(text)
+        self.counts[row] = 0
+        self.counts[row, buckets] = np.minimum(values, 255)
+        self.lengths[row] = len(text)
+        self.size += 1
+        return row
+
+    def clear(self, row: int):
+        """清空一行（已删除的条目），其上界恒为 0"""
+        self.counts[row] = 0
+
+    def upper_bounds(self, text: str):
+        """整个语料对 text 的 fuzz.ratio 上界（0-100）"""
+        if not text or not len(self):
+            return np.zeros(len(self), dtype=np.float32)
+        buckets, values = self.bag(text)
+        shared = np.minimum(self.counts[:self.size, buckets], values).sum(axis=1)
+        return 200.0 * shared / (len(text) + self.lengths[:self.size])
+
+    def shortlist(self, text: str, min_ratio: int = 60, top_k: int = None):
+        """返回上界超过 min_ratio 的条目下标，最多 top_k 个（按上界部分排序）"""
+        bounds = self.upper_bounds(text)
+        ids = np.flatnonzero(bounds > min_ratio)
+        if top_k is not None and len(ids) > top_k:
+            keep = np.argpartition(bounds[ids], len(ids) - top_k)[-top_k:]
+            ids = ids[keep]
+        return ids
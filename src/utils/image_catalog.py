@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.utils.similarity_index import SimilarityIndex
+
+# dHash 的边长：8x8 个相邻像素比较，共 64 位
+HASH_SIZE = 8
+# dHash 汉明距离不超过该值视为近似重复
+NEAR_DISTANCE = 6
+# "相似图片" 查询的默认汉明距离上限
+SIMILAR_DISTANCE = 16
+CATALOG_VERSION = 1
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dhash(image_path, hash_size: int = HASH_SIZE) -> int:
+    """差值感知哈希：缩小为 (hash_size+1) x hash_size 的灰度图，比较左右相邻像素"""
+    from PIL import Image
+    with Image.open(image_path) as image:
+        # JPEG 直接按比例缩小解码
+        image.draft('L', (hash_size * 8, hash_size * 8))
+        image = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        pixels = list(image.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def hash_job(image_path):
+    """进程池任务：返回 (路径, 修改时间, 大小, sha256, dHash)，失败时哈希为 None"""
+    try:
+        stat = os.stat(image_path)
+        return image_path, stat.st_mtime_ns, stat.st_size, file_sha256(image_path), dhash(image_path)
+    except Exception as e:
+        print(f"计算图片哈希失败 {image_path}: {e}")
+        return image_path, None, None, None, None
+
+
+class ImageCatalog:
+    """图片内容目录：每个文件的 sha256 和 dHash
+
+    结果按 (修改时间, 大小) 缓存在 data/cache/catalog.json，只有变化的文件才重新计算。
+    内容完全相同的文件共用一个规范路径（字典序最小的那个），
+    缩略图和剪贴板数据都按规范路径缓存，重复的图片只解码一次。
+    """
+    def __init__(self, cache_path):
+        self.cache_path = Path(cache_path)
+        self.records = {}
+        self.canonical_paths = {}
+        self.similarity_index = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """读取缓存的哈希"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CATALOG_VERSION:
+                self.records = {path: tuple(record) for path, record in data['records'].items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取图片目录缓存失败: {e}")
+        self._update_canonical()
+        return self
+
+    def save(self):
+        temp_path = self.cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            with self.lock:
+                data = {'version': CATALOG_VERSION, 'records': self.records}
+                text = json.dumps(data, ensure_ascii=False)
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(text, encoding='utf-8')
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"保存图片目录缓存失败: {e}")
+
+    def stale_paths(self, image_paths):
+        """修改时间或大小与缓存不一致的图片"""
+        stale = []
+        for image_path in image_paths:
+            record = self.records.get(image_path)
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                continue
+            if record is None or record[0] != stat.st_mtime_ns or record[1] != stat.st_size:
+                stale.append(image_path)
+        return stale
+
+    def discard_stale(self, image_paths):
+        """删除已不存在或已变化的记录（只 stat，不读文件），返回需要重新计算的路径
+
+        在重新计算完成之前，变化的文件不会被错误地当作其他文件的重复。
+        """
+        image_paths = [str(path) for path in image_paths]
+        stale = self.stale_paths(image_paths)
+        current = set(image_paths)
+        with self.lock:
+            for path in [path for path in self.records if path not in current]:
+                del self.records[path]
+            for path in stale:
+                self.records.pop(path, None)
+        self._update_canonical()
+        return stale
+
+    def compute(self, image_paths, max_workers: int = None):
+        """用进程池并行计算哈希并保存"""
+        image_paths = list(image_paths)
+        if image_paths:
+            workers = min(max_workers or os.cpu_count() or 1, len(image_paths))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(hash_job, image_paths, chunksize=8))
+            with self.lock:
+                for image_path, mtime, size, sha256, perceptual in results:
+                    if sha256 is not None:
+                        self.records[image_path] = (mtime, size, sha256, perceptual)
+            self._update_canonical()
+        self.save()
+        return len(image_paths)
+
+    def update(self, image_paths, max_workers: int = None):
+        """与当前图片列表同步，返回重新计算的文件数"""
+        return self.compute(self.discard_stale(image_paths), max_workers)
+
+    def forget(self, image_path):
+        """图片被修改或删除时移除其记录，下次 update 时重新计算"""
+        with self.lock:
+            removed = self.records.pop(str(image_path), None)
+        if removed is not None:
+            self._update_canonical()
+
+    def _update_canonical(self):
+        by_hash = {}
+        with self.lock:
+            for path, record in self.records.items():
+                by_hash.setdefault(record[2], []).append(path)
+        canonical_paths = {}
+        for paths in by_hash.values():
+            if len(paths) > 1:
+                keep = min(paths)
+                for path in paths:
+                    canonical_paths[path] = keep
+        self.canonical_paths = canonical_paths
+        # 记录变化后，相似查询的哈希数组在下次查询时重建
+        self.similarity_index = None
+
+    def canonical(self, image_path) -> str:
+        """内容相同的图片共用的路径，没有重复时返回自身"""
+        image_path = str(image_path)
+        return self.canonical_paths.get(image_path, image_path)
+
+    def similarity(self) -> SimilarityIndex:
+        """规范路径的 dHash 数组，按需构建"""
+        index = self.similarity_index
+        if index is None:
+            with self.lock:
+                items = [(path, record[3]) for path, record in self.records.items()
+                         if self.canonical(path) == path]
+            index = self.similarity_index = SimilarityIndex(items)
+        return index
+
+    def similar(self, image_path, k: int = 20, max_distance: int = SIMILAR_DISTANCE):
+        """与图片视觉上相似的其他图片：[(规范路径, 汉明距离)]
+
+        只用已缓存的哈希，不打开图片；图片还没有计算哈希时返回空列表。
+        与它内容完全相同的文件不计入结果。
+        """
+        path = self.canonical(image_path)
+        record = self.records.get(path)
+        if record is None:
+            return []
+        return self.similarity().nearest(record[3], k, max_distance, exclude={path})
+
+    def exact_duplicates(self):
+        """内容完全相同的文件分组"""
+        groups = {}
+        for path, keep in self.canonical_paths.items():
+            groups.setdefault(keep, []).append(path)
+        return [sorted(paths) for _, paths in sorted(groups.items())]
+
+    def near_duplicates(self, max_distance: int = NEAR_DISTANCE):
+        """dHash 汉明距离不超过 max_distance 的文件分组（不含完全相同的）
+
+        把 64 位哈希切成 max_distance + 1 段：距离不超过 max_distance 的两个哈希
+        至少有一段完全相同，只需比较同一段取值相同的候选对。
+        """
+        with self.lock:
+            items = [(path, record[3]) for path, record in self.records.items()
+                     if self.canonical(path) == path]
+        bands = max_distance + 1
+        bits = HASH_SIZE * HASH_SIZE
+        width = -(-bits // bands)
+        buckets = {}
+        for index, (_, value) in enumerate(items):
+            for band in range(bands):
+                key = (band, (value >> (band * width)) & ((1 << width) - 1))
+                buckets.setdefault(key, []).append(index)
+
+        parent = list(range(len(items)))
+
+        def find(index):
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        checked = set()
+        for members in buckets.values():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    if (a, b) in checked:
+                        continue
+                    checked.add((a, b))
+                    if hamming(items[a][1], items[b][1]) <= max_distance:
+                        parent[find(a)] = find(b)
+
+        groups = {}
+        for index in range(len(items)):
+            groups.setdefault(find(index), []).append(items[index][0])
+        return sorted(sorted(paths) for paths in groups.values() if len(paths) > 1)
+
+    def report(self, metadata_items=None, max_distance: int = NEAR_DISTANCE, base_path=None):
+        """重复文件和 image_map.json 对账报告"""
+        def display(path):
+            if base_path is None:
+                return path
+            try:
+                return str(Path(path).relative_to(base_path))
+            except ValueError:
+                return path
+
+        exact = self.exact_duplicates()
+        near = self.near_duplicates(max_distance)
+        report = {
+            'files': len(self.records),
+            'exact_duplicates': [[display(path) for path in group] for group in exact],
+            'near_duplicates': [[display(path) for path in group] for group in near],
+            'redundant_files': sum(len(group) - 1 for group in exact)
+        }
+
+        if metadata_items is not None:
+            # image_map.json 与实际文件对账
+            listed = {}
+            for item in metadata_items:
+                file_name = item.get('file_name')
+                if file_name:
+                    listed[file_name] = listed.get(file_name, 0) + 1
+            present = {Path(path).name for path in self.records}
+            report['map_entries'] = len(metadata_items)
+            report['map_duplicate_entries'] = sorted(name for name, count in listed.items() if count > 1)
+            report['map_missing_files'] = sorted(name for name in listed if name not in present)
+            report['files_not_in_map'] = sorted(name for name in present if name not in listed)
+        return report
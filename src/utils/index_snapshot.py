@@ -0,0 +1,280 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from importlib.util import find_spec
+
+from src.utils.search_index import IndexEntry
+
+
+SNAPSHOT_MAGIC = b'MEMEIDX\0'
+SNAPSHOT_VERSION = 2
+# 每个条目保存的字段，顺序即字符串表中的顺序；path 保存为相对 images 目录的路径
+FIELDS = ('name', 'path', 'lower', 'simp', 'trad', 'pinyin')
+# 魔数、版本、条目数、转换器标识长度、是否附带倒排表
+HEADER = struct.Struct('<8sIIII')
+# 倒排表：n-gram 数、条目 id 总数
+POSTINGS_HEADER = struct.Struct('<II')
+# 字符袋矩阵：桶数（0 表示没有矩阵）、行数
+FUZZY_HEADER = struct.Struct('<II')
+
+
+def converter_key() -> str:
+    """快照内容取决于 OpenCC / pypinyin 是否可用，二者变化后快照作废
+
+    只检查模块是否存在，不导入（导入本身正是快照要省掉的开销）。
+    """
+    return (f"opencc={find_spec('opencc') is not None};"
+            f"pypinyin={find_spec('pypinyin') is not None};"
+            f"byteorder={sys.byteorder}")
+
+
+def padding(length: int) -> int:
+    """把偏移量对齐到 8 字节"""
+    return -length % 8
+
+
+def relative_path(image_path, images_path) -> str:
+    """快照中的路径：相对 images 目录，移动安装目录后仍然有效
+
+    每个条目都要比较一次，用字符串前缀判断，不构造 Path。
+    """
+    image_path = str(image_path)
+    root = os.path.join(str(images_path), '')
+    if image_path.startswith(root):
+        return image_path[len(root):].replace(os.sep, '/')
+    return image_path
+
+
+def pack_postings(postings: dict) -> bytes:
+    """倒排表：n-gram 偏移表、n-gram 字符串、id 偏移表、id 数组，各段按 8 字节对齐"""
+    gram_offsets = array('I', [0])
+    grams = bytearray()
+    id_offsets = array('I', [0])
+    ids = array('I')
+    for gram, posting in postings.items():
+        grams += gram.encode('utf-8')
+        gram_offsets.append(len(grams))
+        ids.extend(sorted(posting))
+        id_offsets.append(len(ids))
+    grams += b'\0' * padding(len(grams))
+    parts = [POSTINGS_HEADER.pack(len(postings), len(ids)), gram_offsets.tobytes()]
+    parts.append(b'\0' * padding(len(parts[1])))
+    parts += [bytes(grams), id_offsets.tobytes()]
+    parts.append(b'\0' * padding(len(parts[-1])))
+    parts.append(ids.tobytes())
+    parts.append(b'\0' * padding(len(parts[-1])))
+    return b''.join(parts)
+
+
+def unpack_postings(buffer, offset: int):
+    """读出 pack_postings 写入的倒排表，返回 (n-gram -> id 集合, 下一段的偏移)"""
+    count, total = POSTINGS_HEADER.unpack_from(buffer, offset)
+    offset += POSTINGS_HEADER.size
+
+    def take(length):
+        nonlocal offset
+        view = buffer[offset:offset + length]
+        offset += length + padding(length)
+        return view
+
+    gram_offsets = take((count + 1) * 4).cast('I')
+    grams = bytes(take(gram_offsets[count]))
+    id_offsets = take((count + 1) * 4).cast('I')
+    ids = take(total * 4).cast('I')
+    postings = {}
+    for i in range(count):
+        gram = grams[gram_offsets[i]:gram_offsets[i + 1]].decode('utf-8')
+        postings[gram] = set(ids[id_offsets[i]:id_offsets[i + 1]])
+    for view in (gram_offsets, id_offsets, ids):
+        view.release()
+    return postings, offset
+
+
+class IndexSnapshot:
+    """内存映射的搜索索引快照
+
+    文件布局：头部、转换器标识、uint32 偏移表（条目数 x 字段数 + 1）、
+    UTF-8 字符串表；附带倒排表时其后依次是文本倒排表、拼音倒排表和
+    模糊匹配的字符袋矩阵。字符串只在访问时才从映射中解码。
+    """
+    def __init__(self, path, buffer, mapping=None):
+        self.path = path
+        self.mapping = mapping
+        self.buffer = buffer
+        magic, version, count, key_length, has_tables = HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("快照版本不匹配")
+        offset = HEADER.size
+        self.key = bytes(buffer[offset:offset + key_length]).decode('utf-8')
+        offset += key_length + padding(key_length)
+        table_length = count * len(FIELDS) + 1
+        self.offsets = buffer[offset:offset + table_length * 4].cast('I')
+        offset += table_length * 4 + padding(table_length * 4)
+        strings_length = self.offsets[table_length - 1]
+        self.strings = buffer[offset:offset + strings_length]
+        self.tables_offset = offset + strings_length + padding(strings_length) if has_tables else None
+        self.count = count
+
+    @classmethod
+    def open(cls, path):
+        """映射快照文件，文件不存在或已损坏时返回 None"""
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        view = memoryview(mapping)
+        try:
+            return cls(path, view, mapping)
+        except (ValueError, TypeError, struct.error) as e:
+            # 旧版本或损坏的快照，调用方会重新计算并覆盖
+            print(f"索引快照无效 {path}: {e}")
+        # 离开 except 后未构造完的快照对象及其切片视图才被回收，这时映射才能关闭
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:
+            pass
+        return None
+
+    def __len__(self):
+        return self.count
+
+    def field(self, entry_id: int, field: int) -> str:
+        slot = entry_id * len(FIELDS) + field
+        return bytes(self.strings[self.offsets[slot]:self.offsets[slot + 1]]).decode('utf-8')
+
+    def entry(self, entry_id: int, path: str) -> IndexEntry:
+        """快照中的条目，path 为图片当前的完整路径"""
+        name, _, lower, simp, trad, pinyin = (self.field(entry_id, field) for field in range(len(FIELDS)))
+        return IndexEntry(name, path, lower, simp, trad, pinyin)
+
+    def names(self) -> dict:
+        """名称 -> 快照中的条目编号"""
+        return {self.field(entry_id, 0): entry_id for entry_id in range(self.count)}
+
+    def tables(self):
+        """快照附带的倒排表和字符袋矩阵，没有时返回 None
+
+        返回 {'postings', 'pinyin_postings', 'fuzzy'}，fuzzy 为 (桶数, 矩阵字节, 长度字节) 或 None。
+        数据复制出映射，关闭快照后仍可使用。
+        """
+        if self.tables_offset is None:
+            return None
+        postings, offset = unpack_postings(self.buffer, self.tables_offset)
+        pinyin_postings, offset = unpack_postings(self.buffer, offset)
+        buckets, rows = FUZZY_HEADER.unpack_from(self.buffer, offset)
+        offset += FUZZY_HEADER.size
+        fuzzy = None
+        if buckets:
+            counts_length = rows * buckets
+            counts = bytearray(self.buffer[offset:offset + counts_length])
+            offset += counts_length + padding(counts_length)
+            lengths = bytearray(self.buffer[offset:offset + rows * 4])
+            fuzzy = (buckets, counts, lengths)
+        return {'postings': postings, 'pinyin_postings': pinyin_postings, 'fuzzy': fuzzy}
+
+    def close(self):
+        # 先释放所有 memoryview，mmap 才能关闭
+        self.offsets.release()
+        self.strings.release()
+        self.buffer.release()
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+
+def write_snapshot(path, entries, images_path, index=None, key: str = None):
+    """把条目写成快照（先写临时文件再原子替换）
+
+    index 为用这些条目建好的 SearchIndex 时同时写入其倒排表和字符袋矩阵，
+    下次启动图片列表不变时直接读取，不必重建。
+    """
+    key_bytes = (key if key is not None else converter_key()).encode('utf-8')
+    offsets = array('I', [0])
+    strings = bytearray()
+    for entry in entries:
+        for field in FIELDS:
+            value = relative_path(entry.path, images_path) if field == 'path' else getattr(entry, field)
+            strings += value.encode('utf-8')
+            offsets.append(len(strings))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(entries), len(key_bytes),
+                                index is not None))
+            f.write(key_bytes)
+            f.write(b'\0' * padding(len(key_bytes)))
+            f.write(offsets.tobytes())
+            f.write(b'\0' * padding(len(offsets) * 4))
+            f.write(strings)
+            f.write(b'\0' * padding(len(strings)))
+            if index is not None:
+                f.write(pack_postings(index.postings))
+                f.write(pack_postings(index.pinyin_postings))
+                fuzzy = index.fuzzy_matrix()
+                if fuzzy is None:
+                    f.write(FUZZY_HEADER.pack(0, 0))
+                else:
+                    buckets, counts, lengths = fuzzy
+                    f.write(FUZZY_HEADER.pack(buckets, len(entries)))
+                    f.write(counts)
+                    f.write(b'\0' * padding(len(counts)))
+                    f.write(lengths)
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        print(f"写入索引快照失败 {path}: {e}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+
+
+def load_entries(path, image_map: dict, make_entry, images_path):
+    """按当前图片列表从快照取出条目，只为新增或改名的图片重新计算
+
+    快照中的名称、相对路径与目录列表一致时直接复用，不调用 OpenCC/pypinyin。
+    图片列表与快照完全相同（包括顺序）时连同倒排表和字符袋矩阵一起返回，
+    否则 tables 为 None，调用方建好索引后应调用 write_snapshot 写回。
+    返回 (条目列表, tables, {'reused', 'computed', 'removed'})，
+    removed 只统计快照中已不存在的名称，路径变化的条目计入 computed。
+    """
+    key = converter_key()
+    snapshot = IndexSnapshot.open(path)
+    if snapshot is not None and snapshot.key != key:
+        snapshot.close()
+        snapshot = None
+    known = snapshot.names() if snapshot is not None else {}
+
+    entries = []
+    reused = 0
+    in_order = snapshot is not None and len(known) == len(image_map)
+    for position, (name, image_path) in enumerate(image_map.items()):
+        entry_id = known.get(name)
+        if entry_id is not None and snapshot.field(entry_id, 1) == relative_path(image_path, images_path):
+            entries.append(snapshot.entry(entry_id, image_path))
+            reused += 1
+            in_order = in_order and entry_id == position
+        else:
+            entries.append(make_entry(name, image_path))
+            in_order = False
+
+    tables = None
+    if snapshot is not None:
+        if in_order:
+            try:
+                tables = snapshot.tables()
+            except (ValueError, TypeError, struct.error, UnicodeDecodeError) as e:
+                print(f"索引快照的倒排表无效 {path}: {e}")
+        snapshot.close()
+    stats = {
+        'reused': reused,
+        'computed': len(entries) - reused,
+        'removed': len(known.keys() - image_map.keys())
+    }
+    return entries, tables, stats
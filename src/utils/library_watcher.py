@@ -0,0 +1,304 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import Callable
+
+# 与 load_image_map 一致的图片扩展名
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif')
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_image(path) -> bool:
+    return Path(path).suffix.lower() in IMAGE_SUFFIXES
+
+
+def scan_library(images_path) -> dict:
+    """图片库快照：绝对路径 -> (修改时间, 文件大小)"""
+    snapshot = {}
+    for root, _, files in os.walk(images_path):
+        for file_name in files:
+            if not is_image(file_name):
+                continue
+            path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(old: dict, new: dict):
+    """比较两个快照，返回事件列表
+
+    消失和新出现的文件若修改时间和大小都相同，视为重命名。
+    """
+    removed = {path: stamp for path, stamp in old.items() if path not in new}
+    added = {path: stamp for path, stamp in new.items() if path not in old}
+    events = []
+
+    removed_by_stamp = {}
+    for path, stamp in removed.items():
+        removed_by_stamp.setdefault(stamp, []).append(path)
+    for path, stamp in added.items():
+        candidates = removed_by_stamp.get(stamp)
+        if candidates:
+            old_path = candidates.pop()
+            del removed[old_path]
+            events.append(LibraryEvent('renamed', path, old_path))
+        else:
+            events.append(LibraryEvent('added', path))
+
+    events.extend(LibraryEvent('removed', path) for path in removed)
+    events.extend(
+        LibraryEvent('modified', path)
+        for path, stamp in new.items()
+        if path in old and old[path] != stamp
+    )
+    return events
+
+
+class LibraryEvent:
+    """图片库变化：added / removed / modified / renamed"""
+    __slots__ = ('kind', 'path', 'old_path')
+
+    def __init__(self, kind: str, path: str, old_path: str = None):
+        self.kind = kind
+        self.path = path
+        self.old_path = old_path
+
+    def __repr__(self):
+        if self.old_path:
+            return f"LibraryEvent({self.kind}, {self.old_path} -> {self.path})"
+        return f"LibraryEvent({self.kind}, {self.path})"
+
+
+class LibraryWatcher:
+    """监视图片目录，把增删改逐条通知给 on_event
+
+    Linux 上使用 inotify（递归监视所有子目录），其他平台或 inotify 不可用时
+    每隔 poll_interval 秒比较一次修改时间快照。
+    on_event(event) 在后台线程中调用，需要自行切回 Tk 线程。
+    """
+    def __init__(self, images_path, on_event: Callable, backend: str = 'auto',
+                 poll_interval: float = 2.0):
+        self.images_path = str(images_path)
+        self.on_event = on_event
+        self.poll_interval = poll_interval
+        self.snapshot = {}
+        self.running = False
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.libc = None
+        self.fd = None
+        self.watches = {}
+
+        if backend == 'auto':
+            backend = 'inotify' if self.inotify_available() else 'poll'
+        if backend not in ('inotify', 'poll'):
+            raise ValueError(f"未知的监视后端: {backend}")
+        self.backend = backend
+
+    @staticmethod
+    def inotify_available():
+        return sys.platform.startswith('linux') and ctypes.util.find_library('c') is not None
+
+    def start(self):
+        """开始监视（以当前目录内容为基准，不产生初始事件）"""
+        if self.running:
+            return
+        self.snapshot = scan_library(self.images_path)
+        if self.backend == 'inotify':
+            try:
+                self._init_inotify()
+            except OSError as e:
+                print(f"inotify 初始化失败，改用轮询: {e}")
+                self.backend = 'poll'
+        self.running = True
+        self.stop_event.clear()
+        target = self._run_inotify if self.backend == 'inotify' else self._run_poll
+        self.thread = threading.Thread(target=target, name='LibraryWatcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止监视"""
+        self.running = False
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            self.watches = {}
+
+    def _emit(self, event: LibraryEvent):
+        try:
+            self.on_event(event)
+        except Exception as e:
+            print(f"处理图片库变化失败 {event}: {e}")
+            traceback.print_exc()
+
+    def _stamp(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # 轮询后端
+    def _run_poll(self):
+        while not self.stop_event.wait(self.poll_interval):
+            self.rescan()
+
+    def rescan(self):
+        """重新扫描目录，与上次快照比较后发出事件"""
+        snapshot = scan_library(self.images_path)
+        events = diff_snapshots(self.snapshot, snapshot)
+        self.snapshot = snapshot
+        for event in events:
+            self._emit(event)
+
+    # inotify 后端
+    def _init_inotify(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.fd = fd
+        self.watches = {}
+        for root, _, _ in os.walk(self.images_path):
+            self._add_watch(root)
+
+    def _add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            print(f"无法监视目录 {directory}: {os.strerror(errno)}")
+            return
+        self.watches[wd] = directory
+
+    def _run_inotify(self):
+        while self.running:
+            try:
+                readable, _, _ = select.select([self.fd], [], [], 0.5)
+                if not readable:
+                    continue
+                data = os.read(self.fd, 64 * 1024)
+            except (OSError, ValueError, TypeError):
+                # stop() 关闭了描述符
+                return
+            for event in self._parse(data):
+                self._emit(event)
+
+    def _read_events(self, data):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            yield wd, mask, cookie, os.fsdecode(name)
+
+    def _parse(self, data):
+        """把一次读到的 inotify 事件转换为图片库事件
+
+        同一批中 cookie 相同的 MOVED_FROM / MOVED_TO 合并为重命名；
+        只有一半的（移出或移入监视目录）分别视为删除和新增。
+        """
+        events = []
+        moved_from = {}
+
+        for wd, mask, cookie, name in self._read_events(data):
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，丢失的变化只能靠重新扫描补回
+                self.rescan()
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & IN_ISDIR:
+                events.extend(self._directory_event(mask, path))
+            elif not is_image(name):
+                continue
+            elif mask & IN_MOVED_FROM:
+                moved_from[cookie] = path
+            elif mask & IN_MOVED_TO:
+                old_path = moved_from.pop(cookie, None)
+                if old_path is not None:
+                    stamp = self.snapshot.pop(old_path, None) or self._stamp(path)
+                    self.snapshot[path] = stamp
+                    events.append(LibraryEvent('renamed', path, old_path))
+                else:
+                    events.extend(self._file_written(path))
+            elif mask & IN_CLOSE_WRITE:
+                events.extend(self._file_written(path))
+            elif mask & IN_DELETE:
+                if self.snapshot.pop(path, None) is not None:
+                    events.append(LibraryEvent('removed', path))
+
+        for path in moved_from.values():
+            if self.snapshot.pop(path, None) is not None:
+                events.append(LibraryEvent('removed', path))
+        return events
+
+    def _file_written(self, path):
+        stamp = self._stamp(path)
+        if stamp is None:
+            return []
+        previous = self.snapshot.get(path)
+        self.snapshot[path] = stamp
+        if previous is None:
+            return [LibraryEvent('added', path)]
+        if previous != stamp:
+            return [LibraryEvent('modified', path)]
+        return []
+
+    def _directory_event(self, mask, path):
+        """子目录新建/移入时开始监视并补发其中文件，删除/移出时删除其中文件"""
+        events = []
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            for root, _, _ in os.walk(path):
+                self._add_watch(root)
+            for file_path, stamp in scan_library(path).items():
+                if file_path not in self.snapshot:
+                    self.snapshot[file_path] = stamp
+                    events.append(LibraryEvent('added', file_path))
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            prefix = path + os.sep
+            # 移动后 inotify 会沿用同一个 wd，移入时 _add_watch 会重新登记路径
+            for wd, directory in list(self.watches.items()):
+                if directory == path or directory.startswith(prefix):
+                    del self.watches[wd]
+            for file_path in [p for p in self.snapshot if p.startswith(prefix)]:
+                del self.snapshot[file_path]
+                events.append(LibraryEvent('removed', file_path))
+        return events
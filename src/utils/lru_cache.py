@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+
+class LRUCache:
+    """按条目数和/或字节数限制容量的 LRU 缓存
+
+    超出预算时淘汰最久未使用的条目，并记录命中、未命中和淘汰次数。
+    """
+    def __init__(self, max_entries: int = None, max_bytes: int = None, sizeof: Callable = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        """读取条目并标记为最近使用"""
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """写入条目，必要时淘汰旧条目"""
+        with self.lock:
+            if key in self.items:
+                self.total_bytes -= self.sizes.pop(key)
+                del self.items[key]
+            size = self.sizeof(value)
+            self.items[key] = value
+            self.sizes[key] = size
+            self.total_bytes += size
+            self._evict()
+        return value
+
+    def pop(self, key, default=None):
+        """移除条目"""
+        with self.lock:
+            if key not in self.items:
+                return default
+            self.total_bytes -= self.sizes.pop(key)
+            return self.items.pop(key)
+
+    def clear(self):
+        """清空缓存（保留统计）"""
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    def _evict(self):
+        # 至少保留刚写入的条目
+        while len(self.items) > 1 and (
+            (self.max_entries is not None and len(self.items) > self.max_entries)
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key, _ = self.items.popitem(last=False)
+            self.total_bytes -= self.sizes.pop(key)
+            self.evictions += 1
+
+    def stats(self):
+        """返回缓存统计"""
+        return {
+            'entries': len(self.items),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,232 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+TIER_VERSION = 1
+# 优化副本的格式和扩展名
+TIER_FORMATS = {'jpeg': '.jpg', 'webp': '.webp'}
+MANIFEST_NAME = 'manifest.json'
+
+
+def optimize_job(source, target, max_dimension: int, format: str, quality: int, progressive: bool = False):
+    """进程池任务：缩放并重新编码一张图片，返回 (源路径, 清单记录或 None)
+
+    默认生成基线 JPEG：渐进式 JPEG 体积几乎相同，但本地完整解码和 draft 缩小解码都慢一倍左右。
+
+    动图和带透明通道但目标格式为 JPEG 的图片不生成副本，记录的 output 为 None，
+    重新编码后反而更大的图片同样如此，这些图片始终读取原图。
+    """
+    from PIL import Image
+    try:
+        # 先取源文件的状态：处理过程中源文件被替换时，下次运行会重新处理
+        stat = os.stat(source)
+        record = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'output': None}
+        with Image.open(source) as image:
+            if getattr(image, 'is_animated', False):
+                return source, record
+            original_size = image.size
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            if has_alpha and format == 'jpeg':
+                return source, record
+            if max_dimension:
+                image.draft('RGB', (max_dimension, max_dimension))
+                image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        if format == 'webp':
+            image.save(temp_path, 'WEBP', quality=quality, method=4)
+        else:
+            image.save(temp_path, 'JPEG', quality=quality, progressive=progressive, optimize=True)
+
+        output_bytes = temp_path.stat().st_size
+        if image.size == original_size and output_bytes >= stat.st_size:
+            temp_path.unlink()
+            return source, record
+        os.replace(temp_path, target)
+        record.update(output=str(target), bytes=output_bytes, dimensions=list(image.size))
+        return source, record
+    except Exception as e:
+        print(f"优化图片失败 {source}: {e}")
+        return source, None
+
+
+class OptimizedTier:
+    """图片库的优化副本（缩放到发送尺寸，重新编码为 JPEG 或 WebP）
+
+    副本保存在 root 下与 images 相同的相对路径（追加新扩展名），
+    清单 manifest.json 记录每个副本对应的源文件修改时间和大小。
+    resolve() 只在源文件未变化且副本存在时返回副本路径，否则返回原图，
+    所以副本缺失、过期或从未生成时都能正常工作。
+    只会删除清单曾经引用过的副本，不会动 root 中的其他文件。
+    """
+    def __init__(self, root, images_path):
+        self.root = Path(root)
+        self.images_path = Path(images_path)
+        self.settings = None
+        self.files = {}
+        # 清单引用过的副本（相对 root），prune() 只在其中删除
+        self.known_outputs = set()
+
+    @property
+    def manifest_path(self):
+        return self.root / MANIFEST_NAME
+
+    def load(self):
+        """读取清单"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == TIER_VERSION:
+                self.settings = data['settings']
+                self.files = data['files']
+            self.known_outputs = {
+                record['output'] for record in data.get('files', {}).values()
+                if isinstance(record, dict) and record.get('output')
+            }
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取优化图片清单失败: {e}")
+        return self
+
+    def save(self):
+        data = {'version': TIER_VERSION, 'settings': self.settings, 'files': self.files}
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        os.replace(temp_path, self.manifest_path)
+
+    def relative(self, image_path):
+        """图片相对 images 目录的路径，不在其中时返回 None"""
+        try:
+            return Path(image_path).relative_to(self.images_path).as_posix()
+        except ValueError:
+            return None
+
+    def covers(self, max_dimension: int) -> bool:
+        """副本的分辨率是否足够按 max_dimension 发送（0 表示原图）"""
+        if self.settings is None:
+            return False
+        tier_dimension = self.settings['max_dimension']
+        return tier_dimension == 0 or 0 < max_dimension <= tier_dimension
+
+    def resolve(self, image_path) -> str:
+        """解码时实际读取的文件：有效的副本，否则原图"""
+        rel = self.relative(image_path)
+        record = self.files.get(rel) if rel is not None else None
+        if not record or not record.get('output'):
+            return str(image_path)
+        try:
+            stat = os.stat(image_path)
+            if stat.st_mtime_ns != record['mtime'] or stat.st_size != record['size']:
+                return str(image_path)
+            output = self.root / record['output']
+            if output.exists():
+                return str(output)
+        except OSError:
+            pass
+        return str(image_path)
+
+    def is_current(self, image_path) -> bool:
+        rel = self.relative(image_path)
+        record = self.files.get(rel)
+        if record is None:
+            return False
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return False
+        if stat.st_mtime_ns != record['mtime'] or stat.st_size != record['size']:
+            return False
+        return record['output'] is None or (self.root / record['output']).exists()
+
+    def build(self, image_paths, max_dimension: int, format: str = 'jpeg', quality: int = 85,
+              max_workers: int = None, progressive: bool = False) -> dict:
+        """生成或更新副本，只处理变化的文件；返回各类文件数"""
+        if format not in TIER_FORMATS:
+            raise ValueError(f"不支持的优化格式: {format}")
+        if not self.manifest_path.exists() and self.root.exists() and any(self.root.iterdir()):
+            raise ValueError(f"输出目录不为空且没有优化图片清单，拒绝写入: {self.root}")
+        settings = {'max_dimension': max_dimension, 'format': format, 'quality': quality,
+                    'progressive': progressive}
+        if settings != self.settings:
+            # 设置变化后全部重新生成
+            self.files = {}
+            self.settings = settings
+
+        sources = {}
+        for image_path in image_paths:
+            rel = self.relative(image_path)
+            if rel is not None:
+                sources[rel] = str(image_path)
+        removed = [rel for rel in self.files if rel not in sources]
+        for rel in removed:
+            del self.files[rel]
+        stale = [rel for rel, path in sources.items() if not self.is_current(path)]
+
+        failed = 0
+        try:
+            if stale:
+                workers = min(max_workers or os.cpu_count() or 1, len(stale))
+                suffix = TIER_FORMATS[format]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(optimize_job, sources[rel], self.root / f"{rel}{suffix}",
+                                        max_dimension, format, quality, progressive): rel
+                        for rel in stale
+                    }
+                    for future, rel in futures.items():
+                        _, record = future.result()
+                        if record is None:
+                            failed += 1
+                            self.files.pop(rel, None)
+                            continue
+                        if record['output'] is not None:
+                            record['output'] = f"{rel}{suffix}"
+                            self.known_outputs.add(record['output'])
+                        self.files[rel] = record
+        finally:
+            # 中断时也保存已完成的部分
+            self.save()
+        pruned = self.prune()
+        return {
+            'processed': len(stale) - failed,
+            'reused': len(sources) - len(stale),
+            'removed': len(removed),
+            'failed': failed,
+            'pruned': pruned
+        }
+
+    def prune(self) -> int:
+        """删除以前生成、现在清单已不再引用的副本文件"""
+        referenced = {record['output'] for record in self.files.values() if record.get('output')}
+        suffixes = set(TIER_FORMATS.values())
+        root = self.root.resolve()
+        count = 0
+        for output in self.known_outputs - referenced:
+            path = self.root / output
+            if Path(output).suffix not in suffixes or root not in path.resolve().parents:
+                continue
+            try:
+                path.unlink()
+                count += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"删除过期副本失败 {path}: {e}")
+        self.known_outputs = referenced
+        return count
+
+    def stats(self) -> dict:
+        """副本数量和原图、副本的总字节数"""
+        outputs = [record for record in self.files.values() if record.get('output')]
+        return {
+            'files': len(self.files),
+            'optimized': len(outputs),
+            'source_bytes': sum(record['size'] for record in outputs),
+            'optimized_bytes': sum(record['bytes'] for record in outputs)
+        }
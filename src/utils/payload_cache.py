@@ -0,0 +1,172 @@
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from src.utils.clipboard import ClipboardPayload
+from src.utils.lru_cache import LRUCache
+
+
+# 支持的剪贴板格式
+PAYLOAD_FORMATS = ('dib', 'png', 'jpeg')
+
+
+class SendProfile:
+    """发送配置：最大边长（0 表示保持原图）和剪贴板格式"""
+    __slots__ = ('max_dimension', 'format', 'jpeg_quality')
+
+    def __init__(self, max_dimension: int = 0, format: str = 'dib', jpeg_quality: int = 85):
+        if format not in PAYLOAD_FORMATS:
+            raise ValueError(f"不支持的剪贴板格式: {format}")
+        self.max_dimension = max_dimension or 0
+        self.format = format
+        self.jpeg_quality = jpeg_quality
+
+    @classmethod
+    def from_config(cls, config: dict):
+        return cls(
+            config.get('max_dimension', 0),
+            config.get('format', 'dib').lower(),
+            config.get('jpeg_quality', 85)
+        )
+
+    def key(self):
+        return (self.max_dimension, self.format, self.jpeg_quality)
+
+
+def encode_payload(image_path, profile: SendProfile = None) -> ClipboardPayload:
+    """按发送配置缩放并编码剪贴板数据
+
+    DIB 直接使用 Pillow 的无文件头 DIB 格式，无需再切片复制。
+    """
+    from PIL import Image
+    profile = profile or SendProfile()
+    with Image.open(image_path) as image:
+        if profile.max_dimension:
+            # JPEG 先按比例缩小解码，再精确缩放到目标尺寸
+            image.draft('RGB', (profile.max_dimension, profile.max_dimension))
+            image.thumbnail((profile.max_dimension, profile.max_dimension), Image.LANCZOS)
+        image = image.convert('RGB')
+
+    output = BytesIO()
+    if profile.format == 'png':
+        image.save(output, 'PNG', compress_level=3)
+    elif profile.format == 'jpeg':
+        image.save(output, 'JPEG', quality=profile.jpeg_quality)
+    else:
+        image.save(output, 'DIB')
+    return ClipboardPayload(profile.format, output.getvalue(), image.size)
+
+
+class PayloadCache:
+    """剪贴板数据缓存
+
+    最近发送的表情包保存已编码的数据，按字节数 LRU 淘汰；
+    发送过至少 pin_min_sends 次的表情包固定在单独的一块预算（pin_fraction）中，
+    不受 LRU 淘汰影响，预算不足时先淘汰发送次数最少的固定条目。
+    鼠标悬停或选中结果时调用 prefetch() 在后台线程提前编码，
+    发送时 get() 直接取用，或等待正在进行的编码完成。
+    缓存的是按 profile 缩放、编码后的数据，同一配置下只编码一次。
+    canonical 把内容相同的图片映射到同一路径（见 ImageCatalog），重复的图片共用一份数据。
+    resolve 把图片路径映射到实际解码的文件（见 OptimizedTier）。
+    """
+    def __init__(self, max_bytes: int, profile: SendProfile = None, encoder=encode_payload, canonical=None,
+                 resolve=None, pin_fraction: float = 0.25, pin_min_sends: int = 2):
+        self.profile = profile or SendProfile()
+        self.encoder = encoder
+        self.canonical = canonical
+        self.resolve = resolve
+        self.pin_bytes = int(max_bytes * pin_fraction)
+        self.pin_min_sends = pin_min_sends
+        self.cache = LRUCache(max_bytes=max_bytes - self.pin_bytes, sizeof=len)
+        self.pinned = {}
+        self.pinned_total = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PayloadEncoder')
+        self.in_flight = {}
+        self.send_counts = Counter()
+        self.lock = threading.Lock()
+
+    def key(self, image_path):
+        """缓存键包含修改时间和发送配置，图片被替换或配置变化后自动失效"""
+        if self.canonical is not None:
+            image_path = self.canonical(image_path)
+        try:
+            mtime = os.stat(image_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        return (str(image_path), mtime, self.profile.key())
+
+    def _encode(self, key):
+        try:
+            source = self.resolve(key[0]) if self.resolve is not None else key[0]
+            return self.cache.put(key, self.encoder(source, self.profile))
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def prefetch(self, image_path):
+        """在后台提前编码（已缓存或正在编码时不重复提交）"""
+        key = self.key(image_path)
+        if key in self.cache or key in self.pinned:
+            return
+        with self.lock:
+            if key in self.in_flight:
+                return
+            self.in_flight[key] = self.executor.submit(self._encode, key)
+
+    def get(self, image_path) -> ClipboardPayload:
+        """获取剪贴板数据，未命中时同步编码"""
+        key = self.key(image_path)
+        self.send_counts[key[0]] += 1
+        payload = self.pinned.get(key)
+        if payload is not None:
+            return payload
+        payload = self.cache.get(key)
+        if payload is None:
+            with self.lock:
+                future = self.in_flight.get(key)
+            payload = future.result() if future is not None else self._encode(key)
+        self._pin(key, payload)
+        return payload
+
+    def _pin(self, key, payload):
+        """经常发送的条目移入固定区，必要时淘汰发送次数更少的固定条目"""
+        count = self.send_counts[key[0]]
+        size = len(payload)
+        if count < self.pin_min_sends or size > self.pin_bytes:
+            return
+        with self.lock:
+            if key in self.pinned:
+                return
+            # 图片被替换或配置变化后，旧的固定条目不再可能命中
+            for other in [other for other in self.pinned if other[0] == key[0]]:
+                self.pinned_total -= len(self.pinned.pop(other))
+            # 按发送次数从少到多淘汰，次数不比新条目少的不淘汰
+            victims = []
+            freed = 0
+            for other in sorted(self.pinned, key=lambda other: self.send_counts[other[0]]):
+                if self.pinned_total - freed + size <= self.pin_bytes:
+                    break
+                if self.send_counts[other[0]] >= count:
+                    return
+                victims.append(other)
+                freed += len(self.pinned[other])
+            if self.pinned_total - freed + size > self.pin_bytes:
+                return
+            for other in victims:
+                # 被挤出的条目回到 LRU 区
+                self.cache.put(other, self.pinned.pop(other))
+            self.pinned_total -= freed
+            self.pinned[key] = payload
+            self.pinned_total += size
+        self.cache.pop(key)
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['pinned_entries'] = len(self.pinned)
+        stats['pinned_bytes'] = self.pinned_total
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
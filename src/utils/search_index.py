@@ -0,0 +1,518 @@
+import threading
+import time
+
+# pypinyin 导入需要数百毫秒，首次转换拼音时才导入（见 to_pinyin）
+lazy_pinyin = None
+pinyin_loaded = False
+
+# fuzzywuzzy 同样在第一次归一化查询时才导入（见 load_fuzz）
+fuzz = None
+fuzz_loaded = False
+
+from src.utils.fuzzy_prefilter import FuzzyPrefilter
+from src.utils.facets import FacetIndex, parse_query
+from src.utils.lru_cache import LRUCache
+
+
+# 每处理多少条目检查一次是否取消
+CANCEL_CHECK_INTERVAL = 256
+
+
+class SearchCancelled(Exception):
+    """查询已被更新的查询取代"""
+
+
+class IdentityConverter:
+    """OpenCC 不可用时的占位转换器"""
+    def convert(self, text: str) -> str:
+        return text
+
+
+class LazyConverter:
+    """首次转换时才导入并创建 OpenCC 转换器，失败时原样返回
+
+    传入 profiler 时，实际导入和创建的耗时记为 "OpenCC <配置>" 阶段。
+    """
+    def __init__(self, config: str, profiler=None):
+        self.config = config
+        self.profiler = profiler
+        self.converter = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.converter is None:
+                started = time.perf_counter()
+                try:
+                    import opencc
+                    self.converter = opencc.OpenCC(self.config)
+                    print(f"OpenCC 转换器 {self.config} 初始化成功")
+                except Exception as e:
+                    print(f"警告: OpenCC 初始化失败，将使用简单转换: {e}")
+                    self.converter = IdentityConverter()
+                if self.profiler is not None:
+                    self.profiler.record(f'OpenCC {self.config}', time.perf_counter() - started)
+        return self.converter
+
+    def convert(self, text: str) -> str:
+        converter = self.converter or self.load()
+        return converter.convert(text)
+
+
+def to_pinyin(text: str) -> str:
+    """把文本转换为连续的拼音串，pypinyin 不可用时原样返回"""
+    global lazy_pinyin, pinyin_loaded
+    if not pinyin_loaded:
+        try:
+            from pypinyin import lazy_pinyin
+        except ImportError:
+            lazy_pinyin = None
+        pinyin_loaded = True
+    if lazy_pinyin is None:
+        return text
+    try:
+        return ''.join(lazy_pinyin(text))
+    except Exception:
+        return text
+
+
+def load_fuzz():
+    """导入 fuzzywuzzy，不可用时返回 None"""
+    global fuzz, fuzz_loaded
+    if not fuzz_loaded:
+        try:
+            from fuzzywuzzy import fuzz
+        except ImportError:
+            fuzz = None
+        fuzz_loaded = True
+    return fuzz
+
+
+def char_ngrams(text: str) -> set:
+    """文本的字符一元组和二元组"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def required_grams(text: str) -> set:
+    """包含 text 的字符串必然含有的 n-gram：单字取自身，否则取全部二元组"""
+    if len(text) <= 1:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def intersect_postings(postings: dict, grams) -> set:
+    """求各 n-gram 倒排表的交集，从最短的表开始"""
+    lists = []
+    for gram in grams:
+        posting = postings.get(gram)
+        if not posting:
+            return set()
+        lists.append(posting)
+    lists.sort(key=len)
+    candidates = set(lists[0])
+    for posting in lists[1:]:
+        candidates &= posting
+        if not candidates:
+            break
+    return candidates
+
+
+class IndexEntry:
+    """单个表情包的预处理形式"""
+    __slots__ = ('name', 'path', 'lower', 'simp', 'trad', 'pinyin', 'forms')
+
+    def __init__(self, name, path, lower, simp, trad, pinyin):
+        self.name = name
+        self.path = path
+        self.lower = lower
+        self.simp = simp
+        self.trad = trad
+        self.pinyin = pinyin
+        # 去重后的文本形式，包含/部分匹配时逐一检查
+        self.forms = tuple(dict.fromkeys((lower, simp, trad)))
+
+
+class NormalizedQuery:
+    """归一化后的查询：每次搜索只计算一次"""
+    __slots__ = ('text', 'texts', 'pinyin', 'parts')
+
+    def __init__(self, text, texts, pinyin, parts):
+        self.text = text
+        self.texts = texts
+        self.pinyin = pinyin
+        self.parts = parts
+
+
+class RefineState:
+    """上一次查询的候选集合，供追加输入时复用"""
+    __slots__ = ('groups', 'allowed', 'texts', 'contains')
+
+    def __init__(self, groups, allowed, texts, contains):
+        self.groups = groups
+        self.allowed = allowed
+        self.texts = texts
+        self.contains = contains
+
+
+class SearchIndex:
+    """表情包搜索索引
+
+    在加载图片映射时一次性计算每个名称的小写、简体、繁体和拼音形式，
+    搜索时只需要归一化查询文本。
+
+    同时为文本形式建立字符一元组/二元组倒排索引，为拼音建立单独的倒排索引。
+    查询时先用倒排表求出候选集合，只有候选才会进入完整的打分。
+    模糊匹配的候选由 FuzzyPrefilter 对整个语料做向量化上界估计，
+    fuzzy_shortlist 限制每个查询最多精确计算多少个 ratio（None 表示不限）。
+    字符袋矩阵在第一次模糊匹配时才建立（也可以提前调用 prepare()），不拖慢启动。
+
+    image_map.json 中的 author/episode/tags 建立倒排索引，查询里的
+    author:愛音 ep:11 等筛选条件在打分之前用集合运算求出允许的条目。
+
+    最近的查询结果保存在 LRU 缓存中（重建索引时清空）。新查询是上一次查询的
+    追加输入时，包含匹配只需在上一次的候选集合中筛选，筛选结果也直接复用。
+
+    add()/remove() 逐个增删条目：删除的条目留下空位（None），id 不会复用，
+    直到下一次 build() 重建时才压缩。
+    """
+    def __init__(self, t2s=None, s2t=None, fuzzy_shortlist: int = None, query_cache_size: int = 128):
+        self.t2s = t2s or IdentityConverter()
+        self.s2t = s2t or IdentityConverter()
+        self.fuzzy_shortlist = fuzzy_shortlist
+        self.query_cache = LRUCache(max_entries=query_cache_size)
+        self.refine_state = None
+        self.lock = threading.RLock()
+        self.entries = []
+        self.ids = {}
+        self.postings = {}
+        self.pinyin_postings = {}
+        self.fuzzy = None
+        self.fuzzy_ready = False
+        # 索引快照中的字符袋矩阵 (桶数, 矩阵字节, 长度字节)，建立矩阵时直接使用
+        self.fuzzy_source = None
+        self.facets = FacetIndex(self.normalize_facet)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def make_entry(self, name: str, path: str) -> IndexEntry:
+        """计算单个名称的各种形式"""
+        lower = name.lower()
+        return IndexEntry(
+            name,
+            path,
+            lower,
+            self.t2s.convert(lower),
+            self.s2t.convert(lower),
+            to_pinyin(lower)
+        )
+
+    def normalize_facet(self, value) -> str:
+        """筛选取值统一为小写简体（只在查询筛选条件时调用）"""
+        return self.t2s.convert(str(value).lower())
+
+    def build(self, image_map: dict, metadata: dict = None):
+        """根据图片映射重建索引，metadata 为 名称 -> {author, episode, tags}"""
+        entries = [self.make_entry(name, path) for name, path in image_map.items()]
+        return self.build_entries(entries, metadata)
+
+    def build_entries(self, entries: list, metadata: dict = None, tables: dict = None):
+        """用已计算好的条目（如索引快照中的）重建索引
+
+        tables 为快照中与 entries 对应的倒排表和字符袋矩阵（见 IndexSnapshot.tables），
+        提供时不再逐条重建倒排表。
+        """
+        metadata = metadata or {}
+        facets = FacetIndex(self.normalize_facet)
+        if tables is not None:
+            postings = tables['postings']
+            pinyin_postings = tables['pinyin_postings']
+        else:
+            postings = {}
+            pinyin_postings = {}
+            for entry_id, entry in enumerate(entries):
+                self._add_postings(postings, pinyin_postings, entry_id, entry)
+        for entry_id, entry in enumerate(entries):
+            facets.add(entry_id, metadata.get(entry.name))
+
+        with self.lock:
+            self.postings = postings
+            self.pinyin_postings = pinyin_postings
+            self.fuzzy = None
+            self.fuzzy_ready = False
+            self.fuzzy_source = tables.get('fuzzy') if tables is not None else None
+            self.facets = facets
+            self.entries = entries
+            self.ids = {entry.name: entry_id for entry_id, entry in enumerate(entries)}
+            self.invalidate()
+        return self
+
+    def add(self, name: str, path: str, meta: dict = None):
+        """新增或更新单个条目"""
+        entry = self.make_entry(name, path)
+        with self.lock:
+            if name in self.ids:
+                self.remove(name)
+            entry_id = len(self.entries)
+            self.entries.append(entry)
+            self.ids[name] = entry_id
+            self._add_postings(self.postings, self.pinyin_postings, entry_id, entry)
+            self.facets.add(entry_id, meta)
+            if self.fuzzy is not None:
+                self.fuzzy.append(entry.lower)
+            # 快照中的矩阵不含新条目，尚未建立时改为按条目重建
+            self.fuzzy_source = None
+            self.invalidate()
+        return entry_id
+
+    def remove(self, name: str) -> bool:
+        """删除单个条目"""
+        with self.lock:
+            entry_id = self.ids.pop(name, None)
+            if entry_id is None:
+                return False
+            entry = self.entries[entry_id]
+            self._remove_postings(self.postings, self.pinyin_postings, entry_id, entry)
+            self.facets.remove(entry_id)
+            if self.fuzzy is not None:
+                self.fuzzy.clear(entry_id)
+            self.fuzzy_source = None
+            self.entries[entry_id] = None
+            self.invalidate()
+        return True
+
+    def fuzzy_prefilter(self):
+        """模糊匹配的字符袋矩阵，第一次用到时才建立；fuzzywuzzy 或 NumPy 不可用时返回 None"""
+        with self.lock:
+            if not self.fuzzy_ready:
+                self.fuzzy_ready = True
+                if self.fuzzy is None and load_fuzz() is not None and FuzzyPrefilter.available():
+                    self.fuzzy = self._make_prefilter()
+            return self.fuzzy
+
+    def _make_prefilter(self):
+        if self.fuzzy_source is not None:
+            buckets, counts, lengths = self.fuzzy_source
+            self.fuzzy_source = None
+            return FuzzyPrefilter(buckets).load(counts, lengths)
+        # 已删除的条目对应空行，行号与条目 id 一致
+        return FuzzyPrefilter().build(entry.lower if entry is not None else '' for entry in self.entries)
+
+    def fuzzy_matrix(self):
+        """写入索引快照的字符袋矩阵 (桶数, 矩阵字节, 长度字节)，NumPy 不可用时返回 None"""
+        with self.lock:
+            if self.fuzzy_source is not None:
+                return self.fuzzy_source
+            if not FuzzyPrefilter.available():
+                return None
+            if self.fuzzy is None:
+                # 冷启动写快照时顺便建好，之后第一次模糊匹配直接使用
+                self.fuzzy = self._make_prefilter()
+            return (self.fuzzy.buckets, *self.fuzzy.to_bytes())
+
+    def prepare(self):
+        """提前导入 fuzzywuzzy 并建立字符袋矩阵（可在后台线程中调用）"""
+        load_fuzz()
+        self.fuzzy_prefilter()
+
+    def invalidate(self):
+        """索引变化后清空查询缓存和追加输入状态"""
+        self.query_cache.clear()
+        self.refine_state = None
+
+    def _add_postings(self, postings, pinyin_postings, entry_id, entry):
+        grams = set()
+        for form in entry.forms:
+            grams |= char_ngrams(form)
+        for gram in grams:
+            postings.setdefault(gram, set()).add(entry_id)
+        for gram in char_ngrams(entry.pinyin):
+            pinyin_postings.setdefault(gram, set()).add(entry_id)
+
+    def _remove_postings(self, postings, pinyin_postings, entry_id, entry):
+        for table, grams in (
+            (postings, set().union(*(char_ngrams(form) for form in entry.forms))),
+            (pinyin_postings, char_ngrams(entry.pinyin))
+        ):
+            for gram in grams:
+                posting = table.get(gram)
+                if posting is not None:
+                    posting.discard(entry_id)
+                    if not posting:
+                        del table[gram]
+
+    def candidates(self, query: NormalizedQuery, previous: RefineState = None):
+        """用倒排索引求出可能得分的条目 id
+
+        包含、拼音和部分匹配要求查询的全部二元组都出现在名称中，取倒排表交集；
+        模糊匹配（ratio > 60）要求共同字符足够多，用字符袋给出 ratio 上界后过滤。
+        previous 为上一次查询的状态：若本次文本以上次文本开头，
+        包含本次文本的名称必然包含上次文本，只需在上次的集合里逐个检查。
+        返回 (候选集合, 每个文本形式的包含候选)。
+        """
+        postings = self.postings
+        entries = self.entries
+        candidates = set()
+        contains = []
+
+        # 1/2. 完全匹配与包含关系
+        for i, text in enumerate(query.texts):
+            if previous is not None and i < len(previous.texts) and text.startswith(previous.texts[i]):
+                matched = {entry_id for entry_id in previous.contains[i]
+                           if any(text in form for form in entries[entry_id].forms)}
+            else:
+                matched = intersect_postings(postings, required_grams(text))
+            contains.append(matched)
+            candidates |= matched
+
+        # 3. 拼音匹配
+        if query.pinyin:
+            candidates |= intersect_postings(self.pinyin_postings, required_grams(query.pinyin))
+
+        # 4. 部分匹配
+        for part in query.parts:
+            candidates |= intersect_postings(postings, required_grams(part))
+
+        # 5. 模糊匹配：ratio <= 2 * 共同字符数 / 总长度
+        if fuzz is None:
+            return candidates, contains
+
+        fuzzy = self.fuzzy_prefilter()
+        if fuzzy is not None:
+            for text in query.texts:
+                candidates.update(fuzzy.shortlist(text, 60, self.fuzzy_shortlist).tolist())
+        else:
+            # 没有 NumPy 时用一元组倒排表逐条累计
+            for text in query.texts:
+                shared = {}
+                for char in set(text):
+                    count = text.count(char)
+                    for entry_id in postings.get(char, ()):
+                        shared[entry_id] = shared.get(entry_id, 0) + count
+                text_length = len(text)
+                for entry_id, count in shared.items():
+                    if entry_id not in candidates and \
+                            200 * count > 60 * (text_length + len(entries[entry_id].lower)):
+                        candidates.add(entry_id)
+
+        return candidates, contains
+
+    def normalize_query(self, search_text: str) -> NormalizedQuery:
+        """归一化查询文本（打分前都要经过这里，顺便导入 fuzzywuzzy）"""
+        load_fuzz()
+        lower = search_text.lower()
+        texts = tuple(dict.fromkeys((
+            lower,
+            self.t2s.convert(lower),
+            self.s2t.convert(lower)
+        )))
+        return NormalizedQuery(lower, texts, to_pinyin(lower), lower.split())
+
+    def score(self, entry: IndexEntry, query: NormalizedQuery) -> int:
+        """计算匹配分数"""
+        max_score = 0
+        forms = entry.forms
+
+        for search_lower in query.texts:
+            # 1. 完全匹配
+            if search_lower in forms:
+                return 100
+
+            # 2. 包含关系
+            if max_score < 90 and any(search_lower in form for form in forms):
+                max_score = 90
+
+        # 3. 拼音匹配
+        if max_score < 80 and query.pinyin and query.pinyin in entry.pinyin:
+            max_score = 80
+
+        # 4. 部分匹配
+        if max_score < 70 and any(part in form for part in query.parts for form in forms):
+            max_score = 70
+
+        # 5. 模糊匹配
+        if fuzz is not None:
+            for search_lower in query.texts:
+                ratio = fuzz.ratio(search_lower, entry.lower)
+                if ratio > 60 and ratio > max_score:
+                    max_score = ratio
+
+        return max_score
+
+    def make_result(self, entry: IndexEntry, score: int) -> dict:
+        """生成搜索结果项"""
+        return {
+            'name': entry.name,
+            'path': entry.path,
+            'score': score,
+            'alt': entry.name.replace('_', ' ').title()
+        }
+
+    def search(self, search_text: str, score_threshold: int = 0, max_results: int = None,
+               should_cancel=None):
+        """搜索并按分数降序返回结果
+
+        should_cancel 返回 True 时抛出 SearchCancelled，用于放弃过时的查询。
+        """
+        with self.lock:
+            return self._search(search_text, score_threshold, max_results, should_cancel)
+
+    def _search(self, search_text, score_threshold, max_results, should_cancel):
+        cache_key = (search_text, score_threshold, max_results)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        entries = self.entries
+        previous = self.refine_state
+        text, groups = parse_query(search_text)
+
+        # 先用筛选索引求出满足筛选条件的条目，筛选条件不变时直接复用
+        allowed = None
+        if groups:
+            if previous is not None and previous.groups == groups:
+                allowed = previous.allowed
+            else:
+                allowed = self.facets.evaluate(groups)
+            if not text:
+                # 只有筛选条件时按原顺序列出全部满足的条目
+                results = [self.make_result(entries[i], 100) for i in sorted(allowed)]
+                if max_results is not None:
+                    results = results[:max_results]
+                self.refine_state = RefineState(groups, allowed, (), [])
+                self.query_cache.put(cache_key, results)
+                return list(results)
+
+        query = self.normalize_query(text)
+        results = []
+
+        # 阈值不为正或查询含空串时每个条目都可能入选，无法剪枝
+        if score_threshold <= 0 or not all(query.texts):
+            candidate_ids = range(len(entries)) if allowed is None else sorted(allowed)
+            self.refine_state = None
+        else:
+            if previous is not None and previous.groups != groups:
+                previous = None
+            candidates, contains = self.candidates(query, previous)
+            self.refine_state = RefineState(groups, allowed, query.texts, contains)
+            if allowed is not None:
+                candidates &= allowed
+            candidate_ids = sorted(candidates)
+
+        for i, entry_id in enumerate(candidate_ids):
+            if should_cancel is not None and i % CANCEL_CHECK_INTERVAL == 0 and should_cancel():
+                raise SearchCancelled(search_text)
+            entry = entries[entry_id]
+            if entry is None:
+                continue
+            score = self.score(entry, query)
+            if score >= score_threshold:
+                results.append(self.make_result(entry, score))
+
+        results.sort(key=lambda x: x['score'], reverse=True)
+        if max_results is not None:
+            results = results[:max_results]
+        self.query_cache.put(cache_key, results)
+        return list(results)
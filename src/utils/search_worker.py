@@ -0,0 +1,75 @@
+import threading
+import traceback
+from typing import Callable
+
+from src.utils.search_index import SearchCancelled
+
+
+class SearchWorker:
+    """后台搜索线程
+
+    每次提交查询都会分配一个递增的代号，新的按键会取代尚未完成的旧查询。
+    只有最新代号的结果才会通过 schedule 交回 Tk 线程。
+    """
+    def __init__(self, search_func: Callable, on_results: Callable, schedule: Callable):
+        # search_func(text, should_cancel) -> results
+        # on_results(text, results) 在 Tk 线程中调用
+        # schedule(callback) 负责把回调交给 Tk 线程，如 TkDispatcher.post
+        self.search_func = search_func
+        self.on_results = on_results
+        self.schedule = schedule
+        self.generation = 0
+        self.pending = None
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name='SearchWorker', daemon=True)
+        self.thread.start()
+
+    def submit(self, search_text: str) -> int:
+        """提交查询，返回该查询的代号"""
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, search_text)
+            self.condition.notify()
+            return self.generation
+
+    def is_current(self, generation: int) -> bool:
+        """查询是否仍是最新的"""
+        return generation == self.generation
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                generation, search_text = self.pending
+                self.pending = None
+
+            try:
+                results = self.search_func(
+                    search_text,
+                    lambda: not self.is_current(generation)
+                )
+            except SearchCancelled:
+                continue
+            except Exception as e:
+                print(f"后台搜索失败: {e}")
+                traceback.print_exc()
+                continue
+
+            if self.is_current(generation):
+                self.schedule(lambda g=generation, t=search_text, r=results: self._deliver(g, t, r))
+
+    def _deliver(self, generation, search_text, results):
+        # 回到 Tk 线程后再检查一次，期间可能又有新的按键
+        if self.is_current(generation):
+            self.on_results(search_text, results)
+
+    def stop(self):
+        """停止后台线程"""
+        with self.condition:
+            self.running = False
+            self.generation += 1
+            self.condition.notify()
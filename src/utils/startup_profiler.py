@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """启动阶段计时
+
+    用 phase() 包住每个初始化阶段，mark_ready() 标记可以响应热键的时刻。
+    就绪之后才执行的阶段（延后的预加载等）单独列出。
+    """
+    def __init__(self, start: float = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.phases = []
+        self.ready_at = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, elapsed: float):
+        self.phases.append((name, elapsed, self.ready_at is not None))
+
+    def mark_ready(self):
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+
+    @property
+    def ready_time(self):
+        """从启动到就绪的秒数"""
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.start
+
+    def as_dict(self):
+        return {
+            'ready_ms': round(self.ready_time * 1000, 1) if self.ready_at is not None else None,
+            'phases': [
+                {'name': name, 'ms': round(elapsed * 1000, 1), 'deferred': deferred}
+                for name, elapsed, deferred in self.phases
+            ]
+        }
+
+    def report(self) -> str:
+        """各阶段耗时明细"""
+        lines = ["启动耗时明细:"]
+        for name, elapsed, deferred in self.phases:
+            if not deferred:
+                lines.append(f"  {name:<12} {elapsed * 1000:8.1f} ms")
+        if self.ready_at is not None:
+            lines.append(f"  {'就绪':<12} {self.ready_time * 1000:8.1f} ms")
+        deferred = [(name, elapsed) for name, elapsed, is_deferred in self.phases if is_deferred]
+        if deferred:
+            lines.append("就绪后执行:")
+            for name, elapsed in deferred:
+                lines.append(f"  {name:<12} {elapsed * 1000:8.1f} ms")
+        return '\n'.join(lines)
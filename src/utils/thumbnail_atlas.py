@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+ATLAS_VERSION = 1
+# 每个图集页面的格子数（列 x 行）
+PAGE_COLUMNS = 8
+PAGE_ROWS = 8
+
+
+class ThumbnailAtlas:
+    """缩略图图集
+
+    把磁盘缓存中的缩略图拼到少量 PNG 页面上（data/cache/atlas/<尺寸>/page_N.png），
+    偏移表 index.json 记录每个图片路径所在的格子、缩略图尺寸和源文件的修改时间、大小。
+    网格画廊只需加载几个页面，再按偏移表从页面中复制出单个缩略图，
+    不必为每个图片单独读取和解码缓存文件。
+
+    update() 在后台线程中增量更新：未变化的图片保留原来的格子，
+    删除或变化的图片腾出格子，新图片优先填入空格子，只重写变化的页面。
+    """
+    def __init__(self, cache_dir, thumbnail_size: int):
+        self.root = Path(cache_dir) / 'atlas' / str(thumbnail_size)
+        self.thumbnail_size = thumbnail_size
+        self.entries = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    @property
+    def per_page(self):
+        return PAGE_COLUMNS * PAGE_ROWS
+
+    @property
+    def index_path(self):
+        return self.root / 'index.json'
+
+    def page_file(self, page: int) -> Path:
+        return self.root / f'page_{page}.png'
+
+    def load(self):
+        """读取偏移表"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == ATLAS_VERSION and data.get('thumbnail_size') == self.thumbnail_size:
+                self.entries = data['entries']
+                self.generation = data.get('generation', 0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取缩略图图集失败: {e}")
+        return self
+
+    def save(self):
+        data = {
+            'version': ATLAS_VERSION,
+            'thumbnail_size': self.thumbnail_size,
+            'generation': self.generation,
+            'entries': self.entries
+        }
+        temp_path = self.index_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        os.replace(temp_path, self.index_path)
+
+    def locate(self, image_path):
+        """图片在图集中的位置 (页面, x, y, 宽, 高)；不在图集中或源文件已变化时返回 None"""
+        entry = self.entries.get(str(image_path))
+        if entry is None:
+            return None
+        slot, width, height, mtime, size = entry
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        if stat.st_mtime_ns != mtime or stat.st_size != size:
+            return None
+        page, cell = divmod(slot, self.per_page)
+        row, col = divmod(cell, PAGE_COLUMNS)
+        return page, col * self.thumbnail_size, row * self.thumbnail_size, width, height
+
+    def update(self, image_paths, thumbnail_cache) -> int:
+        """把 image_paths 的缩略图同步到图集，返回新写入的缩略图数
+
+        缩略图直接读取 thumbnail_cache 的缓存文件（不计入其命中统计），尚未生成的图片暂不加入。
+        """
+        from PIL import Image
+        with self.lock:
+            stamps = {}
+            for image_path in image_paths:
+                try:
+                    stat = os.stat(image_path)
+                except OSError:
+                    continue
+                stamps[str(image_path)] = (stat.st_mtime_ns, stat.st_size)
+
+            entries = {
+                path: entry for path, entry in self.entries.items()
+                if stamps.get(path) == (entry[3], entry[4])
+            }
+            used = {entry[0] for entry in entries.values()}
+            free = iter(slot for slot in range(len(self.entries) + len(stamps)) if slot not in used)
+
+            # 新图片按页面分组
+            pages = {}
+            for path in sorted(stamps):
+                if path in entries:
+                    continue
+                cache_file = thumbnail_cache.cache_file(path)
+                if cache_file is None or not cache_file.exists():
+                    continue
+                try:
+                    with Image.open(cache_file) as image:
+                        image.load()
+                except OSError as e:
+                    print(f"读取缩略图缓存失败 {cache_file}: {e}")
+                    continue
+                slot = next(free)
+                entries[path] = [slot, image.width, image.height, *stamps[path]]
+                pages.setdefault(slot // self.per_page, []).append((slot, image))
+
+            if not pages and len(entries) == len(self.entries):
+                return 0
+
+            self.root.mkdir(parents=True, exist_ok=True)
+            page_size = (PAGE_COLUMNS * self.thumbnail_size, PAGE_ROWS * self.thumbnail_size)
+            for page, items in pages.items():
+                page_file = self.page_file(page)
+                try:
+                    with Image.open(page_file) as existing:
+                        canvas = existing.convert('RGBA')
+                except (OSError, ValueError):
+                    canvas = Image.new('RGBA', page_size)
+                for slot, image in items:
+                    row, col = divmod(slot % self.per_page, PAGE_COLUMNS)
+                    x, y = col * self.thumbnail_size, row * self.thumbnail_size
+                    # 先清空格子，旧缩略图可能比新的大
+                    canvas.paste((0, 0, 0, 0), (x, y, x + self.thumbnail_size, y + self.thumbnail_size))
+                    canvas.paste(image.convert('RGBA'), (x, y))
+                temp_file = page_file.with_suffix(f'.{os.getpid()}.tmp')
+                canvas.save(temp_file, 'PNG', compress_level=1)
+                os.replace(temp_file, page_file)
+
+            # 删除已经没有任何格子的页面
+            page_count = max((entry[0] for entry in entries.values()), default=-1) // self.per_page + 1
+            for page_file in self.root.glob('page_*.png'):
+                if int(page_file.stem.split('_')[1]) >= page_count:
+                    page_file.unlink()
+
+            self.entries = entries
+            self.generation += 1
+            self.save()
+            return sum(len(items) for items in pages.values())
@@ -0,0 +1,155 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from queue import Queue, Empty
+
+from src.utils.thumbnail_cache import ThumbnailDiskCache
+
+# 在进程间传递时使用的像素模式
+TRANSFER_MODES = ('L', 'RGB', 'RGBA')
+
+
+def make_thumbnail(image_path, thumbnail_size: int, draft: bool = True):
+    """生成缩略图
+
+    JPEG 使用 draft 模式按 1/2、1/4、1/8 比例直接缩小解码，
+    避免先完整解码 1920x1080 的原图再缩小。
+    """
+    from PIL import Image
+    with Image.open(image_path) as image:
+        if draft:
+            image.draft('RGB', (thumbnail_size, thumbnail_size))
+        image.thumbnail((thumbnail_size, thumbnail_size))
+        # 原图不大于缩略图尺寸时 thumbnail 不会解码，关闭文件前先载入像素
+        image.load()
+    return image
+
+
+def build_thumbnail_job(image_path, thumbnail_size: int, cache_dir=None, return_pixels=True, source=None):
+    """进程池任务：生成缩略图、写入磁盘缓存并返回原始像素数据
+
+    source 为实际解码的文件（如优化副本），缓存仍按 image_path 保存。
+    """
+    try:
+        image = make_thumbnail(source or image_path, thumbnail_size)
+        if cache_dir is not None:
+            ThumbnailDiskCache(cache_dir, thumbnail_size).store(image_path, image)
+        if not return_pixels:
+            return image_path, image.mode, image.size, None
+        if image.mode not in TRANSFER_MODES:
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        return image_path, image.mode, image.size, image.tobytes()
+    except Exception as e:
+        print(f"生成缩略图失败 {image_path}: {e}")
+        return image_path, None, None, None
+
+
+class ThumbnailBuilder:
+    """并行缩略图生成器
+
+    在进程池中生成缩略图，完成的结果放入线程安全的队列，
+    由 Tk 线程通过 drain() 分批取出，弹窗无需等待全部生成完毕。
+    return_pixels 为 False 时只写入磁盘缓存，drain() 返回的图片为 None。
+    on_ready 在每个结果入队后于工作线程中调用，可用来唤醒 Tk 线程。
+    shutdown(cancel=True) 之后，已经在运行的任务完成时不再入队（按提交时的批次判断）。
+    resolve 把图片路径映射到实际解码的文件（见 OptimizedTier）。
+    """
+    def __init__(self, thumbnail_size: int, cache_dir=None, max_workers: int = None, return_pixels=True,
+                 on_ready=None, resolve=None):
+        self.thumbnail_size = thumbnail_size
+        self.on_ready = on_ready
+        self.resolve = resolve
+        self.cache_dir = str(cache_dir) if cache_dir is not None else None
+        self.return_pixels = return_pixels
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = None
+        self.futures = []
+        self.finished = Queue()
+        self.pending = 0
+        # 每次取消后加一，旧批次的结果直接丢弃
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    @property
+    def busy(self):
+        """是否还有未交付的缩略图"""
+        return self.pending > 0
+
+    def submit(self, image_paths):
+        """提交需要生成的图片路径"""
+        image_paths = list(image_paths)
+        if not image_paths:
+            return 0
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(image_paths)))
+        for image_path in image_paths:
+            future = self.executor.submit(
+                build_thumbnail_job, str(image_path), self.thumbnail_size,
+                self.cache_dir, self.return_pixels,
+                self.resolve(image_path) if self.resolve is not None else None
+            )
+            future.add_done_callback(partial(self._on_done, self.generation))
+            self.futures.append(future)
+        self.pending += len(image_paths)
+        return len(image_paths)
+
+    def _on_done(self, generation, future):
+        """任务完成回调（在执行器的线程中调用）"""
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"缩略图任务失败: {e}")
+            result = (None, None, None, None)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.finished.put(result)
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def has_finished(self):
+        """是否有等待取出的结果"""
+        return not self.finished.empty()
+
+    def drain(self, max_items: int = 32):
+        """取出一批已完成的缩略图，返回 [(路径, PIL 图片或 None)]"""
+        batch = []
+        while len(batch) < max_items:
+            try:
+                image_path, mode, size, data = self.finished.get_nowait()
+            except Empty:
+                break
+            self.pending = max(0, self.pending - 1)
+            if image_path is None:
+                continue
+            image = None
+            if data is not None:
+                from PIL import Image
+                image = Image.frombytes(mode, size, data)
+            batch.append((image_path, image))
+
+        # 全部交付后释放工作进程
+        if self.pending == 0:
+            self.shutdown()
+        return batch
+
+    def shutdown(self, cancel=False):
+        """关闭进程池"""
+        if cancel:
+            for future in self.futures:
+                future.cancel()
+            with self.lock:
+                self.generation += 1
+                self.pending = 0
+                while not self.finished.empty():
+                    try:
+                        self.finished.get_nowait()
+                    except Empty:
+                        break
+        self.futures = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -0,0 +1,97 @@
+import hashlib
+import os
+from pathlib import Path
+
+# PNG 能直接保存的模式，其余（如 CMYK）先转换为 RGB
+PNG_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I')
+
+
+class ThumbnailDiskCache:
+    """持久化缩略图缓存
+
+    缓存文件保存在 data/cache/thumbnails 下，文件名由图片路径、修改时间、
+    文件大小和缩略图尺寸共同决定。图片变化后旧的缓存自然失效，
+    由 prune() 统一清理。
+    """
+    def __init__(self, cache_dir, thumbnail_size: int):
+        self.cache_dir = Path(cache_dir) / 'thumbnails'
+        self.thumbnail_size = thumbnail_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.used_files = set()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_file(self, image_path):
+        """计算图片对应的缓存文件，文件不可访问时返回 None"""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        key = f"{Path(image_path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{self.thumbnail_size}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{digest}.png"
+
+    def contains(self, image_path):
+        """检查缓存是否存在（不解码）"""
+        cache_file = self.cache_file(image_path)
+        if cache_file is None:
+            return False
+        self.used_files.add(cache_file.name)
+        return cache_file.exists()
+
+    def load(self, image_path):
+        """读取缓存的缩略图，未命中时返回 None"""
+        cache_file = self.cache_file(image_path)
+        if cache_file is None:
+            return None
+        self.used_files.add(cache_file.name)
+        if not cache_file.exists():
+            self.misses += 1
+            return None
+        try:
+            from PIL import Image
+            with Image.open(cache_file) as image:
+                image.load()
+            self.hits += 1
+            return image
+        except Exception as e:
+            print(f"读取缩略图缓存失败 {cache_file}: {e}")
+            self.misses += 1
+            return None
+
+    def store(self, image_path, image):
+        """写入缩略图缓存（先写临时文件再原子替换）"""
+        cache_file = self.cache_file(image_path)
+        if cache_file is None:
+            return False
+        self.used_files.add(cache_file.name)
+        temp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            if image.mode not in PNG_MODES:
+                image = image.convert('RGB')
+            image.save(temp_file, 'PNG')
+            os.replace(temp_file, cache_file)
+            return True
+        except Exception as e:
+            print(f"写入缩略图缓存失败 {cache_file}: {e}")
+            try:
+                temp_file.unlink()
+            except OSError:
+                pass
+            return False
+
+    def reset_usage(self):
+        """开始新一轮完整预加载前重置使用记录"""
+        self.used_files.clear()
+
+    def prune(self):
+        """删除本次运行未使用的缓存文件（对应已修改或已删除的图片）"""
+        removed = 0
+        for cache_file in self.cache_dir.iterdir():
+            if cache_file.name not in self.used_files:
+                try:
+                    cache_file.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+# 每行：时间戳 \t 名称 \t 权重 \t 次数
+# 发送记录的权重和次数都是 1；压缩后每个名称一行，权重为该时刻衰减后的分数
+FIELD_SEPARATOR = '\t'
+
+
+class UsageLog:
+    """发送记录：只追加的日志文件和内存中的使用分数
+
+    每个名称的分数是历次发送按半衰期衰减后的和（兼顾频率和最近程度），
+    所有分数随时间按同一比例衰减，相对大小只在发送时变化，
+    因此排名和归一化后的加分只在记录新的发送后重新计算。
+    日志行数超过名称数的 compact_factor 倍时改写为每个名称一行。
+    """
+    def __init__(self, path, half_life_days: float = 14.0, compact_factor: int = 4,
+                 min_compact_lines: int = 256):
+        self.path = Path(path)
+        self.half_life = half_life_days * 86400
+        self.compact_factor = compact_factor
+        self.min_compact_lines = min_compact_lines
+        self.scores = {}
+        self.counts = {}
+        self.lines = 0
+        self.ranked = None
+        self.relative = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def decay(self, score: float, last: float, now: float) -> float:
+        return score * 0.5 ** (max(0.0, now - last) / self.half_life)
+
+    def _apply(self, when: float, name: str, weight: float, count: int):
+        score, last = self.scores.get(name, (0.0, when))
+        self.scores[name] = (self.decay(score, last, when) + weight, max(last, when))
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def load(self):
+        """重放日志，必要时压缩"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    fields = line.rstrip('\n').split(FIELD_SEPARATOR)
+                    if len(fields) != 4:
+                        # 写入中断留下的半行
+                        continue
+                    try:
+                        self._apply(float(fields[0]), fields[1], float(fields[2]), int(fields[3]))
+                    except ValueError:
+                        continue
+                    self.lines += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取使用记录失败: {e}")
+        self.compact_if_needed()
+        return self
+
+    def record(self, name: str, when: float = None):
+        """记录一次发送"""
+        if FIELD_SEPARATOR in name or '\n' in name:
+            return
+        when = time.time() if when is None else when
+        with self.lock:
+            self._apply(when, name, 1.0, 1)
+            self.ranked = None
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(FIELD_SEPARATOR.join((f"{when:.3f}", name, '1', '1')) + '\n')
+                self.lines += 1
+            except OSError as e:
+                print(f"写入使用记录失败: {e}")
+        self.compact_if_needed()
+
+    def compact_if_needed(self):
+        if self.lines > max(self.min_compact_lines, self.compact_factor * len(self.scores)):
+            self.compact()
+
+    def compact(self):
+        """把日志改写为每个名称一行（写临时文件再原子替换）"""
+        with self.lock:
+            records = sorted(self.scores.items(), key=lambda item: item[1][1])
+            temp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for name, (score, last) in records:
+                        f.write(FIELD_SEPARATOR.join(
+                            (f"{last:.3f}", name, repr(score), str(self.counts.get(name, 0)))
+                        ) + '\n')
+                os.replace(temp_path, self.path)
+                self.lines = len(records)
+            except OSError as e:
+                print(f"压缩使用记录失败: {e}")
+
+    def _rank(self):
+        """按当前时刻的分数排序，并记录相对最高分的比例"""
+        with self.lock:
+            if self.ranked is None:
+                now = time.time()
+                current = {name: self.decay(score, last, now) for name, (score, last) in self.scores.items()}
+                ranked = sorted(current, key=lambda name: (-current[name], name))
+                top = current[ranked[0]] if ranked else 1.0
+                self.relative = {name: value / top for name, value in current.items()}
+                self.ranked = ranked
+            return self.ranked
+
+    def boost(self, name: str) -> float:
+        """0~1 的使用加分：分数相对最常用图片的比例"""
+        self._rank()
+        return self.relative.get(name, 0.0)
+
+    def most_used(self, count: int) -> list:
+        """最常用的名称"""
+        return self._rank()[:count]
+
+    def count(self, name: str) -> int:
+        return self.counts.get(name, 0)
+
+
+def blend(results, usage: UsageLog, weight: float, limit: int = None) -> list:
+    """把使用加分混入搜索结果的分数并重新排序（不修改原结果）"""
+    if usage is None or not weight or not len(usage):
+        return results[:limit] if limit is not None else results
+    blended = [dict(result, score=int(round(result['score'] + weight * usage.boost(result['name']))))
+               for result in results]
+    blended.sort(key=lambda result: -result['score'])
+    return blended[:limit] if limit is not None else blended
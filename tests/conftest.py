@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 与 scripts 相同：把项目根目录加入导入路径，测试中直接 import src.*
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,70 @@
+from src.utils.facets import FacetIndex, parse_query
+
+TRAD_TO_SIMP = {'愛': '爱', '燈': '灯'}
+
+
+def normalize(value):
+    return ''.join(TRAD_TO_SIMP.get(char, char) for char in str(value).lower())
+
+
+def make_index():
+    metas = [
+        {'author': '愛音', 'episode': 1, 'tags': ['吐槽']},
+        {'author': '爱音', 'episode': 3, 'tags': ['開心', '吐槽']},
+        {'author': '燈', 'episode': 3},
+        {'author': 'Taki', 'tags': []},
+        None,
+    ]
+    return FacetIndex(normalize).build(metas)
+
+
+def test_parse_query():
+    assert parse_query('愛音 author:燈,爽世 -tag:哭 ep：11') == (
+        '愛音', [[('author', ['燈', '爽世'], False), ('tags', ['哭'], True), ('episode', ['11'], False)]]
+    )
+    assert parse_query('a:燈 OR ep:3 | hello') == (
+        'hello', [[('author', ['燈'], False)], [('episode', ['3'], False)]]
+    )
+    # 未知字段和空取值都当作自由文本
+    assert parse_query('foo:bar tag:') == ('foo:bar tag:', [])
+
+
+def test_evaluate_and_or_negate():
+    index = make_index()
+    assert index.evaluate([[('author', ['爱音'], False)]]) == {0, 1}
+    assert index.evaluate([[('author', ['愛音'], False), ('episode', ['3'], False)]]) == {1}
+    assert index.evaluate([[('author', ['燈', 'taki'], False)]]) == {2, 3}
+    assert index.evaluate([[('tags', ['吐槽'], True)]]) == {2, 3, 4}
+    assert index.evaluate([[('episode', ['1'], False)], [('author', ['灯'], False)]]) == {0, 2}
+    assert index.evaluate([[('author', ['nobody'], False)]]) == set()
+
+
+def test_evaluate_returns_new_sets():
+    index = make_index()
+    allowed = index.evaluate([[('tags', ['吐槽'], True)]])
+    allowed.clear()
+    assert index.all_ids == {0, 1, 2, 3, 4}
+
+
+def test_remove_and_add_update_values():
+    index = make_index()
+    index.remove(2)
+    assert index.evaluate([[('author', ['灯'], False)]]) == set()
+    assert '燈' not in index.values('author')
+    index.add(5, {'author': '燈', 'tags': '哭'})
+    assert index.evaluate([[('author', ['灯'], False)]]) == {5}
+    assert index.evaluate([[('tags', ['哭'], False)]]) == {5}
+    assert index.values('author') == {'愛音': 1, '爱音': 1, 'taki': 1, '燈': 1}
+
+
+def test_normalize_only_runs_when_querying():
+    calls = []
+
+    def counting(value):
+        calls.append(value)
+        return normalize(value)
+
+    index = FacetIndex(counting).build([{'author': '愛音'}, {'author': '燈'}])
+    assert calls == []
+    index.evaluate([[('author', ['爱音'], False)]])
+    assert calls
@@ -0,0 +1,61 @@
+import random
+
+from src.utils.image_catalog import ImageCatalog, hamming
+
+
+def make_catalog(tmp_path, records):
+    catalog = ImageCatalog(tmp_path / 'catalog.json')
+    catalog.records = {path: (0, 0, sha256, value) for path, (sha256, value) in records.items()}
+    catalog._update_canonical()
+    return catalog
+
+
+def brute_force_groups(catalog, max_distance):
+    """两两比较后合并连通分量"""
+    items = [(path, record[3]) for path, record in sorted(catalog.records.items())
+             if catalog.canonical(path) == path]
+    groups = [{path} for path, _ in items]
+    for i, (a, va) in enumerate(items):
+        for b, vb in items[i + 1:]:
+            if hamming(va, vb) <= max_distance:
+                ga = next(group for group in groups if a in group)
+                gb = next(group for group in groups if b in group)
+                if ga is not gb:
+                    ga |= gb
+                    groups.remove(gb)
+    return sorted(sorted(group) for group in groups if len(group) > 1)
+
+
+def test_near_duplicates_match_brute_force(tmp_path):
+    rng = random.Random(0)
+    centers = [rng.getrandbits(64) for _ in range(20)]
+    records = {}
+    for i in range(300):
+        value = rng.choice(centers)
+        for _ in range(rng.randint(0, 10)):
+            value ^= 1 << rng.randrange(64)
+        records[f"/images/{i:03d}.jpg"] = (f"sha{i}", value)
+    catalog = make_catalog(tmp_path, records)
+    for max_distance in (0, 3, 6, 10):
+        assert catalog.near_duplicates(max_distance) == brute_force_groups(catalog, max_distance)
+
+
+def test_exact_duplicates_share_canonical_path(tmp_path):
+    catalog = make_catalog(tmp_path, {
+        '/images/b.jpg': ('same', 1),
+        '/images/a.jpg': ('same', 1),
+        '/images/c.jpg': ('other', 1),
+    })
+    assert catalog.canonical('/images/b.jpg') == '/images/a.jpg'
+    assert catalog.canonical('/images/c.jpg') == '/images/c.jpg'
+    assert catalog.exact_duplicates() == [['/images/a.jpg', '/images/b.jpg']]
+    # 完全相同的文件只保留规范路径参与近似比较
+    assert catalog.near_duplicates(0) == [['/images/a.jpg', '/images/c.jpg']]
+    assert catalog.similar('/images/b.jpg', 5, 0) == [('/images/c.jpg', 0)]
+
+
+def test_forget_updates_canonical_paths(tmp_path):
+    catalog = make_catalog(tmp_path, {'/images/a.jpg': ('same', 1), '/images/b.jpg': ('same', 1)})
+    catalog.forget('/images/a.jpg')
+    assert catalog.canonical('/images/b.jpg') == '/images/b.jpg'
+    assert catalog.exact_duplicates() == []
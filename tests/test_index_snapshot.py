@@ -0,0 +1,74 @@
+from src.utils.index_snapshot import load_entries, write_snapshot
+from src.utils.search_index import SearchIndex
+
+
+def make_entry(name, path):
+    return SearchIndex().make_entry(name, path)
+
+
+def image_map(images, names):
+    return {name: str(images / f"{name}.jpg") for name in names}
+
+
+def build(path, images, current):
+    """与 SearchEngine.load 相同的流程，返回 (索引, tables, 统计)"""
+    entries, tables, stats = load_entries(path, current, make_entry, images)
+    index = SearchIndex()
+    index.build_entries(entries, tables=tables)
+    if tables is None:
+        write_snapshot(path, entries, images, index)
+    return index, tables, stats
+
+
+def test_warm_load_restores_postings(tmp_path):
+    images = tmp_path / 'images'
+    path = tmp_path / 'search_index.bin'
+    current = image_map(images, ['hello world', 'yellow', 'abc', '愛音'])
+    cold, tables, stats = build(path, images, current)
+    assert tables is None and stats == {'reused': 0, 'computed': 4, 'removed': 0}
+    warm, tables, stats = build(path, images, current)
+    assert tables is not None and stats == {'reused': 4, 'computed': 0, 'removed': 0}
+    assert warm.postings == cold.postings
+    assert warm.pinyin_postings == cold.pinyin_postings
+    for query in ('hello', 'helo wrld', '愛', 'ab'):
+        assert warm.search(query, 10) == cold.search(query, 10)
+
+
+def test_relocated_library_reuses_entries(tmp_path):
+    path = tmp_path / 'search_index.bin'
+    names = ['a', 'b', 'c']
+    build(path, tmp_path / 'old' / 'images', image_map(tmp_path / 'old' / 'images', names))
+    moved = tmp_path / 'new' / 'images'
+    index, tables, stats = build(path, moved, image_map(moved, names))
+    assert tables is not None and stats['reused'] == 3
+    assert index.entries[0].path == str(moved / 'a.jpg')
+
+
+def test_changed_paths_are_recomputed_not_removed(tmp_path):
+    images = tmp_path / 'images'
+    path = tmp_path / 'search_index.bin'
+    build(path, images, image_map(images, ['a', 'b', 'c']))
+    current = image_map(images, ['a', 'b'])
+    current['b'] = str(images / 'sub' / 'b.jpg')
+    _, tables, stats = build(path, images, current)
+    assert tables is None
+    assert stats == {'reused': 1, 'computed': 1, 'removed': 1}
+    _, tables, stats = build(path, images, current)
+    assert tables is not None and stats == {'reused': 2, 'computed': 0, 'removed': 0}
+
+
+def test_invalid_snapshot_is_rebuilt(tmp_path):
+    images = tmp_path / 'images'
+    path = tmp_path / 'search_index.bin'
+    current = image_map(images, ['a', 'b'])
+    build(path, images, current)
+    data = bytearray(path.read_bytes())
+    # 改成旧版本号，再试一个截断的文件
+    data[8:12] = (1).to_bytes(4, 'little')
+    for content in (bytes(data), bytes(data[:20])):
+        path.write_bytes(content)
+        index, tables, stats = build(path, images, current)
+        assert tables is None and stats == {'reused': 0, 'computed': 2, 'removed': 0}
+        assert index.search('a', 10)
+    _, tables, stats = build(path, images, current)
+    assert tables is not None and stats['reused'] == 2
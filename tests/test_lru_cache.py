@@ -0,0 +1,45 @@
+from src.utils.lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert list(cache.items) == ['a', 'c']
+    assert cache.stats() == {'entries': 2, 'bytes': 0, 'hits': 1, 'misses': 0, 'evictions': 1}
+
+
+def test_byte_budget_and_replacement():
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.put('a', b'xxxx')
+    cache.put('b', b'yyyy')
+    cache.put('a', b'zz')
+    assert cache.total_bytes == 6
+    cache.put('c', b'wwww')
+    assert cache.total_bytes == 10 and len(cache) == 3
+    cache.put('d', b'v')
+    assert 'b' not in cache
+    assert cache.total_bytes == 7
+
+
+def test_keeps_single_oversized_entry():
+    cache = LRUCache(max_bytes=4, sizeof=len)
+    cache.put('a', b'x')
+    cache.put('big', b'0123456789')
+    assert list(cache.items) == ['big']
+    assert cache.total_bytes == 10
+
+
+def test_pop_clear_and_miss():
+    cache = LRUCache(max_entries=4, sizeof=len)
+    cache.put('a', b'abc')
+    assert cache.pop('a') == b'abc'
+    assert cache.pop('a', 'none') == 'none'
+    assert cache.get('a', 0) == 0
+    cache.put('b', b'b')
+    cache.clear()
+    assert len(cache) == 0 and cache.total_bytes == 0
+    assert cache.stats()['misses'] == 1
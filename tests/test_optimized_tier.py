@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from src.utils.optimized_tier import OptimizedTier
+
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def library(tmp_path):
+    images = tmp_path / 'images'
+    (images / 'sub').mkdir(parents=True)
+    paths = []
+    for i, name in enumerate(('a.png', 'sub/b.png')):
+        path = images / name
+        # 带噪声的图片，重新编码为 JPEG 后明显变小
+        Image.effect_noise((400, 300), 40 + i).convert('RGB').save(path)
+        paths.append(str(path))
+    return images, tmp_path / 'optimized', paths
+
+
+def test_resolve_prefers_current_copy(library):
+    images, root, paths = library
+    tier = OptimizedTier(root, images)
+    assert tier.resolve(paths[0]) == paths[0]
+    counts = tier.build(paths, 200, max_workers=1)
+    assert counts['processed'] == 2 and counts['failed'] == 0
+    output = tier.resolve(paths[0])
+    assert output == str(root / 'a.png.jpg')
+    with Image.open(output) as image:
+        assert max(image.size) == 200
+    # 清单可以重新读取
+    assert OptimizedTier(root, images).load().resolve(paths[1]) == str(root / 'sub' / 'b.png.jpg')
+    # 不在 images 目录中的路径原样返回
+    assert tier.resolve('/elsewhere/a.png') == '/elsewhere/a.png'
+
+
+def test_resolve_falls_back_when_source_changes_or_copy_is_missing(library):
+    images, root, paths = library
+    tier = OptimizedTier(root, images)
+    tier.build(paths, 200, max_workers=1)
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert tier.resolve(paths[0]) == paths[0]
+    os.remove(root / 'sub' / 'b.png.jpg')
+    assert tier.resolve(paths[1]) == paths[1]
+    counts = tier.build(paths, 200, max_workers=1)
+    assert counts['processed'] == 2 and counts['reused'] == 0
+
+
+def test_covers():
+    tier = OptimizedTier('/tmp/none', '/tmp/images')
+    assert not tier.covers(0)
+    tier.settings = {'max_dimension': 1280}
+    assert tier.covers(800) and tier.covers(1280)
+    assert not tier.covers(0) and not tier.covers(2000)
+    tier.settings = {'max_dimension': 0}
+    assert tier.covers(0) and tier.covers(2000)
+
+
+def test_prune_only_removes_known_outputs(library):
+    images, root, paths = library
+    tier = OptimizedTier(root, images)
+    tier.build(paths, 200, max_workers=1)
+    stray = root / 'notes.jpg'
+    stray.write_bytes(b'keep')
+    counts = tier.build(paths, 200, 'webp', max_workers=1)
+    assert counts['pruned'] == 2
+    assert not (root / 'a.png.jpg').exists()
+    assert (root / 'a.png.webp').exists()
+    assert stray.exists()
+
+
+def test_refuses_foreign_directory(library):
+    images, root, paths = library
+    root.mkdir()
+    (root / 'photo.jpg').write_bytes(b'mine')
+    with pytest.raises(ValueError):
+        OptimizedTier(root, images).build(paths, 200, max_workers=1)
+    assert (root / 'photo.jpg').read_bytes() == b'mine'
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from src.utils.clipboard import ClipboardPayload
+from src.utils.payload_cache import PayloadCache
+
+
+class CountingEncoder:
+    """按文件名给出固定大小的数据，并记录编码次数"""
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.calls = []
+
+    def __call__(self, path, profile):
+        self.calls.append(os.path.basename(path))
+        return ClipboardPayload('png', b'x' * self.sizes[os.path.basename(path)])
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = {}
+    for name in ('a', 'b', 'c', 'd'):
+        path = tmp_path / f'{name}.png'
+        path.write_bytes(name.encode())
+        paths[name] = str(path)
+    return paths
+
+
+def make_cache(sizes, max_bytes=400):
+    # 固定区 100 字节，LRU 区 300 字节
+    encoder = CountingEncoder(sizes)
+    return PayloadCache(max_bytes, encoder=encoder, pin_fraction=0.25, pin_min_sends=2), encoder
+
+
+def send(cache, path, times=1):
+    for _ in range(times):
+        cache.get(path)
+
+
+def test_pins_after_repeated_sends(images):
+    cache, encoder = make_cache({'a.png': 40, 'b.png': 200, 'c.png': 200})
+    send(cache, images['a'])
+    assert not cache.pinned
+    send(cache, images['a'])
+    assert [key[0] for key in cache.pinned] == [images['a']]
+    assert cache.pinned_total == 40
+    # 固定后不占用 LRU 区，LRU 被其他图片挤满也不会淘汰它
+    send(cache, images['b'])
+    send(cache, images['c'])
+    send(cache, images['a'])
+    assert encoder.calls.count('a.png') == 1
+    cache.shutdown()
+
+
+def test_evicts_least_sent_pinned_entry(images):
+    cache, encoder = make_cache({'a.png': 60, 'b.png': 60, 'c.png': 60})
+    send(cache, images['a'], 3)
+    # b 的发送次数比 a 少，放不下时不挤掉 a
+    send(cache, images['b'], 2)
+    assert {key[0] for key in cache.pinned} == {images['a']}
+    # 次数相同也不挤掉；c 发送次数超过 a 后取代 a，a 回到 LRU 区
+    send(cache, images['c'], 3)
+    assert {key[0] for key in cache.pinned} == {images['a']}
+    send(cache, images['c'])
+    assert {key[0] for key in cache.pinned} == {images['c']}
+    assert cache.pinned_total == 60
+    send(cache, images['a'])
+    assert encoder.calls.count('a.png') == 1
+    cache.shutdown()
+
+
+def test_oversized_payload_is_not_pinned(images):
+    cache, _ = make_cache({'a.png': 150})
+    send(cache, images['a'], 3)
+    assert not cache.pinned
+    cache.shutdown()
+
+
+def test_replaced_file_drops_old_pinned_entry(images):
+    cache, encoder = make_cache({'a.png': 40})
+    send(cache, images['a'], 2)
+    old_key = next(iter(cache.pinned))
+    stat = os.stat(images['a'])
+    os.utime(images['a'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    send(cache, images['a'])
+    assert old_key not in cache.pinned
+    assert len(cache.pinned) == 1 and cache.pinned_total == 40
+    assert encoder.calls.count('a.png') == 2
+    assert cache.stats()['pinned_entries'] == 1
+    cache.shutdown()
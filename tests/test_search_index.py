@@ -0,0 +1,175 @@
+import random
+
+import pytest
+
+from src.utils.facets import parse_query
+from src.utils.search_index import SearchIndex, IndexEntry
+
+# 繁简各取一部分，使 simp/trad 形式与小写形式不同
+TRAD_TO_SIMP = {'愛': '爱', '燈': '灯', '樂': '乐', '華': '华', '說': '说', '話': '话'}
+SIMP_TO_TRAD = {simp: trad for trad, simp in TRAD_TO_SIMP.items()}
+CHARS = '愛爱燈灯樂乐華华說说話话音的我你好不是吐槽震驚開心哭abcdefgh '
+AUTHORS = ['愛音', '燈', '爽世', 'Taki']
+TAGS = ['吐槽', '開心', '哭']
+THRESHOLDS = (1, 10, 60, 70, 80, 90, 100)
+
+
+class TableConverter:
+    """按字典逐字转换的测试转换器"""
+    def __init__(self, table):
+        self.table = table
+
+    def convert(self, text):
+        return ''.join(self.table.get(char, char) for char in text)
+
+
+def make_index(fuzzy_shortlist=None):
+    return SearchIndex(TableConverter(TRAD_TO_SIMP), TableConverter(SIMP_TO_TRAD),
+                       fuzzy_shortlist=fuzzy_shortlist)
+
+
+def make_library(size, seed=0):
+    rng = random.Random(seed)
+    image_map = {}
+    metadata = {}
+    while len(image_map) < size:
+        name = ''.join(rng.choice(CHARS) for _ in range(rng.randint(1, 10))).strip()
+        if not name or name in image_map:
+            continue
+        image_map[name] = f"{name}.jpg"
+        metadata[name] = {
+            'author': rng.choice(AUTHORS),
+            'episode': rng.randint(1, 13),
+            'tags': rng.sample(TAGS, rng.randint(0, 2))
+        }
+    return image_map, metadata
+
+
+def make_queries(image_map, count, seed=1):
+    """名称片段、随机字符串和带筛选条件的查询"""
+    rng = random.Random(seed)
+    names = list(image_map)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        roll = rng.random()
+        if roll < 0.4:
+            start = rng.randrange(len(name))
+            query = name[start:start + rng.randint(1, 4)]
+        elif roll < 0.7:
+            query = ''.join(rng.choice(CHARS) for _ in range(rng.randint(1, 6)))
+        else:
+            query = name
+        if rng.random() < 0.2:
+            query = f"{query} author:{rng.choice(AUTHORS)}"
+        queries.append(query.strip() or name)
+    return queries
+
+
+def matches_facets(meta, groups):
+    """逐条检查筛选条件（与 FacetIndex 的结果对照）"""
+    def values(facet):
+        raw = meta.get(facet)
+        raw = raw if isinstance(raw, list) else [raw]
+        return {TableConverter(TRAD_TO_SIMP).convert(str(value).lower()) for value in raw if value is not None}
+
+    for group in groups:
+        ok = True
+        for facet, wanted, negate in group:
+            wanted = {TableConverter(TRAD_TO_SIMP).convert(value.lower()) for value in wanted}
+            hit = bool(values(facet) & wanted)
+            if hit == negate:
+                ok = False
+                break
+        if ok:
+            return True
+    return False
+
+
+def brute_force(index, metadata, search_text, threshold):
+    """不剪枝：对每个条目完整打分"""
+    text, groups = parse_query(search_text)
+    query = index.normalize_query(text)
+    results = []
+    for entry in index.entries:
+        if entry is None:
+            continue
+        if groups and not matches_facets(metadata.get(entry.name, {}), groups):
+            continue
+        score = 100 if groups and not text else index.score(entry, query)
+        if score >= threshold:
+            results.append((entry.name, score))
+    return sorted(results)
+
+
+def pruned(index, search_text, threshold):
+    return sorted((result['name'], result['score']) for result in index.search(search_text, threshold))
+
+
+@pytest.fixture(params=['numpy', 'postings'])
+def library(request):
+    """分别用 NumPy 字符袋矩阵和一元组倒排表两种模糊预筛选"""
+    image_map, metadata = make_library(200)
+    index = make_index()
+    index.build(image_map, metadata)
+    if request.param == 'postings':
+        index.fuzzy_ready = True
+        index.fuzzy = None
+    return index, image_map, metadata
+
+
+def test_pruned_search_matches_brute_force(library):
+    index, image_map, metadata = library
+    for query in make_queries(image_map, 40):
+        for threshold in THRESHOLDS:
+            index.invalidate()
+            assert pruned(index, query, threshold) == brute_force(index, metadata, query, threshold), \
+                (query, threshold)
+
+
+def test_refine_path_matches_brute_force(library):
+    """逐字输入：每个前缀都复用上一次的候选"""
+    index, image_map, metadata = library
+    for query in make_queries(image_map, 30, seed=2):
+        index.invalidate()
+        for end in range(1, len(query) + 1):
+            prefix = query[:end]
+            assert pruned(index, prefix, 10) == brute_force(index, metadata, prefix, 10), prefix
+
+
+def test_add_and_remove_keep_results_exact(library):
+    index, image_map, metadata = library
+    names = list(image_map)
+    for name in names[:50]:
+        index.remove(name)
+        metadata.pop(name)
+    extra, extra_meta = make_library(30, seed=5)
+    for name, path in extra.items():
+        index.add(name, path, extra_meta[name])
+        metadata[name] = extra_meta[name]
+    # 改名后重新加入同一名称
+    index.add(names[60], 'moved.jpg', metadata[names[60]])
+    assert index.entries[index.ids[names[60]]].path == 'moved.jpg'
+    for query in make_queries(image_map, 40, seed=3) + list(extra)[:10]:
+        for threshold in (10, 60, 90):
+            index.invalidate()
+            assert pruned(index, query, threshold) == brute_force(index, metadata, query, threshold), \
+                (query, threshold)
+
+
+def test_max_results_and_cache():
+    index = make_index()
+    index.build({'愛音': 'a.jpg', '愛音哭': 'b.jpg', '燈': 'c.jpg'})
+    results = index.search('爱音', 10, max_results=1)
+    assert [result['name'] for result in results] == ['愛音']
+    assert results[0]['score'] == 100
+    # 返回的是副本，修改不影响缓存
+    results.clear()
+    assert index.search('爱音', 10, max_results=1)
+
+
+def test_build_entries_with_precomputed_entries():
+    index = make_index()
+    entries = [IndexEntry('燈', 'c.jpg', '燈', '灯', '燈', 'deng')]
+    index.build_entries(entries)
+    assert [result['name'] for result in index.search('灯', 10)] == ['燈']
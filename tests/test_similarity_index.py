@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from src.utils import similarity_index
+from src.utils.similarity_index import SimilarityIndex
+
+
+def brute_force(items, value, k, max_distance, exclude=()):
+    results = sorted(
+        (bin(value ^ other).count('1'), path) for path, other in items
+        if path not in exclude and bin(value ^ other).count('1') <= max_distance
+    )
+    return [(path, distance) for distance, path in results[:k]]
+
+
+def make_items(size, seed=0):
+    rng = random.Random(seed)
+    base = [rng.getrandbits(64) for _ in range(8)]
+    items = []
+    for i in range(size):
+        # 围绕少数几个中心翻转若干位，制造大量距离相同的并列
+        value = rng.choice(base)
+        for _ in range(rng.randint(0, 6)):
+            value ^= 1 << rng.randrange(64)
+        items.append((f"{i:04d}.jpg", value))
+    return items
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(similarity_index, 'np', None)
+        monkeypatch.setattr(similarity_index, 'numpy_loaded', True)
+    elif similarity_index.load_numpy() is None:
+        pytest.skip("NumPy 不可用")
+    return request.param
+
+
+def test_nearest_matches_brute_force(backend):
+    items = make_items(500)
+    index = SimilarityIndex(items)
+    rng = random.Random(1)
+    for _ in range(50):
+        value = rng.choice(items)[1] ^ (1 << rng.randrange(64))
+        k = rng.randint(1, 30)
+        max_distance = rng.choice((0, 4, 8, 16, 64))
+        exclude = {rng.choice(items)[0] for _ in range(rng.randint(0, 3))}
+        assert index.nearest(value, k, max_distance, exclude) == \
+            brute_force(items, value, k, max_distance, exclude)
+
+
+def test_empty_and_zero_k(backend):
+    assert SimilarityIndex().nearest(0) == []
+    assert SimilarityIndex([('a.jpg', 1)]).nearest(1, 0) == []